@@ -1,49 +1,90 @@
-import yfinance as yf
+import logging
 import pandas as pd
-import concurrent.futures
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_pdf import PdfPages
-from matplotlib.ticker import FuncFormatter
-import datetime
+import tracing
+from data_provider import YahooDataProvider
+from fetch_scheduler import FetchScheduler
+
+logger = logging.getLogger(__name__)
+
+# Fundamentals shown in the report, keyed by their label, with the matching yfinance .info key
+FUNDAMENTAL_FIELDS = {
+    'Market Cap': 'marketCap',
+    'Trailing PE': 'trailingPE',
+    'EPS': 'trailingEps',
+    'Dividend Yield': 'dividendYield',
+    'Price to Book': 'priceToBook',
+    'Debt to Equity': 'debtToEquity',
+    'Return on Equity': 'returnOnEquity',
+}
+
 
 class FundamentalAnalyzer:
-    def __init__(self, tickers):
+    def __init__(self, tickers, cache=None, refresh=False, provider=None, scheduler=None):
         self.tickers = tickers
+        # Optional FundamentalsCache; refresh=True skips cached values and re-fetches them
+        self.cache = cache
+        self.refresh = refresh
+        self.provider = provider if provider is not None else YahooDataProvider()
+        self.scheduler = scheduler if scheduler is not None else FetchScheduler()
+        # Tickers whose fundamentals could not be fetched, with the last error
+        self.failures = {}
 
-    def analyze_ticker(self, ticker):
-        try:
-            data = yf.Ticker(ticker)
-            info = data.info
-        except Exception as e:
-            print(f"Error fetching data for {ticker}: {e}")
+    def cached_ticker(self, ticker):
+        if self.cache is None or self.refresh:
             return None
+        cached = self.cache.get(ticker, FUNDAMENTAL_FIELDS)
+        if cached is None:
+            return None
+        return pd.Series(cached, name=ticker)
 
-        fundamentals = {
-            'Market Cap': info.get('marketCap'),
-            'Trailing PE': info.get('trailingPE'),
-            'EPS': info.get('trailingEps'),
-            'Dividend Yield': info.get('dividendYield', 0),
-            'Price to Book': info.get('priceToBook'),
-            'Debt to Equity': info.get('debtToEquity'),
-            'Return on Equity': info.get('returnOnEquity'),
-
-        }
+    def fetch_ticker(self, ticker):
+        # Fetches fundamentals from the provider, raising on failure so the scheduler can retry
+        with tracing.span('fetch.info', ticker=ticker):
+            info = self.provider.fetch_info(ticker)
 
-        return pd.Series(fundamentals, name=ticker)
+        fundamentals = {label: info.get(key) for label, key in FUNDAMENTAL_FIELDS.items()}
+        fundamentals['Dividend Yield'] = info.get('dividendYield', 0)
 
-    def analyze_data(self):
-        results = pd.DataFrame()
+        if self.cache is not None:
+            self.cache.put(ticker, fundamentals)
 
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            futures = [executor.submit(self.analyze_ticker, ticker) for ticker in self.tickers]
+        return pd.Series(fundamentals, name=ticker)
 
-            for future in concurrent.futures.as_completed(futures):
-                result = future.result()
+    def analyze_ticker(self, ticker):
+        cached = self.cached_ticker(ticker)
+        if cached is not None:
+            return cached
 
-                if result is not None:
-                    results = results._append(result)
+        try:
+            return self.fetch_ticker(ticker)
+        except Exception as e:
+            self.failures[ticker] = e
+            logger.warning("Error fetching fundamentals for %s: %s", ticker, e)
+            return None
 
+    def analyze_data(self):
+        results = {}
+        to_fetch = []
 
-        return results
+        # Cache hits are served directly and don't count against the rate limit
+        for ticker in self.tickers:
+            cached = self.cached_ticker(ticker)
+            if cached is not None:
+                results[ticker] = cached
+            else:
+                to_fetch.append(ticker)
+        tracing.count('fundamentals_cache_hits', len(results))
+        tracing.count('fundamentals_cache_misses', len(to_fetch))
 
+        fetched, failures = self.scheduler.run(self.fetch_ticker, to_fetch)
+        results.update(fetched)
+        for ticker, error in failures.items():
+            self.failures[ticker] = error
+            tracing.count('fetch_failures', kind='info')
+            logger.warning("Error fetching fundamentals for %s: %s", ticker, error)
 
+        # Build the frame once, in the original ticker order
+        rows = [results[ticker] for ticker in self.tickers if ticker in results]
+        if not rows:
+            return pd.DataFrame(columns=list(FUNDAMENTAL_FIELDS))
+        return pd.DataFrame(rows)
@@ -1,18 +1,23 @@
-import json
+import time
+STARTED = time.perf_counter()
+
+import queue
+import sys
 import tkinter as tk
 from tkinter import *
 from tkinter import ttk, messagebox, Button
-from ttkthemes import ThemedTk
 from tkinter import font as tkfont
-from Stocks import InvestmentAnalyzer
-from Fundamental_analysis import FundamentalAnalyzer
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.dates as mdates
+from analysis_worker import AnalysisJob, AnalysisServices
+from watchlist_store import DEFAULT_LIST, WatchlistStore
 import subprocess
-from matplotlib.backends.backend_pdf import PdfPages
 import os
-import easygui
+
+# Seconds allowed from process start until the window is ready; checked with --startup-check.
+# pandas, matplotlib and yfinance are only imported once an analysis runs, to stay inside it.
+STARTUP_BUDGET = 1.0
+
+# Bar sizes offered in the GUI, with the interval name used by the analysis
+INTERVAL_CHOICES = {"Daily": "1d", "Weekly": "1wk", "Monthly": "1mo"}
 
 
 class UserInterface:
@@ -21,24 +26,18 @@ class UserInterface:
         self.root.title("Investment Analyser")
         self.root.geometry("550x250")
 
+        # Data provider, caches and renderer, loaded by the first analysis
+        self.services = AnalysisServices("cache", workers=os.cpu_count())
+        # The analysis job running in the background, if any
+        self.job = None
 
-        # Load stocks
-        self.load_stocks()
-        self.selected_stocks = {}
-        self.stock_vars = {}
-
-        # Frame for stocks with scrollbar
-        stock_frame = ttk.Frame(root)
-        stock_frame.grid(row=0, column=0, sticky='nsew', rowspan=4)
-        canvas = tk.Canvas(stock_frame)
-        scrollbar = ttk.Scrollbar(stock_frame, orient="vertical", command=canvas.yview)
-        self.scrollable_frame = ttk.Frame(canvas)
-        self.scrollable_frame.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
-        canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-        canvas.grid(row=0, column=0, sticky='nsew')
-        scrollbar.grid(row=0, column=1, sticky='ns')
-
+        # Named watchlists in SQLite; the old stocks.json list is imported on the first run
+        self.watchlists = WatchlistStore("watchlists.sqlite", legacy_path="stocks.json")
+        lists = self.watchlists.lists()
+        if not lists:
+            self.watchlists.create_list(DEFAULT_LIST)
+            lists = [DEFAULT_LIST]
+        self.current_list = lists[0]
 
         # Button font
         button_font = tkfont.Font(size=40,font=("Helvetica"))
@@ -54,27 +53,55 @@ class UserInterface:
         self.analyze_button = Button(root, text="Analyze", command=self.analyze,relief='flat',font=button_font)
         self.analyze_button.grid(row=5, column=1, sticky='SEW')
 
-        # Treeview for displaying stocks
+        # Watchlist picker (type a new name and press Enter to create a list), search box
+        # and the list itself, which only creates rows for the tickers on screen
         style = ttk.Style(root)
-        style.configure("Treeview",font=(None,13))
+        style.configure("Treeview",font=(None,13), rowheight=tkfont.Font(size=13).metrics('linespace') + 4)
         style.configure("Treeview.Heading",font=(None,15,'bold'))
-        self.tree = ttk.Treeview(root)
-        self.tree["columns"] = ("Stocks")
-        self.tree.column("#0", width=0, stretch="NO")
-        self.tree.column("Stocks", anchor="w", width=100)
-        self.tree.heading("#0", text="", anchor="w")
-        self.tree.heading("Stocks", text="Stocks", anchor="center")
-        self.tree.grid(row=0, column=0, rowspan=4, padx=5, pady=5, sticky='nsew')
-
-        #time period selection
-        self.time_period = ttk.Combobox(root,
+        list_frame = ttk.Frame(root)
+        list_frame.grid(row=0, column=0, rowspan=4, padx=5, pady=5, sticky='nsew')
+        list_frame.grid_columnconfigure(1, weight=1)
+        list_frame.grid_rowconfigure(1, weight=1)
+        self.list_choice = ttk.Combobox(list_frame, width=10, values=lists)
+        self.list_choice.set(self.current_list)
+        self.list_choice.grid(row=0, column=0, sticky='W')
+        self.list_choice.bind("<<ComboboxSelected>>", self.switch_list)
+        self.list_choice.bind("<Return>", self.switch_list)
+        self.search = tk.StringVar()
+        self.search_entry = ttk.Entry(list_frame, textvariable=self.search)
+        self.search_entry.grid(row=0, column=1, sticky='EW', padx=(5, 0))
+        self.search.trace_add('write', lambda *args: self.refresh_list())
+        self.tree = VirtualTreeview(list_frame)
+        self.tree.grid(row=1, column=0, columnspan=2, pady=(5, 0), sticky='nsew')
+
+        #time period and bar size selection. Only the first analysis of a ticker downloads its
+        #history; other periods and bar sizes are derived from it in memory.
+        period_frame = ttk.Frame(root)
+        period_frame.grid(row=0, column=1, sticky='NEW', padx=5, pady=5)
+        self.time_period = ttk.Combobox(period_frame, width=6,
                                         values=["3mo", "6mo", "1y", "2y", "5y", "10y", "ytd", "max"])
-        self.time_period.grid(row=0, column=1, sticky='NEW', padx=5, pady=5)
+        self.time_period.pack(side='left', fill='x', expand=True)
         self.time_period.set("1y")  # default value
+        self.interval = ttk.Combobox(period_frame, width=8, state='readonly', values=list(INTERVAL_CHOICES))
+        self.interval.pack(side='left', padx=(5, 0))
+        self.interval.set("Daily")
+
+        # Re-fetch fundamentals even if cached values are still fresh
+        self.refresh_fundamentals = tk.BooleanVar(value=False)
+        self.refresh_check = ttk.Checkbutton(root, text="Refresh fundamentals", variable=self.refresh_fundamentals)
+        self.refresh_check.grid(row=1, column=1, sticky='NW', padx=5)
+
+        # Progress of the running analysis
+        self.status_label = ttk.Label(root, text="")
+        self.status_label.grid(row=2, column=1, sticky='SW', padx=5)
+        self.progress = ttk.Progressbar(root, mode='determinate')
+        self.progress.grid(row=3, column=1, sticky='NEW', padx=5)
 
-        # Add stocks to the scrollable area
-        for index, stock in enumerate(self.stocks):
-            self.add_stock_to_gui(stock, index)
+        # Live intraday charts of the selected tickers, polled every minute
+        self.live_button = ttk.Button(root, text="Live charts", command=self.open_live)
+        self.live_button.grid(row=4, column=1, sticky='NEW', padx=5)
+
+        self.refresh_list()
 
         #bind the event handlers for defined buttons
         self.add_button.bind("<Enter>", lambda e: self.on_enter(e, self.add_button))
@@ -94,60 +121,136 @@ class UserInterface:
 
     def add_stock(self):
         def callback(stock):
-            if stock and stock not in self.stocks:
-                self.stocks.append(stock)
-                self.add_stock_to_gui(stock, len(self.stocks) - 1)
-                self.save_stocks()
+            if self.watchlists.add(self.current_list, [stock]):
+                self.refresh_list()
             else:
                 messagebox.showerror("Error", "Please enter a valid stock ticker.")
 
         AddStockDialog(self.root, callback)
 
     def remove_stock(self):
-        selected_ticker = self.tree.selection()[0]
-        item = self.tree.item(selected_ticker)
-        ticker_to_remove = item['values'][0].lower()  # Convert to lowercase
-
-        if ticker_to_remove in self.stocks:
-            self.stocks.remove(ticker_to_remove)  # Update self.stocks list
-        else:
-            print(f"Error: '{ticker_to_remove}' not found in self.stocks list")
-        self.tree.delete(selected_ticker)
-        self.save_stocks()  # Save updated list
-
-
-    def load_stocks(self):
-        if os.path.exists("stocks.json"):
-            with open("stocks.json", 'r') as file:
-                try:
-                    self.stocks = json.load(file)
-                except json.JSONDecodeError:
-                    self.stocks = []
+        selected_tickers = self.tree.selection()
+        if selected_tickers:
+            self.watchlists.remove(self.current_list, selected_tickers)
+            self.refresh_list()
+
+    def refresh_list(self):
+        # Show the current list, or the tickers matching the search box
+        query = self.search.get().strip()
+        if query:
+            self.tree.set_tickers(self.watchlists.search(self.current_list, query))
         else:
-            self.stocks = []
-
-    def save_stocks(self):
-        with open("stocks.json", 'w') as file:
-            json.dump(self.stocks, file)
+            self.tree.set_tickers(self.watchlists.tickers(self.current_list))
 
-    def add_stock_to_gui(self, stock, index):
-        # Add stock to Treeview
-
-        self.tree.insert("", "end", values=(stock.upper(),))
+    def switch_list(self, event=None):
+        name = self.list_choice.get().strip()
+        if not name:
+            return
+        if name not in self.watchlists.lists():
+            self.watchlists.create_list(name)
+            self.list_choice['values'] = self.watchlists.lists()
+        self.current_list = name
+        self.search.set("")
+        self.refresh_list()
 
 
     def analyze(self):
-        selected_tickers = [self.tree.item(item, "values")[0] for item in self.tree.selection()]
+        # While a job is running the Analyze button cancels it
+        if self.job is not None and self.job.is_alive():
+            self.job.cancel()
+            self.status_label['text'] = "Cancelling..."
+            return
 
+        selected_tickers = self.tree.selection()
 
         if selected_tickers:
-            time_period = self.time_period.get()
-            fundamental_results = self.run_fundamental_analysis(selected_tickers)
-            investment_analyzer = self.run_investment_analysis(selected_tickers,time_period)
-            self.display_analysis_results(selected_tickers, fundamental_results, investment_analyzer)
+            for ticker in selected_tickers:
+                self.tree.set_result(ticker, "")
+            self.progress['value'] = 0
+            self.progress['maximum'] = len(selected_tickers)
+            # Tickers left out of the report, and tickers drawn with data missing
+            self.job_skipped = {}
+            self.job_warnings = {}
+
+            self.job = AnalysisJob(selected_tickers, self.time_period.get(), self.services, 'analysis_results.pdf',
+                                   refresh_fundamentals=self.refresh_fundamentals.get(),
+                                   interval=INTERVAL_CHOICES[self.interval.get()])
+            self.job.start()
+            self.analyze_button['text'] = "Cancel"
+            self.root.after(100, self.poll_job)
         else:
             print("no stocks selected ")
 
+    def open_live(self):
+        selected_tickers = self.tree.selection()
+        if not selected_tickers:
+            print("no stocks selected ")
+            return
+        from data_provider import YahooDataProvider
+        from live_chart import LiveDashboard, ProviderFeed
+
+        window = tk.Toplevel(self.root)
+        window.title("Live " + ", ".join(selected_tickers))
+        LiveDashboard(window, ProviderFeed(YahooDataProvider(), selected_tickers, "1m"), selected_tickers)
+
+    def poll_job(self):
+        # Drain the job's messages on the Tk main loop
+        while True:
+            try:
+                message = self.job.messages.get_nowait()
+            except queue.Empty:
+                break
+            kind = message[0]
+            if kind == 'status':
+                self.status_label['text'] = message[1]
+            elif kind == 'progress':
+                ticker, done, total, summary = message[1:]
+                self.progress['maximum'] = total
+                self.progress['value'] = done
+                self.status_label['text'] = f"Rendered {done}/{total}"
+                self.show_ticker_result(ticker, summary)
+            elif kind == 'skipped':
+                self.job_skipped.update(message[1])
+                for ticker, reason in message[1].items():
+                    self.show_ticker_result(ticker, f"Skipped: {reason}")
+            elif kind == 'warnings':
+                self.job_warnings.update(message[1])
+            elif kind == 'done':
+                self.finish_job(self.job_summary("Done"))
+                self.show_job_problems()
+                self.open_report(message[1])
+                return
+            elif kind == 'cancelled':
+                self.finish_job("Cancelled" + (", partial report saved" if message[1] else ""))
+                return
+            elif kind == 'error':
+                self.finish_job("Failed")
+                print(f"An unexpected error occurred: {message[1]}")
+                return
+        self.root.after(100, self.poll_job)
+
+    def job_summary(self, status):
+        if self.job_skipped:
+            status += f", {len(self.job_skipped)} skipped"
+        if self.job_warnings:
+            status += f", {len(self.job_warnings)} with warnings"
+        return status
+
+    def show_job_problems(self):
+        # One dialog listing what the report is missing, rather than a popup per ticker
+        lines = [f"{ticker}: no page ({reason})" for ticker, reason in self.job_skipped.items()]
+        lines += [f"{ticker}: {reason}" for ticker, reason in self.job_warnings.items()]
+        if lines:
+            shown = lines[:20] + ([f"... and {len(lines) - 20} more"] if len(lines) > 20 else [])
+            messagebox.showwarning("Analysis warnings", "\n".join(shown))
+
+    def finish_job(self, status):
+        self.status_label['text'] = status
+        self.analyze_button['text'] = "Analyze"
+
+    def show_ticker_result(self, ticker, summary):
+        self.tree.set_result(ticker, summary)
+
     def get_selected_tickers(self):
         # Get selected stocks from the Listbox
         selected_stocks = [self.listbox.get(i) for i in self.listbox.curselection()]
@@ -157,227 +260,145 @@ class UserInterface:
 
         return selected_stocks + manual_stocks
 
-    def run_fundamental_analysis(self, tickers):
-        # Run the fundamental analysis
-        fundamental_analyzer = FundamentalAnalyzer(tickers)
-        return fundamental_analyzer.analyze_data()
-
-    def run_investment_analysis(self, tickers,time_period):
-        # Run the investment analysis
-        investment_analyzer = InvestmentAnalyzer(tickers,time_period)
-        investment_analyzer.analyze_data()
-        return investment_analyzer
-
-    def display_analysis_results(self, tickers, fundamental_results, investment_analyzer):
-        try:
-
-
-            with PdfPages('analysis_results.pdf') as pdf:
-            # For each stock, create graphs and a table
-                for ticker in tickers:
-                    # Use matplotlib to create the graphs
-                    fig, axs = plt.subplots(4, 1, figsize=(10, 15))  # Create 4 subplots
-
-                    if '.jo' in ticker.lower():
-                        close_prices = investment_analyzer.hist[ticker]['Close']/100
-                        currency_label  = "Price (ZAR)"
-                    else:
-                        close_prices = investment_analyzer.hist[ticker]['Close']
-                        currency_label = 'Price (USD)'
-
-
-
-                    # Create a graph for the investment analysis results
-                    axs[0].plot(investment_analyzer.hist[ticker].index, close_prices)
-                    axs[0].set_title(f"{ticker} Close Price")
-                    axs[0].set_ylabel(currency_label)
-
-                    if self.time_period == "1y":
-                        window_sizes = [200, 50]
-                    elif self.time_period == "6mo":
-                        window_sizes = [120, 30]
-                    elif self.time_period == "3mo":
-                        window_sizes = [60, 15]
-                    else:
-                        window_sizes = [200, 50]  # Default to 200 and 50 if time period is not recognized
-
-                    # Plot the moving averages
-                    for window_size in window_sizes:
-                        moving_avg = close_prices.rolling(window=window_size).mean()
-                        axs[0].plot(investment_analyzer.hist[ticker].index, moving_avg, label=f'{window_sizes} Day MA')
-
-                    # Get the last close price and its date
-                    last_close_price = close_prices.iloc[-1]
-                    last_close_price= round(last_close_price,2)
-
-                    axs[0].text(0.85, 1.02, f'Last Close: {last_close_price}{currency_label[6:]}', transform=axs[0].transAxes, ha='center',
-                                fontsize=10)
-
-                    # Calculate Bollinger Bands
-
-                    rolling_mean = close_prices.rolling(window=20).mean()
-                    rolling_std = close_prices.rolling(window=20).std()
-                    upper_band = rolling_mean + (rolling_std * 2)
-                    lower_band = rolling_mean - (rolling_std * 2)
-
-                    # Plot Bollinger Bands
-                    if self.time_period.get() in ['3mo','6mo','1y']:
-                        axs[0].plot(upper_band.index, upper_band, color='lightgray')
-                        axs[0].plot(lower_band.index, lower_band, color='lightgray')
-
-                    # Create the RSI graph
-                    axs[1].plot(investment_analyzer.rsi[ticker].index, investment_analyzer.rsi[ticker],color='blue')
-                    axs[1].set_title(f"{ticker} RSI")
-                    axs[1].set_ylabel("RSI")
-
-
-                    last_rsi = investment_analyzer.rsi[ticker].iloc[-1]
-                    # Add horizontal lines at 70 and 30
-                    axs[1].axhline(70, color='red', linestyle='dashed', alpha=0.6, label='Overbought (70)')
-                    axs[1].axhline(30, color='green', linestyle='dashed', alpha=0.6, label='Oversold (30)')
-
-                    # Add buy/sell indicator based on RSI
-                    if last_rsi < 30:
-                        indicator = 'Potential Buy'
-                    elif last_rsi > 70:
-                        indicator = 'Potential Sell'
-                    else:
-                        indicator = 'Neutral'
-
-                    # Add text at the top right of the RSI graph
-                    axs[1].text(1, 1.02, f'Indicator: {indicator}', transform=axs[1].transAxes, ha='right', fontsize=10,
-                                va='bottom')
-
-                    # Create the MACD graph
-                    macd_data = investment_analyzer.macd[ticker]
-                    macd_line = investment_analyzer.macd[ticker]['MACD_12_26_9']
-                    signal_line = investment_analyzer.macd[ticker]['MACDs_12_26_9']
-                    dates = investment_analyzer.macd[ticker].index
-
-                    axs[2].plot(dates, macd_line, label='MACD Line', color='blue')
-                    axs[2].plot(dates, signal_line, label='Signal Line', color='red')
-                    axs[2].bar(dates, investment_analyzer.macd[ticker]['MACDh_12_26_9'], label='MACD Histogram',
-                               color='grey',
-                               alpha=0.7)
-
-                    # Check for crossovers
-                    last_crossover = None
-                    last_crossover_type = None
-                    for i in range(1, len(macd_line)):
-                        if macd_line[i] > signal_line[i] and macd_line[i - 1] <= signal_line[i - 1]:
-                            axs[2].annotate('Buy', xy=(macd_data.index[i], macd_line[i]),
-                                            xytext=(macd_data.index[i], macd_line[i] + 0.5),
-                                            arrowprops=dict(facecolor='green', arrowstyle='->'), fontsize=8, color='green')
-                            last_crossover = dates[i]
-                            last_crossover_type = 'Buy'
-                        elif macd_line[i] < signal_line[i] and macd_line[i - 1] >= signal_line[i - 1]:
-                            axs[2].annotate('Sell', xy=(macd_data.index[i], macd_line[i]),
-                                            xytext=(macd_data.index[i], macd_line[i] - 0.5),
-                                            arrowprops=dict(facecolor='red', arrowstyle='->'), fontsize=8, color='red')
-                            last_crossover = dates[i]
-                            last_crossover_type = 'Sell'
-
-                    # Annotate the last crossover at the top right corner of the graph
-                    if last_crossover is not None:
-                        color = 'green' if last_crossover_type == 'Buy' else 'red'
-                        axs[2].text(1, 1.065, f'Last Signal: {last_crossover_type} ({last_crossover.strftime("%Y-%m-%d")})',
-                                    color=color, fontsize=10,
-                                    ha='right', va='top', transform=axs[2].transAxes)
-
-                    axs[2].set_title(f"{ticker} MACD")
-                    axs[2].set_ylabel("MACD Value")
-
-
-                    # Create the Stochastic Oscillator graph
-                    axs[3].plot(investment_analyzer.stoch[ticker].index, investment_analyzer.stoch[ticker]['STOCHk_14_3_3'],
-                                label='K Line', color='blue')
-                    axs[3].plot(investment_analyzer.stoch[ticker].index, investment_analyzer.stoch[ticker]['STOCHd_14_3_3'],
-                                label='D Line', color='red')
-
-                    # Add horizontal lines at 80 and 20
-                    axs[3].axhline(80, color='gray', linestyle='dashed', alpha=0.6, label='Overbought (80)')
-                    axs[3].axhline(20, color='gray', linestyle='dashed', alpha=0.6, label='Oversold (20)')
-
-                    axs[3].set_title(f"{ticker} Stochastic Oscillator")
-                    axs[3].set_ylabel("%K and %D")
-
-
-                    axs[0].legend()
-                    axs[1].legend()
-                    axs[2].legend()
-                    axs[3].legend()
-
-
-
-                    pdf.savefig(fig)
-
-                    # Create a new figure for the fundamental analysis results table
-                    fig, ax = plt.subplots(figsize=(12.65, 1))
-                    ax.axis('tight')
-                    ax.axis('off')
-
-                    # Create a table with fundamental analysis data
-                    columns = fundamental_results.columns.tolist()
-                    table_data = []
-                    indicators = []
-
-                    for i, col in enumerate(columns):
-                        value = fundamental_results.loc[ticker, col]
-                        indicator = ""
-
-                        if col == "Market Cap":
-                            # No specific rule for Market Cap, it's more for information
-                            indicator = "Info"
-                        elif col == "Trailing PE":
-                            # Simplified rule: lower P/E might indicate undervalued
-                            indicator = "Positive" if value < 15 else "Negative" if value > 30 else "Neutral"
-                        elif col == "EPS":
-                            # Positive EPS might be considered good
-                            indicator = "Positive" if value > 0 else "Negative"
-                        elif col == "Dividend Yield":
-                            # Higher dividend yield might be considered good
-                            indicator = "Positive" if value > 0.03 else "Neutral"
-                        elif col == "Price to Book":
-                            # Lower P/B might indicate undervalued
-                            indicator = "Positive" if value < 1 else "Negative"
-                        elif col == "Debt to Equity":
-                            # Lower debt-to-equity is generally considered better
-                            indicator = "Positive" if value < 0.5 else "Negative"
-                        elif col == "Return on Equity":
-                            # Higher ROE indicates efficient use of equity to generate profits
-                            indicator = "Positive" if value > 0.15 else "Negative"
-
-                        # Add the indicator to the table
-                        table_data.append([col, value, indicator])
-
-
-
-                    # Add the table to the figure
-                    ax.table(cellText=table_data, colLabels=["Metric", "Value", "Indicator"], cellLoc='center',
-                             loc='center')
-
-                    # Save the table figure to the PDF
-                    pdf.savefig(fig, bbox_inches='tight')
-
-        except FileNotFoundError as e:
-            print(f"Error: File not found. Details: {e}")
-        except ValueError as e:
-            print(f"Error: Invalid value. Details {e}")
-        except Exception as e:
-            print(f"An unexpected error occurred: {e}")
-
+    def open_report(self, path):
         try:
             # Open the PDF file using the default PDF viewer
             if os.name == 'nt':  # For Windows
-                os.startfile('analysis_results.pdf')
+                os.startfile(path)
             elif os.name == 'posix':  # For MacOS and Linux
-                subprocess.run(['open', 'analysis_results.pdf'])
+                subprocess.run(['open', path])
             else:
-                print("Could not open the PDF file. Please open 'analysis_results.pdf' manually.")
+                print(f"Could not open the PDF file. Please open '{path}' manually.")
 
         except Exception as e:
             print(f"Error opening the PDF file: {e}")
 
+class VirtualTreeview(ttk.Frame):
+    # Ticker list that only creates Treeview rows for the part of the list on screen, so a
+    # 10,000 ticker watchlist draws as fast as a 20 ticker one. The tickers, their result
+    # text and the selection are kept here and the rows are refilled as the list scrolls.
+    # Click selects, Ctrl+click toggles, Shift+click selects a range, Ctrl+A selects all.
+    def __init__(self, parent, wheel_rows=3):
+        super().__init__(parent)
+        self.tickers = []
+        self.results = {}
+        self.selected = set()
+        self.anchor = None
+        self.top = 0
+        self.visible = 1
+        self.rows = []
+        self.wheel_rows = wheel_rows
+
+        self.tree = ttk.Treeview(self, columns=("Stocks", "Result"), show='headings', selectmode='none')
+        self.tree.column("Stocks", anchor="w", width=100)
+        self.tree.column("Result", anchor="w", width=140)
+        self.tree.heading("Stocks", text="Stocks", anchor="center")
+        self.tree.heading("Result", text="", anchor="center")
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.tree.grid(row=0, column=0, sticky='nsew')
+        self.scrollbar.grid(row=0, column=1, sticky='ns')
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(0, weight=1)
+
+        self.tree.bind("<Configure>", self.on_resize)
+        self.tree.bind("<Button-1>", lambda e: self.on_click(e))
+        self.tree.bind("<Control-Button-1>", lambda e: self.on_click(e, 'toggle'))
+        self.tree.bind("<Shift-Button-1>", lambda e: self.on_click(e, 'range'))
+        self.tree.bind("<Control-a>", self.select_all)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(sequence, self.on_wheel)
+
+    def row_height(self):
+        try:
+            return int(ttk.Style(self).lookup("Treeview", "rowheight")) or 20
+        except (TypeError, ValueError):
+            return 20
+
+    def heading_height(self):
+        # Where the first row starts, once there is one on screen
+        if self.rows:
+            box = self.tree.bbox(self.rows[0])
+            if box:
+                return box[1]
+        return 25
+
+    def on_resize(self, event):
+        visible = max(1, (event.height - self.heading_height()) // self.row_height())
+        if visible != self.visible:
+            self.visible = visible
+            self.render()
+
+    def render(self):
+        self.top = max(0, min(self.top, len(self.tickers) - self.visible))
+        shown = self.tickers[self.top:self.top + self.visible]
+        while len(self.rows) < len(shown):
+            self.rows.append(self.tree.insert("", "end"))
+        while len(self.rows) > len(shown):
+            self.tree.delete(self.rows.pop())
+        for row, ticker in zip(self.rows, shown):
+            self.tree.item(row, values=(ticker, self.results.get(ticker, "")))
+        self.tree.selection_set([row for row, ticker in zip(self.rows, shown) if ticker in self.selected])
+        if self.tickers:
+            self.scrollbar.set(self.top / len(self.tickers), (self.top + len(shown)) / len(self.tickers))
+        else:
+            self.scrollbar.set(0, 1)
+
+    def yview(self, *args):
+        # Scrollbar command: ('moveto', fraction) or ('scroll', n, 'units'/'pages')
+        if args[0] == 'moveto':
+            self.top = int(float(args[1]) * len(self.tickers))
+        elif args[0] == 'scroll':
+            self.top += int(args[1]) * (self.visible if args[2] == 'pages' else 1)
+        self.render()
+
+    def on_wheel(self, event):
+        up = event.num == 4 or getattr(event, 'delta', 0) > 0
+        self.top += -self.wheel_rows if up else self.wheel_rows
+        self.render()
+        return 'break'
+
+    def on_click(self, event, mode=None):
+        self.tree.focus_set()
+        row = self.tree.identify_row(event.y)
+        if row not in self.rows:
+            return 'break'
+        index = self.top + self.rows.index(row)
+        ticker = self.tickers[index]
+        if mode == 'toggle':
+            self.selected ^= {ticker}
+            self.anchor = index
+        elif mode == 'range' and self.anchor is not None:
+            start, end = sorted((self.anchor, index))
+            self.selected = set(self.tickers[start:end + 1])
+        else:
+            self.selected = {ticker}
+            self.anchor = index
+        self.render()
+        return 'break'
+
+    def select_all(self, event=None):
+        self.selected = set(self.tickers)
+        self.render()
+        return 'break'
+
+    def set_tickers(self, tickers):
+        # Replaces the list; the selection keeps only tickers that are still shown
+        self.tickers = list(tickers)
+        self.selected.intersection_update(self.tickers)
+        self.anchor = None
+        self.render()
+
+    def selection(self):
+        # Selected tickers in list order
+        return [ticker for ticker in self.tickers if ticker in self.selected]
+
+    def set_result(self, ticker, text):
+        self.results[ticker] = text
+        shown = self.tickers[self.top:self.top + len(self.rows)]
+        if ticker in shown:
+            self.tree.set(self.rows[shown.index(ticker)], "Result", text)
+
+
 class AddStockDialog(ttk.Frame):
     def __init__(self, parent, callback):
         self.top = tk.Toplevel(parent)
@@ -407,16 +428,34 @@ class AddStockDialog(ttk.Frame):
         self.callback(stock)
         self.top.destroy()
 
-# Create an instance of the user interface
-root = ThemedTk(theme='breeze')
-root.minsize(550, 250)
-#root.resizable(False, False)
-ui = UserInterface(root)
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+
+    from ttkthemes import ThemedTk
+
+    # Create an instance of the user interface
+    root = ThemedTk(theme='breeze')
+    root.minsize(550, 250)
+    #root.resizable(False, False)
+    ui = UserInterface(root)
+
+    # Configure the grid column and row to fill the entire window
+    root.grid_columnconfigure(0, weight=1)
+    root.grid_columnconfigure(1, weight=1)
+    root.grid_rowconfigure(0, weight=1)
+    root.grid_rowconfigure(1, weight=1)
+
+    def check_startup():
+        elapsed = time.perf_counter() - STARTED
+        print(f"Window ready in {elapsed:.2f}s (budget {STARTUP_BUDGET:.2f}s)")
+        root.destroy()
+        if elapsed > STARTUP_BUDGET:
+            sys.exit(1)
+
+    if '--startup-check' in argv:
+        root.after_idle(check_startup)
+    root.mainloop()
 
 
-# Configure the grid column and row to fill the entire window
-root.grid_columnconfigure(0, weight=1)
-root.grid_columnconfigure(1, weight=1)
-root.grid_rowconfigure(0, weight=1)
-root.grid_rowconfigure(1, weight=1)
-root.mainloop()
+if __name__ == '__main__':
+    main()
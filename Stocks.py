@@ -1,46 +1,64 @@
-import yfinance as yf
 import pandas as pd
-import pandas_ta as ta
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_pdf import PdfPages
+import tracing
+from data_provider import YahooDataProvider
+from panel import IndicatorPanel, PanelView
+
+MACD_COLUMNS = ['MACD_12_26_9', 'MACDh_12_26_9', 'MACDs_12_26_9']
+STOCH_COLUMNS = ['STOCHk_14_3_3', 'STOCHd_14_3_3']
 
 
 class InvestmentAnalyzer:
-    def __init__(self, tickers,time_period):
+    def __init__(self, tickers,time_period, provider=None):
         self.tickers = tickers
         self.time_period = time_period
-        self.hist = {}
-        self.rsi = {}
-        self.macd = {}
-        self.stoch = {}
+        self.provider = provider if provider is not None else YahooDataProvider()
+        self.histories = {}
+        self.set_panel(IndicatorPanel.from_histories({}))
+
+    def set_panel(self, panel):
+        # All prices and indicators live in one (time x ticker) panel; hist, rsi, macd and
+        # stoch are per-ticker views into it
+        self.panel = panel
+        self.hist = PanelView(panel, panel.history)
+        self.rsi = PanelView(panel, lambda ticker: panel.indicator_frame(ticker, ['RSI_14'])['RSI_14'])
+        self.macd = PanelView(panel, lambda ticker: panel.indicator_frame(ticker, MACD_COLUMNS))
+        self.stoch = PanelView(panel, lambda ticker: panel.indicator_frame(ticker, STOCH_COLUMNS))
 
     def calculate_sma(self, data, window):
         return data.rolling(window=window).mean()
 
-    def analyze_ticker(self, ticker):
-        data = yf.Ticker(ticker)
-        hist = data.history(period=self.time_period)
+    def build_panel(self, sma_windows=(50, 200)):
+        with tracing.span('compute.indicators', tickers=len(self.histories)):
+            panel = IndicatorPanel.from_histories(self.histories, self.tickers)
+            panel.compute_indicators(sma_windows)
+        self.set_panel(panel)
+
+    def analyze_ticker(self, ticker, hist=None):
+        if hist is None:
+            hist = self.provider.fetch_history([ticker], self.time_period).get(ticker)
 
         # Check if any data was returned
-        if hist.empty:
+        if hist is None or hist.empty:
             print(f"No data for {ticker}, skipping.")
             return None
-        self.hist[ticker] = hist
-
-        # Calculate the 14-day RSI
-        self.rsi[ticker] = ta.rsi(hist['Close'], length=14)
-
-        # Calculate the MACD
-        self.macd[ticker] = ta.macd(hist['Close'])
-
-        # Calculate the Stochastic Oscillator
-        stoch = ta.stoch(hist['High'], hist['Low'], hist['Close'])
-        self.stoch[ticker] = stoch
+        self.histories[ticker] = hist
+        self.build_panel()
 
         return None
 
     def analyze_data(self):
+        # Fetch every ticker's history in one batch, then compute the indicators for all
+        # tickers at once on the panel
+        with tracing.span('fetch.history', tickers=len(self.tickers), period=self.time_period):
+            histories = self.provider.fetch_history(self.tickers, self.time_period)
         for ticker in self.tickers:
-            self.analyze_ticker(ticker)
-
+            hist = histories.get(ticker)
+            if hist is None or hist.empty:
+                print(f"No data for {ticker}, skipping.")
+                continue
+            self.histories[ticker] = hist
+        self.build_panel()
 
+    def detect_signals(self, sma_windows=(50, 200)):
+        # Event table of MACD, RSI, stochastic and SMA signals for every analysed ticker
+        return self.panel.detect_signals(sma_windows)
@@ -0,0 +1,126 @@
+import os
+import queue
+import threading
+import tracing
+
+
+def page_summary(job):
+    # Short per-ticker result shown in the GUI as soon as the ticker's pages are done
+    summary = f"RSI {job['rsi'].iloc[-1]:.0f}"
+    macd_events = job['events'][job['events']['Indicator'] == 'MACD']
+    if not macd_events.empty:
+        summary += f", MACD {macd_events.iloc[-1]['Signal']}"
+    return summary
+
+
+class AnalysisServices:
+    # Caches, data provider and renderer shared by successive jobs. They are created on
+    # first use, from the job thread, so starting the GUI doesn't pay for importing
+    # pandas, matplotlib or yfinance. output_format "html" renders cached per-ticker
+    # images and an HTML index instead of a single PDF.
+    def __init__(self, cache_dir="cache", workers=None, data_provider=None, output_format="pdf"):
+        self.cache_dir = cache_dir
+        self.output_format = output_format
+        self.workers = workers if workers is not None else os.cpu_count()
+        # A provider passed in (e.g. a FileDataProvider for offline runs) is used as is
+        self.data_provider = data_provider
+        self.timeframes = None
+        self.fundamentals_cache = None
+        self.renderer = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        with self.lock:
+            if self.renderer is None:
+                from data_provider import YahooDataProvider
+                from history_cache import CachedDataProvider, HistoryCache
+                from fundamentals_cache import FundamentalsCache
+                from timeframes import TimeframeService
+                from report_renderer import ReportRenderer
+
+                if self.data_provider is None:
+                    # Price histories are cached on disk so repeated runs only fetch new bars
+                    self.data_provider = CachedDataProvider(YahooDataProvider(),
+                                                            HistoryCache(os.path.join(self.cache_dir, "history")))
+                # The longest history is held in memory; other periods and intervals are sliced
+                # and resampled from it, with their indicators memoized
+                self.timeframes = TimeframeService(self.data_provider)
+                self.fundamentals_cache = FundamentalsCache(os.path.join(self.cache_dir, "fundamentals.sqlite"))
+                if self.output_format == "html":
+                    from render_cache import DashboardRenderer
+                    self.renderer = DashboardRenderer(os.path.join(self.cache_dir, "pages"), workers=self.workers)
+                else:
+                    # Report pages are rendered in a process pool, one worker per core by default
+                    self.renderer = ReportRenderer(workers=self.workers)
+        return self
+
+
+class AnalysisJob:
+    # Runs fundamentals, price history, indicators and the PDF render on a background
+    # thread. Progress is posted to `messages` as tuples for the Tk main loop to poll:
+    #   ('status', text), ('progress', ticker, done, total, summary),
+    #   ('skipped', {ticker: reason}), ('warnings', {ticker: reason}), ('done', path),
+    #   ('cancelled', path or None), ('error', text)
+    # Skipped tickers get no page; tickers with warnings are drawn with data missing.
+    def __init__(self, tickers, time_period, services, output_path, refresh_fundamentals=False, interval="1d"):
+        self.tickers = list(tickers)
+        self.time_period = time_period
+        self.interval = interval
+        self.services = services
+        self.output_path = output_path
+        self.refresh_fundamentals = refresh_fundamentals
+        self.messages = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def is_alive(self):
+        return self.thread.is_alive()
+
+    def post(self, *message):
+        self.messages.put(message)
+
+    def run(self):
+        with tracing.span('job', tickers=len(self.tickers), period=self.time_period):
+            self.run_stages()
+
+    def run_stages(self):
+        try:
+            self.post('status', "Loading...")
+            from pipeline import AnalysisPipeline
+            services = self.services.load()
+
+            # Fetching, indicators and rendering overlap: pages are drawn while later
+            # tickers are still downloading
+            self.post('status', "Analysing...")
+            pipeline = AnalysisPipeline(self.tickers, self.time_period, services.timeframes, services.data_provider,
+                                        fundamentals_cache=services.fundamentals_cache,
+                                        refresh_fundamentals=self.refresh_fundamentals, interval=self.interval,
+                                        cancelled=self.cancelled, on_skipped=lambda skipped: self.post('skipped', skipped),
+                                        on_warnings=lambda warnings: self.post('warnings', warnings))
+            done = []
+
+            def on_page(job):
+                done.append(job['ticker'])
+                self.post('progress', job['ticker'], len(done), pipeline.expected_pages, page_summary(job))
+
+            with tracing.span('stage.pipeline', tickers=len(self.tickers)):
+                rendered = services.renderer.render(pipeline.page_jobs(), self.output_path, on_page=on_page,
+                                                    cancelled=self.cancelled)
+            pipeline.stop()
+            if pipeline.error is not None:
+                raise pipeline.error
+            if self.cancelled():
+                self.post('cancelled', self.output_path if rendered else None)
+            else:
+                self.post('done', self.output_path)
+        except Exception as e:
+            self.post('error', str(e))
@@ -0,0 +1,286 @@
+import argparse
+import concurrent.futures
+import os
+import sys
+import numpy as np
+from signals import cross_above, cross_below
+
+# Bars per year, for annualising returns, volatility and turnover of daily bars
+BARS_PER_YEAR = 252
+
+METRIC_COLUMNS = ['Strategy', 'Ticker', 'Bars', 'Total Return', 'Buy and Hold', 'CAGR', 'Volatility', 'Sharpe',
+                  'Max Drawdown', 'Exposure', 'Trades', 'Hit Rate', 'Turnover']
+
+
+def hold_between(entries, exits):
+    # Position array that is 1 from each entry until the next exit and 0 otherwise,
+    # for every column at once: the latest event on or before each bar wins
+    state = np.where(entries, 1.0, np.where(exits, 0.0, np.nan))
+    rows = np.arange(len(state))[:, None]
+    last = np.maximum.accumulate(np.where(np.isnan(state), -1, rows), axis=0)
+    filled = np.take_along_axis(state, np.maximum(last, 0), axis=0)
+    return np.where(last >= 0, filled, 0.0)
+
+
+class RSIStrategy:
+    # The report's RSI reading: buy when RSI drops below `low` ("Potential Buy"), sell when
+    # it rises above `high` ("Potential Sell")
+    def __init__(self, low=30, high=70):
+        self.low = low
+        self.high = high
+        self.name = f"RSI {low}/{high}"
+        self.sma_windows = ()
+
+    def positions(self, panel):
+        rsi = panel.indicators['RSI_14']
+        return hold_between(cross_below(rsi, np.full_like(rsi, self.low)),
+                            cross_above(rsi, np.full_like(rsi, self.high)))
+
+
+class MACDStrategy:
+    # Long from a MACD Buy crossover (MACD crosses above its signal line) until the next Sell
+    def __init__(self):
+        self.name = "MACD crossover"
+        self.sma_windows = ()
+
+    def positions(self, panel):
+        macd = panel.indicators['MACD_12_26_9']
+        signal = panel.indicators['MACDs_12_26_9']
+        return hold_between(cross_above(macd, signal), cross_below(macd, signal))
+
+
+class SMAStrategy:
+    # The indicators.py screen: long while the close is above both the short and long SMA
+    def __init__(self, short=50, long=200):
+        self.short = short
+        self.long = long
+        self.name = f"Above SMA {short}/{long}"
+        self.sma_windows = (short, long)
+
+    def positions(self, panel):
+        close = panel.data['Close']
+        with np.errstate(invalid='ignore'):
+            above = (close > panel.indicators[f'SMA_{self.short}']) & (close > panel.indicators[f'SMA_{self.long}'])
+        return above.astype(float)
+
+
+DEFAULT_STRATEGIES = [RSIStrategy(), MACDStrategy(), SMAStrategy()]
+
+
+def trade_returns(positions, log_returns):
+    # Compounded return of every completed or open trade, as (column, return) arrays.
+    # A trade is a run of bars held long; bars are numbered per column with one id per run.
+    held = positions > 0
+    entries = held & ~np.vstack([np.zeros((1, held.shape[1]), bool), held[:-1]])
+    trade_ids = np.cumsum(entries, axis=0) * held
+    trades_per_column = trade_ids.max(axis=0, initial=0)
+    offsets = np.concatenate([[0], np.cumsum(trades_per_column)[:-1]])
+    flat_ids = np.where(held, trade_ids - 1 + offsets, -1).ravel()
+    selected = flat_ids >= 0
+    totals = np.bincount(flat_ids[selected], weights=log_returns.ravel()[selected],
+                         minlength=int(trades_per_column.sum()))
+    columns = np.repeat(np.arange(held.shape[1]), trades_per_column)
+    return columns, np.expm1(totals)
+
+
+def evaluate(panel, positions, cost=0.0, lag=1):
+    # Metrics per ticker for a (time x ticker) target position array, vectorized over
+    # tickers. Bar t earns the close-to-close return from t - 1 to t on the position of bar
+    # t - lag, so with the default lag=1 a position is entered or left at the close of the
+    # signal bar itself and lag=2 trades at the next close. Each unit of position change
+    # costs `cost` (0.001 = 10 bp).
+    close = panel.data['Close']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = close[1:] / close[:-1] - 1
+    returns = np.vstack([np.full((1, close.shape[1]), np.nan), returns])
+    valid = ~np.isnan(returns)
+    returns = np.where(valid, returns, 0.0)
+
+    positions = np.where(panel.mask, np.nan_to_num(positions), 0.0)
+    held = np.zeros_like(positions)
+    held[lag:] = positions[:len(positions) - lag] if lag else positions
+    changes = np.abs(np.diff(held, axis=0, prepend=0.0))
+    strategy = held * returns - cost * changes
+
+    bars = valid.sum(axis=0)
+    years = np.maximum(bars, 1) / BARS_PER_YEAR
+    log_growth = np.log1p(strategy)
+    total = np.expm1(log_growth.sum(axis=0))
+    equity = np.exp(np.cumsum(log_growth, axis=0))
+    drawdown = equity / np.maximum.accumulate(equity, axis=0) - 1
+    mean = strategy.sum(axis=0) / np.maximum(bars, 1)
+    variance = (np.where(valid, strategy - mean, 0.0) ** 2).sum(axis=0) / np.maximum(bars - 1, 1)
+    volatility = np.sqrt(variance * BARS_PER_YEAR)
+
+    columns, trade_total = trade_returns(held, np.log1p(held * returns))
+    trades = np.bincount(columns, minlength=len(panel.tickers))
+    wins = np.bincount(columns, weights=trade_total > 0, minlength=len(panel.tickers))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            'Ticker': panel.tickers,
+            'Bars': bars,
+            'Total Return': total,
+            'Buy and Hold': np.expm1(np.log1p(returns).sum(axis=0)),
+            'CAGR': np.expm1(np.log1p(total) / years),
+            'Volatility': volatility,
+            'Sharpe': np.where(volatility > 0, mean * BARS_PER_YEAR / volatility, np.nan),
+            'Max Drawdown': drawdown.min(axis=0, initial=0.0),
+            'Exposure': (held > 0).sum(axis=0) / np.maximum(bars, 1),
+            'Trades': trades,
+            'Hit Rate': np.where(trades > 0, wins / trades, np.nan),
+            'Turnover': changes.sum(axis=0) / years,
+        }
+
+
+def backtest_panel(panel, strategies, cost=0.0, lag=1):
+    # Runs every strategy over one panel and returns the metrics table
+    import pandas as pd
+
+    windows = sorted({window for strategy in strategies for window in strategy.sma_windows} | {50, 200})
+    if not panel.indicators:
+        panel.compute_indicators(tuple(windows))
+    frames = []
+    for strategy in strategies:
+        frame = pd.DataFrame(evaluate(panel, strategy.positions(panel), cost, lag))
+        frame.insert(0, 'Strategy', strategy.name)
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=METRIC_COLUMNS)
+    return pd.concat(frames, ignore_index=True)[METRIC_COLUMNS]
+
+
+def backtest_stored(directory, tickers, time_period, strategies, cost=0.0, lag=1):
+    # Worker side of a store-backed run: maps the store once per process and builds the
+    # panel from it, so no price data goes through the pool
+    from history_store import shared_store
+
+    return backtest_panel(shared_store(directory).panel(tickers, time_period), strategies, cost, lag)
+
+
+class Backtester:
+    # Backtests the built-in signals over a universe. Histories are fetched in chunks of
+    # `chunk_size` tickers; each chunk becomes one (time x ticker) panel that is evaluated
+    # in a single vectorized pass, in a process pool when workers > 1.
+    def __init__(self, provider, strategies=None, time_period="5y", cost=0.0, lag=1, chunk_size=500, workers=1):
+        self.provider = provider
+        self.strategies = strategies if strategies is not None else DEFAULT_STRATEGIES
+        self.time_period = time_period
+        self.cost = cost
+        self.lag = lag
+        self.chunk_size = chunk_size
+        self.workers = workers
+
+    def chunks(self, universe):
+        return [universe[start:start + self.chunk_size] for start in range(0, len(universe), self.chunk_size)]
+
+    def panels(self, universe):
+        from panel import IndicatorPanel
+
+        # A store-backed provider builds panels straight from the mapped store
+        store = getattr(self.provider, 'store', None)
+        for chunk in self.chunks(universe):
+            if store is not None:
+                panel = store.panel(chunk, self.time_period)
+            else:
+                panel = IndicatorPanel.from_histories(self.provider.fetch_history(chunk, self.time_period), chunk)
+            if panel.tickers:
+                yield panel
+
+    def run(self, universe):
+        import pandas as pd
+
+        universe = list(dict.fromkeys(universe))
+        frames = []
+        store = getattr(self.provider, 'store', None)
+        if self.workers > 1:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=self.workers) as executor:
+                # With a store the workers map it themselves and only get the ticker names,
+                # otherwise each chunk's panel is sent over
+                tasks = self.chunks(universe) if store is not None else self.panels(universe)
+                pending = set()
+                for task in tasks:
+                    # At most two chunks per worker wait in memory
+                    while len(pending) >= 2 * self.workers:
+                        finished, pending = concurrent.futures.wait(
+                            pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                        frames.extend(future.result() for future in finished)
+                    if store is not None:
+                        future = executor.submit(backtest_stored, store.directory, task, self.time_period,
+                                                 self.strategies, self.cost, self.lag)
+                    else:
+                        future = executor.submit(backtest_panel, task, self.strategies, self.cost, self.lag)
+                    pending.add(future)
+                frames.extend(future.result() for future in pending)
+        else:
+            frames = [backtest_panel(panel, self.strategies, self.cost, self.lag) for panel in self.panels(universe)]
+
+        if not frames:
+            return pd.DataFrame(columns=METRIC_COLUMNS)
+        order = {ticker: index for index, ticker in enumerate(universe)}
+        table = pd.concat(frames, ignore_index=True)
+        table['order'] = table['Ticker'].map(order)
+        strategy_order = {strategy.name: index for index, strategy in enumerate(self.strategies)}
+        table['strategy_order'] = table['Strategy'].map(strategy_order)
+        return table.sort_values(['strategy_order', 'order']).drop(columns=['order', 'strategy_order'])\
+            .reset_index(drop=True)
+
+    def summary(self, table):
+        # Median of each metric per strategy across the tickers
+        metrics = table.drop(columns=['Ticker']).groupby('Strategy', sort=False)
+        summary = metrics.median(numeric_only=True)
+        summary['Tickers'] = metrics.size()
+        return summary
+
+
+def universe_and_provider(args, parser):
+    # The tickers and price source selected by the --synthetic / universe / --store /
+    # --data-dir / --cache-dir arguments. With --store and no universe file every ticker
+    # in the store is used.
+    if getattr(args, 'store', None):
+        from history_store import HistoryStore, StoreDataProvider
+        store = HistoryStore(args.store)
+        if args.universe:
+            from batch_report import read_tickers
+            return read_tickers(args.universe), StoreDataProvider(store)
+        return store.tickers(), StoreDataProvider(store)
+    if args.synthetic:
+        from synthetic_data import SyntheticDataProvider, synthetic_tickers
+        return synthetic_tickers(args.synthetic), SyntheticDataProvider()
+    if not args.universe:
+        parser.error("a universe file is required unless --synthetic is given")
+    from batch_report import read_tickers
+    universe = read_tickers(args.universe)
+    if args.data_dir:
+        from data_provider import FileDataProvider
+        return universe, FileDataProvider(args.data_dir)
+    from data_provider import YahooDataProvider
+    from history_cache import CachedDataProvider, HistoryCache
+    return universe, CachedDataProvider(YahooDataProvider(), HistoryCache(os.path.join(args.cache_dir, "history")))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest the RSI, MACD and SMA signals over a universe.")
+    parser.add_argument('universe', nargs='?', help="file with the tickers to test")
+    parser.add_argument('--period', default='5y')
+    parser.add_argument('--cost', type=float, default=0.0, help="cost per unit of position change, 0.001 = 10bp")
+    parser.add_argument('--data-dir', help="read prices from <TICKER>.csv files")
+    parser.add_argument('--store', help="read prices from a history_store.py directory")
+    parser.add_argument('--cache-dir', default='cache', help="price cache used when downloading")
+    parser.add_argument('--synthetic', type=int, metavar='COUNT', help="test on COUNT synthetic tickers")
+    parser.add_argument('--chunk-size', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--output', default='backtest_results.csv')
+    args = parser.parse_args(argv)
+
+    universe, provider = universe_and_provider(args, parser)
+    backtester = Backtester(provider, time_period=args.period, cost=args.cost, chunk_size=args.chunk_size,
+                            workers=args.workers)
+    table = backtester.run(universe)
+    table.to_csv(args.output, index=False)
+    print(backtester.summary(table).to_string(float_format=lambda value: f"{value:.3f}"))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,146 @@
+import argparse
+import os
+import queue
+import sys
+import tracing
+from analysis_worker import AnalysisJob, AnalysisServices
+
+# Exit codes for schedulers such as cron
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_PARTIAL = 3  # report written, but some tickers were skipped (no pages)
+
+
+def read_tickers(path):
+    # One ticker per line (or comma separated); blank lines and # comments are ignored
+    tickers = []
+    with open(path, 'r') as file:
+        for line in file:
+            line = line.split('#', 1)[0]
+            tickers.extend(ticker.strip().upper() for ticker in line.split(',') if ticker.strip())
+    return tickers
+
+
+def run_report(tickers, time_period, output_dir, workers=None, data_dir=None, cache_dir="cache",
+               refresh_fundamentals=False, log=print, trace_path=None, metrics_path=None, output_format="pdf",
+               assemble_pdf=False, interval="1d"):
+    # Runs the same pipeline as the GUI's Analyze button without Tk and returns an exit code.
+    # With trace_path / metrics_path the run's spans and counters are written as JSON
+    # lines and in the Prometheus text format. output_format "html" writes index.html and
+    # cached page images, only redrawing tickers whose data changed; assemble_pdf then also
+    # builds the PDF from those images.
+    provider = None
+    if data_dir:
+        from data_provider import FileDataProvider
+        provider = FileDataProvider(data_dir)
+
+    os.makedirs(output_dir, exist_ok=True)
+    output_path = os.path.join(output_dir, 'index.html' if output_format == "html" else 'analysis_results.pdf')
+    services = AnalysisServices(cache_dir, workers=workers, data_provider=provider, output_format=output_format)
+    job = AnalysisJob(tickers, time_period, services, output_path, refresh_fundamentals=refresh_fundamentals,
+                      interval=interval)
+    if trace_path or metrics_path:
+        tracing.tracer.enable()
+    job.start()
+    status = wait_for_job(job, tickers, log)
+
+    if output_format == "html" and status != EXIT_FAILED:
+        log(f"{services.renderer.skipped} unchanged tickers reused their cached pages")
+        if assemble_pdf:
+            pdf_path = services.renderer.assemble_pdf(os.path.join(output_dir, 'analysis_results.pdf'))
+            log(f"PDF assembled at {pdf_path}")
+
+    if trace_path or metrics_path:
+        job.thread.join()
+        if trace_path:
+            tracing.tracer.write_jsonl(trace_path)
+        if metrics_path:
+            tracing.tracer.write_prometheus(metrics_path)
+        for name, (calls, seconds, longest) in sorted(tracing.tracer.summary().items()):
+            log(f"{name:24s} {calls:6d} calls {seconds:9.3f}s total {longest:8.3f}s max")
+    return status
+
+
+def wait_for_job(job, tickers, log):
+    # The exit code depends on the pages actually drawn: tickers with warnings (e.g. no
+    # fundamentals) still have theirs, skipped tickers don't
+    skipped = {}
+    rendered = 0
+    while True:
+        try:
+            message = job.messages.get(timeout=0.5)
+        except queue.Empty:
+            continue
+        except KeyboardInterrupt:
+            log("Cancelling...")
+            job.cancel()
+            continue
+
+        kind = message[0]
+        if kind == 'status':
+            log(message[1])
+        elif kind == 'progress':
+            ticker, done, total, summary = message[1:]
+            rendered = done
+            log(f"[{done}/{total}] {ticker}: {summary}")
+        elif kind == 'skipped':
+            skipped.update(message[1])
+            for ticker, reason in message[1].items():
+                log(f"Skipped {ticker}: {reason}")
+        elif kind == 'warnings':
+            for ticker, reason in message[1].items():
+                log(f"Warning {ticker}: {reason}")
+        elif kind == 'done':
+            if not rendered:
+                log("No tickers could be analysed")
+                return EXIT_FAILED
+            log(f"Report written to {message[1]}")
+            return EXIT_PARTIAL if skipped else EXIT_OK
+        elif kind == 'cancelled':
+            log("Cancelled")
+            return EXIT_FAILED
+        elif kind == 'error':
+            log(f"Error: {message[1]}")
+            return EXIT_FAILED
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the analysis report without the GUI.")
+    parser.add_argument('tickers', nargs='*', help="tickers to analyse")
+    parser.add_argument('--file', help="file with tickers, one per line or comma separated")
+    parser.add_argument('--period', default='1y', choices=["3mo", "6mo", "1y", "2y", "5y", "10y", "ytd", "max"])
+    parser.add_argument('--interval', default='1d', choices=["1d", "1wk", "1mo"], help="bar size")
+    parser.add_argument('--output-dir', default='.')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="report rendering processes")
+    parser.add_argument('--data-dir', help="read prices and fundamentals from local files instead of Yahoo Finance")
+    parser.add_argument('--cache-dir', default='cache')
+    parser.add_argument('--refresh-fundamentals', action='store_true')
+    parser.add_argument('--format', choices=["pdf", "html"], default="pdf",
+                        help="html writes index.html with cached per-ticker images instead of one PDF")
+    parser.add_argument('--assemble-pdf', action='store_true', help="with --format html, also build the PDF from the cached pages")
+    parser.add_argument('--trace', help="write timing spans and counters to this JSON lines file")
+    parser.add_argument('--metrics', help="write the timings and counters in Prometheus text format to this file")
+    args = parser.parse_args(argv)
+
+    tickers = [ticker.upper() for ticker in args.tickers]
+    if args.file:
+        try:
+            tickers += read_tickers(args.file)
+        except OSError as e:
+            print(f"Error: could not read {args.file}: {e}")
+            return EXIT_USAGE
+    tickers = list(dict.fromkeys(tickers))
+    if not tickers:
+        parser.print_usage()
+        print("Error: no tickers given")
+        return EXIT_USAGE
+
+    return run_report(tickers, args.period, args.output_dir, workers=args.workers, data_dir=args.data_dir,
+                      cache_dir=args.cache_dir, refresh_fundamentals=args.refresh_fundamentals,
+                      trace_path=args.trace, metrics_path=args.metrics, output_format=args.format,
+                      assemble_pdf=args.assemble_pdf, interval=args.interval)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
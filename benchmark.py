@@ -0,0 +1,238 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+TICKER_COUNTS = [10, 100, 1000, 10000]
+PERIODS = ["3mo", "6mo", "1y", "2y", "5y", "10y", "max"]
+STAGES = ["investment_analysis", "fundamental_analysis", "macd_crossovers", "page_render"]
+
+
+class PreparedDataProvider:
+    # Serves histories and info dicts generated before the timer starts, so a stage's
+    # timing covers our analysis and not the synthetic data generation
+    def __init__(self, histories=None, infos=None):
+        self.histories = histories or {}
+        self.infos = infos or {}
+
+    def fetch_history(self, tickers, period, interval="1d", start=None):
+        return {ticker: self.histories[ticker] for ticker in tickers if ticker in self.histories}
+
+    def fetch_info(self, ticker):
+        return self.infos[ticker]
+
+
+def prepare_histories(tickers, period, synthetic):
+    return PreparedDataProvider(histories=synthetic.fetch_history(tickers, period))
+
+
+def prepare_infos(tickers, synthetic):
+    return PreparedDataProvider(infos={ticker: synthetic.fetch_info(ticker) for ticker in tickers})
+
+
+def bench_investment_analysis(tickers, period, provider):
+    from Stocks import InvestmentAnalyzer
+
+    analyzer = InvestmentAnalyzer(tickers, period, provider=provider)
+    analyzer.analyze_data()
+    return len(tickers)
+
+
+def bench_fundamental_analysis(tickers, period, provider):
+    from Fundamental_analysis import FundamentalAnalyzer
+    from fetch_scheduler import FetchScheduler
+
+    # No rate limit: this measures our own overhead, not the remote service
+    analyzer = FundamentalAnalyzer(tickers, provider=provider, scheduler=FetchScheduler(rate=None))
+    analyzer.analyze_data()
+    return len(tickers)
+
+
+def prepare_macd(tickers, period, provider):
+    from Stocks import InvestmentAnalyzer
+
+    analyzer = InvestmentAnalyzer(tickers, period, provider=provider)
+    analyzer.analyze_data()
+    return analyzer.panel
+
+
+def bench_macd_crossovers(panel):
+    from signals import detect_signals
+
+    detect_signals(panel.event_times(), panel.tickers, macd=panel.indicators['MACD_12_26_9'],
+                   macd_signal=panel.indicators['MACDs_12_26_9'])
+    return len(panel.tickers)
+
+
+def prepare_render(tickers, period, synthetic, sample):
+    from Stocks import InvestmentAnalyzer
+    from Fundamental_analysis import FundamentalAnalyzer
+    from fetch_scheduler import FetchScheduler
+    from report_renderer import build_page_jobs
+
+    tickers = tickers[:sample]
+    analyzer = InvestmentAnalyzer(tickers, period, provider=synthetic)
+    analyzer.analyze_data()
+    fundamentals = FundamentalAnalyzer(tickers, provider=synthetic, scheduler=FetchScheduler(rate=None)).analyze_data()
+    return build_page_jobs(tickers, fundamentals, analyzer, analyzer.detect_signals(), period)
+
+
+def bench_page_render(jobs):
+    from matplotlib.backends.backend_pdf import PdfPages
+    from report_renderer import PageTemplates
+
+    templates = PageTemplates()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with PdfPages(os.path.join(tmp_dir, 'bench.pdf')) as pdf:
+            for job in jobs:
+                templates.render(pdf, job)
+    templates.close()
+    return len(jobs)
+
+
+def measure(func, *args, repeat=1):
+    # Best wall time over `repeat` untraced runs, then one run under tracemalloc for the
+    # peak allocation (tracing slows Python code down too much to time it at the same time)
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, best, peak
+
+
+def run_benchmarks(ticker_counts, periods, stages, repeat=1, max_cells=20_000_000, render_sample=20, seed=0,
+                   log=print):
+    from synthetic_data import PERIOD_BARS, SyntheticDataProvider, synthetic_tickers
+
+    synthetic = SyntheticDataProvider(seed)
+    results = []
+    for period in periods:
+        for count in ticker_counts:
+            tickers = synthetic_tickers(count)
+            cells = count * PERIOD_BARS[period]
+            for stage in stages:
+                if stage == 'fundamental_analysis' and period != periods[0]:
+                    continue  # fundamentals don't depend on the period
+                if stage != 'fundamental_analysis' and cells > max_cells:
+                    log(f"skip {stage:22s} {count:>6d} tickers {period:>4s} ({cells:,} cells > --max-cells)")
+                    continue
+
+                # The synthetic data is generated up front, only the stage itself is timed
+                if stage == 'investment_analysis':
+                    provider = prepare_histories(tickers, period, synthetic)
+                    processed, seconds, peak = measure(bench_investment_analysis, tickers, period, provider,
+                                                       repeat=repeat)
+                elif stage == 'fundamental_analysis':
+                    provider = prepare_infos(tickers, synthetic)
+                    processed, seconds, peak = measure(bench_fundamental_analysis, tickers, period, provider,
+                                                       repeat=repeat)
+                elif stage == 'macd_crossovers':
+                    panel = prepare_macd(tickers, period, prepare_histories(tickers, period, synthetic))
+                    processed, seconds, peak = measure(bench_macd_crossovers, panel, repeat=repeat)
+                else:
+                    jobs = prepare_render(tickers, period, synthetic, render_sample)
+                    processed, seconds, peak = measure(bench_page_render, jobs, repeat=repeat)
+
+                result = {
+                    'stage': stage,
+                    'tickers': count,
+                    'period': period,
+                    'processed': processed,
+                    'seconds': seconds,
+                    'per_second': processed / seconds if seconds else None,
+                    'peak_mb': peak / 2 ** 20,
+                }
+                results.append(result)
+                log(f"{stage:22s} {count:>6d} tickers {period:>4s} {seconds:9.3f}s "
+                    f"{result['per_second']:10.1f}/s {result['peak_mb']:9.1f} MB")
+    return results
+
+
+def result_key(result):
+    return result['stage'], result['tickers'], result['period']
+
+
+def find_regressions(results, baseline, tolerance):
+    # Results more than `tolerance` slower (or bigger) than the matching baseline entry
+    previous = {result_key(result): result for result in baseline['results']}
+    regressions = []
+    for result in results:
+        old = previous.get(result_key(result))
+        if old is None:
+            continue
+        for metric in ('seconds', 'peak_mb'):
+            if old[metric] and result[metric] > old[metric] * (1 + tolerance):
+                regressions.append((result, metric, old[metric]))
+    return regressions
+
+
+def environment():
+    import numpy
+    import pandas
+    import matplotlib
+
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': numpy.__version__,
+        'pandas': pandas.__version__,
+        'matplotlib': matplotlib.__version__,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the analysis stages on synthetic data (no network).")
+    parser.add_argument('--tickers', type=int, nargs='+', default=TICKER_COUNTS)
+    parser.add_argument('--periods', nargs='+', default=PERIODS, choices=PERIODS)
+    parser.add_argument('--stages', nargs='+', default=STAGES, choices=STAGES)
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--max-cells', type=int, default=20_000_000,
+                        help="skip runs with more tickers x bars than this")
+    parser.add_argument('--render-sample', type=int, default=20, help="pages rendered per page_render run")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', help="compare against this results file")
+    parser.add_argument('--save-baseline', help="also write the results to this baseline file")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown before flagging, 0.25 = 25%%")
+    args = parser.parse_args(argv)
+
+    # Read the baseline before anything is written, it may be the file being replaced
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r') as file:
+            baseline = json.load(file)
+
+    import matplotlib
+    matplotlib.use('Agg')
+
+    results = run_benchmarks(args.tickers, args.periods, args.stages, args.repeat, args.max_cells,
+                             args.render_sample, args.seed)
+    report = {'environment': environment(), 'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'results': results}
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, 'w') as file:
+            json.dump(report, file, indent=2)
+
+    if baseline is not None:
+        regressions = find_regressions(results, baseline, args.tolerance)
+        for result, metric, old in regressions:
+            print(f"REGRESSION {result['stage']} {result['tickers']} tickers {result['period']}: "
+                  f"{metric} {result[metric]:.3f} vs baseline {old:.3f}")
+        if regressions:
+            return 1
+        print("No regressions against the baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
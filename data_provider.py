@@ -0,0 +1,163 @@
+import json
+import os
+import random
+import threading
+import time
+import pandas as pd
+
+
+# Offsets used to turn a yfinance style period ("6mo", "1y", ...) into a start date
+PERIOD_OFFSETS = {
+    "1d": pd.DateOffset(days=1),
+    "5d": pd.DateOffset(days=5),
+    "1mo": pd.DateOffset(months=1),
+    "3mo": pd.DateOffset(months=3),
+    "6mo": pd.DateOffset(months=6),
+    "1y": pd.DateOffset(years=1),
+    "2y": pd.DateOffset(years=2),
+    "5y": pd.DateOffset(years=5),
+    "10y": pd.DateOffset(years=10),
+}
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def period_start(end, period):
+    # Returns the first timestamp covered by `period` when the history ends at `end`,
+    # or None for "max"
+    if period == "max":
+        return None
+    if period == "ytd":
+        return end.normalize().replace(month=1, day=1)
+    if period not in PERIOD_OFFSETS:
+        raise ValueError(f"Unknown period: {period}")
+    return end.normalize() - PERIOD_OFFSETS[period]
+
+
+def slice_period(hist, period):
+    if hist.empty or period == "max":
+        return hist
+    start = period_start(hist.index[-1], period)
+    return hist[hist.index >= start]
+
+
+class DataProvider:
+    # Base class for anything that can supply price history for a batch of tickers.
+    # fetch_history returns a dict of ticker -> OHLCV DataFrame; tickers without
+    # data are left out of the result.
+    def fetch_history(self, tickers, period, interval="1d", start=None):
+        raise NotImplementedError
+
+    # Returns the yfinance style .info dict for one ticker, raising on failure
+    def fetch_info(self, ticker):
+        raise NotImplementedError
+
+
+class YahooDataProvider(DataProvider):
+    def __init__(self, threads=True):
+        self.threads = threads
+
+    def fetch_history(self, tickers, period, interval="1d", start=None):
+        import yfinance as yf
+
+        tickers = list(tickers)
+        if not tickers:
+            return {}
+
+        # One bulk download for the whole batch instead of one request per ticker
+        kwargs = {'start': start} if start is not None else {'period': period}
+        data = yf.download(tickers, interval=interval, group_by='ticker', auto_adjust=True,
+                           actions=True, threads=self.threads, progress=False, **kwargs)
+
+        results = {}
+        for ticker in tickers:
+            if isinstance(data.columns, pd.MultiIndex):
+                if ticker not in data.columns.get_level_values(0):
+                    continue
+                hist = data[ticker]
+            else:
+                hist = data
+            hist = hist.dropna(how='all')
+            if not hist.empty:
+                results[ticker] = hist
+        return results
+
+    def fetch_info(self, ticker):
+        import yfinance as yf
+
+        return yf.Ticker(ticker).info
+
+
+class FileDataProvider(DataProvider):
+    # Reads <TICKER>.csv files (Date index plus OHLCV columns) from a local directory,
+    # so the analysis can run offline or against test fixtures
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path_for(self, ticker, interval="1d"):
+        name = ticker if interval == "1d" else f"{ticker}_{interval}"
+        return os.path.join(self.directory, f"{name}.csv")
+
+    def fetch_history(self, tickers, period, interval="1d", start=None):
+        results = {}
+        for ticker in tickers:
+            path = self.path_for(ticker, interval)
+            if not os.path.exists(path):
+                continue
+            hist = pd.read_csv(path, index_col=0, parse_dates=True)
+            if not isinstance(hist.index, pd.DatetimeIndex):
+                # Timestamps saved with a UTC offset come back as strings
+                hist.index = pd.to_datetime(hist.index, utc=True)
+            if start is not None:
+                hist = hist[hist.index >= start]
+            else:
+                hist = slice_period(hist, period)
+            if not hist.empty:
+                results[ticker] = hist
+        return results
+
+    def save_history(self, ticker, hist, interval="1d"):
+        os.makedirs(self.directory, exist_ok=True)
+        hist.to_csv(self.path_for(ticker, interval))
+
+    # Fundamentals are stored next to the prices as <TICKER>.info.json
+    def fetch_info(self, ticker):
+        path = os.path.join(self.directory, f"{ticker}.info.json")
+        if not os.path.exists(path):
+            raise KeyError(f"No fundamentals for {ticker}")
+        with open(path, 'r') as file:
+            return json.load(file)
+
+    def save_info(self, ticker, info):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, f"{ticker}.info.json"), 'w') as file:
+            json.dump(info, file)
+
+
+class FakeDataProvider(DataProvider):
+    # Wraps another provider and injects random latency and failures, for exercising
+    # the fetch scheduler and caches without touching the network
+    def __init__(self, provider, latency=(0.0, 0.05), error_rate=0.1, seed=None):
+        self.provider = provider
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    def simulate(self, what):
+        with self.lock:
+            self.calls += 1
+            delay = self.random.uniform(*self.latency)
+            fail = self.random.random() < self.error_rate
+        time.sleep(delay)
+        if fail:
+            raise ConnectionError(f"Injected failure fetching {what}")
+
+    def fetch_history(self, tickers, period, interval="1d", start=None):
+        self.simulate(f"history for {len(tickers)} tickers")
+        return self.provider.fetch_history(tickers, period, interval, start=start)
+
+    def fetch_info(self, ticker):
+        self.simulate(f"info for {ticker}")
+        return self.provider.fetch_info(ticker)
@@ -0,0 +1,102 @@
+import numpy as np
+
+
+def axes_points(ax, per_pixel=2):
+    # Number of points worth drawing across an axes: a couple per horizontal pixel at
+    # the figure's dpi. More than that only makes the output bigger.
+    return max(int(ax.bbox.width * per_pixel), 2)
+
+
+def bucket_rows(values, buckets, fill):
+    # Pads `values` with `fill` and reshapes it to (buckets, size)
+    size = -(-len(values) // buckets)
+    padded = np.full(buckets * size, fill, dtype=float)
+    padded[:len(values)] = values
+    return padded.reshape(buckets, size), size
+
+
+def minmax_indices(values, points):
+    # Indices of the minimum and maximum of each of points / 2 equal buckets, plus the
+    # first and last point, in order. Keeps every spike and trough a line would show.
+    n = len(values)
+    if n <= points:
+        return np.arange(n)
+    buckets = max(points // 2, 1)
+    values = np.asarray(values, dtype=float)
+    low, size = bucket_rows(np.where(np.isnan(values), np.inf, values), buckets, np.inf)
+    high, _ = bucket_rows(np.where(np.isnan(values), -np.inf, values), buckets, -np.inf)
+    offsets = np.arange(buckets)[:, None] * size
+    pairs = np.sort(np.column_stack([low.argmin(axis=1), high.argmax(axis=1)]), axis=1) + offsets
+    indices = np.concatenate([[0], pairs.ravel(), [n - 1]])
+    return np.unique(np.minimum(indices, n - 1))
+
+
+def lttb_indices(x, y, points):
+    # Largest-Triangle-Three-Buckets: keeps the point of each bucket that forms the largest
+    # triangle with the previously kept point and the next bucket's average. NaN points
+    # are left out, the line isn't drawn there anyway.
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    finite = np.flatnonzero(np.isfinite(y))
+    n = len(finite)
+    if n <= points or points < 3:
+        return finite
+    fx = x[finite]
+    fy = y[finite]
+    edges = np.linspace(1, n - 1, points - 1).astype(int)
+    selected = np.empty(points, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+    kept = 0
+    for bucket in range(points - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        next_stop = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_x = fx[stop:next_stop].mean() if next_stop > stop else fx[-1]
+        next_y = fy[stop:next_stop].mean() if next_stop > stop else fy[-1]
+        area = np.abs((fx[kept] - next_x) * (fy[start:stop] - fy[kept])
+                      - (fx[kept] - fx[start:stop]) * (next_y - fy[kept]))
+        kept = start + int(area.argmax())
+        selected[bucket + 1] = kept
+    return finite[selected]
+
+
+def decimate(x, y, points, method='minmax'):
+    # (x, y) reduced to about `points` points with the chosen method
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if len(y) <= points:
+        return x, y
+    indices = lttb_indices(x, y, points) if method == 'lttb' else minmax_indices(y, points)
+    return x[indices], y[indices]
+
+
+def histogram_buckets(x, y, points):
+    # One bar per bucket holding the bucket's value furthest from zero, so a histogram
+    # keeps its peaks. Returns the bar positions, heights and a common bar width.
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n == 0:
+        return x, y, 0.8
+    if n <= points:
+        width = 0.8 * (np.diff(x).min() if n > 1 else 1.0)
+        return x, y, width
+    # Buckets of `size` bars, only as many as it takes to hold them: padding never ends
+    # up in a bucket of its own
+    size = -(-n // points)
+    buckets = -(-n // size)
+    magnitude, size = bucket_rows(np.abs(np.nan_to_num(y)), buckets, -1)
+    indices = magnitude.argmax(axis=1) + np.arange(buckets) * size
+    # A bucket spans `size` bars, on average size / (n - 1) of the x range
+    width = 0.8 * (x[-1] - x[0]) * size / (n - 1)
+    return x[indices], y[indices], width
+
+
+def bar_vertices(x, heights, width):
+    # Rectangle outlines for a PolyCollection, one (4, 2) array per bar
+    heights = np.nan_to_num(np.asarray(heights, dtype=float))
+    left = np.asarray(x, dtype=float) - width / 2
+    right = left + width
+    zeros = np.zeros_like(heights)
+    return np.stack([np.column_stack([left, zeros]), np.column_stack([left, heights]),
+                     np.column_stack([right, heights]), np.column_stack([right, zeros])], axis=1)
@@ -0,0 +1,92 @@
+import concurrent.futures
+import random
+import threading
+import time
+import tracing
+
+# HTTP answers that mean "try again later" rather than "this will never work"
+TRANSIENT_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+def is_transient(error):
+    # Dropped connections, timeouts and rate limit or server errors are worth retrying;
+    # anything else (an unknown ticker, a missing file, bad data) fails the same way on
+    # every attempt. HTTP client and yfinance errors are recognised by status code or
+    # name so none of those libraries has to be imported here.
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    status = getattr(getattr(error, 'response', None), 'status_code', None) or getattr(error, 'code', None)
+    if status in TRANSIENT_STATUS:
+        return True
+    name = type(error).__name__
+    return any(word in name for word in ('ConnectionError', 'Timeout', 'RateLimit'))
+
+
+class TokenBucket:
+    # Allows `rate` calls per second on average with bursts of up to `capacity` calls
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class FetchScheduler:
+    # Runs a fetch function over many tickers with bounded concurrency, a shared rate
+    # limit and retries with exponential backoff plus jitter. Only errors `retry_on`
+    # accepts are retried, the rest fail at once. Failures are collected per ticker
+    # instead of being raised.
+    def __init__(self, max_workers=8, rate=5.0, burst=None, retries=3, backoff=0.5, max_backoff=8.0,
+                 seed=None, retry_on=is_transient):
+        self.max_workers = max_workers
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_on = retry_on
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+
+    def backoff_delay(self, attempt):
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+        with self.random_lock:
+            return self.random.uniform(delay / 2, delay)
+
+    def call(self, func, item):
+        for attempt in range(self.retries + 1):
+            if self.bucket is not None:
+                self.bucket.acquire()
+            try:
+                return func(item)
+            except Exception as e:
+                if attempt == self.retries or not self.retry_on(e):
+                    raise
+                tracing.count('fetch_retries')
+                time.sleep(self.backoff_delay(attempt))
+
+    def run(self, func, items):
+        # Returns (results, failures): dicts keyed by item holding the value or the exception
+        results = {}
+        failures = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.call, func, item): item for item in items}
+            for future in concurrent.futures.as_completed(futures):
+                item = futures[future]
+                try:
+                    results[item] = future.result()
+                except Exception as e:
+                    failures[item] = e
+        return results, failures
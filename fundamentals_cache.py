@@ -0,0 +1,92 @@
+import os
+import sqlite3
+import threading
+import time
+
+DAY = 24 * 60 * 60
+
+# How long each fundamentals field stays fresh, in seconds. Price driven fields move
+# daily, the balance sheet ratios only change when new financials are reported.
+DEFAULT_TTLS = {
+    'Market Cap': DAY,
+    'Trailing PE': DAY,
+    'EPS': 7 * DAY,
+    'Dividend Yield': 7 * DAY,
+    'Price to Book': DAY,
+    'Debt to Equity': 7 * DAY,
+    'Return on Equity': 7 * DAY,
+}
+
+
+class FundamentalsCache:
+    # SQLite store of fundamentals, one row per ticker and field. Entries expire per
+    # field and the least recently used tickers are evicted past `max_tickers`.
+    def __init__(self, path="cache/fundamentals.sqlite", ttls=None, max_tickers=5000):
+        self.path = path
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.max_tickers = max_tickers
+        self.lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS fundamentals (
+                ticker TEXT NOT NULL,
+                field TEXT NOT NULL,
+                value,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (ticker, field)
+            )""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON fundamentals (accessed_at)")
+        self.conn.commit()
+
+    def get(self, ticker, fields=None):
+        # Returns a dict of all requested fields, or None if any of them is missing or expired
+        fields = list(fields or self.ttls)
+        now = time.time()
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT field, value, fetched_at FROM fundamentals WHERE ticker = ?", (ticker,)).fetchall()
+            values = {}
+            for field, value, fetched_at in rows:
+                if now - fetched_at < self.ttls.get(field, DAY):
+                    values[field] = value
+            if any(field not in values for field in fields):
+                return None
+            self.conn.execute("UPDATE fundamentals SET accessed_at = ? WHERE ticker = ?", (now, ticker))
+            self.conn.commit()
+        return {field: values[field] for field in fields}
+
+    def put(self, ticker, values):
+        now = time.time()
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO fundamentals (ticker, field, value, fetched_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(ticker, field, value, now, now) for field, value in values.items()])
+            self.evict()
+            self.conn.commit()
+
+    def evict(self):
+        count = self.conn.execute("SELECT COUNT(DISTINCT ticker) FROM fundamentals").fetchone()[0]
+        if count <= self.max_tickers:
+            return
+        self.conn.execute("""
+            DELETE FROM fundamentals WHERE ticker IN (
+                SELECT ticker FROM fundamentals GROUP BY ticker
+                ORDER BY MAX(accessed_at) LIMIT ?
+            )""", (count - self.max_tickers,))
+
+    def invalidate(self, tickers=None):
+        with self.lock:
+            if tickers is None:
+                self.conn.execute("DELETE FROM fundamentals")
+            else:
+                self.conn.executemany("DELETE FROM fundamentals WHERE ticker = ?", [(t,) for t in tickers])
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,136 @@
+import json
+import os
+import threading
+import time
+import pandas as pd
+import tracing
+from data_provider import DataProvider, period_start, slice_period
+
+
+def period_covers(cached_period, hist, period):
+    # A history cached for `cached_period` covers `period` if it reaches back to the
+    # period's start, or if the cached period itself starts no later (a young ticker's
+    # history is all there is). Compared by date, so "ytd" covers "6mo" only late in the year.
+    if cached_period == "max":
+        return True
+    if period == "max":
+        return False
+    last = hist.index[-1]
+    start = period_start(last, period)
+    return hist.index[0] <= start or period_start(last, cached_period) <= start
+
+
+class HistoryCache:
+    # On-disk OHLCV store, one Parquet file per ticker and interval, plus a small
+    # JSON index recording which period each file covers and when it was refreshed.
+    # Safe to share between threads fetching different tickers.
+    def __init__(self, directory="cache/history"):
+        self.directory = directory
+        self.index_path = os.path.join(directory, "index.json")
+        self.index = self.load_index()
+        self.lock = threading.Lock()
+
+    def load_index(self):
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r') as file:
+                try:
+                    return json.load(file)
+                except json.JSONDecodeError:
+                    return {}
+        return {}
+
+    def save_index(self):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self.index_path + ".tmp"
+        with self.lock:
+            with open(tmp_path, 'w') as file:
+                json.dump(self.index, file)
+            os.replace(tmp_path, self.index_path)
+
+    def key(self, ticker, interval):
+        return f"{interval}/{ticker}"
+
+    def path_for(self, ticker, interval):
+        return os.path.join(self.directory, interval, f"{ticker}.parquet")
+
+    def entry(self, ticker, interval):
+        return self.index.get(self.key(ticker, interval))
+
+    def load(self, ticker, interval="1d"):
+        path = self.path_for(ticker, interval)
+        if self.entry(ticker, interval) is None or not os.path.exists(path):
+            return None
+        return pd.read_parquet(path)
+
+    def store(self, ticker, hist, period, interval="1d"):
+        path = self.path_for(ticker, interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        hist.to_parquet(path)
+        with self.lock:
+            self.index[self.key(ticker, interval)] = {'period': period, 'updated': time.time()}
+
+
+class CachedDataProvider(DataProvider):
+    # Wraps another provider with a HistoryCache. Tickers already cached for a long
+    # enough period only download the bars after their last cached timestamp, and
+    # nothing at all if they were refreshed within `refresh_after` seconds.
+    def __init__(self, provider, cache=None, refresh_after=3600):
+        self.provider = provider
+        self.cache = cache if cache is not None else HistoryCache()
+        self.refresh_after = refresh_after
+
+    def fetch_info(self, ticker):
+        return self.provider.fetch_info(ticker)
+
+    def fetch_history(self, tickers, period, interval="1d", start=None):
+        if start is not None:
+            return self.provider.fetch_history(tickers, period, interval, start=start)
+
+        histories = {}
+        missing = []
+        stale = {}
+        now = time.time()
+
+        for ticker in tickers:
+            entry = self.cache.entry(ticker, interval)
+            cached = self.cache.load(ticker, interval) if entry is not None else None
+            if cached is None or cached.empty or not period_covers(entry['period'], cached, period):
+                missing.append(ticker)
+                continue
+            histories[ticker] = cached
+            if now - entry['updated'] >= self.refresh_after:
+                # Group stale tickers by their last cached bar so each group is one download
+                last_date = cached.index[-1].strftime('%Y-%m-%d')
+                stale.setdefault(last_date, []).append(ticker)
+
+        # Full download for tickers that aren't cached for this period yet
+        if missing:
+            with tracing.span('fetch.history.download', tickers=len(missing), period=period):
+                fetched = self.provider.fetch_history(missing, period, interval)
+            for ticker, hist in fetched.items():
+                self.cache.store(ticker, hist, period, interval)
+                histories[ticker] = hist
+
+        # Incremental refresh: fetch only the tail and append it to the cached bars
+        for last_date, group in stale.items():
+            with tracing.span('fetch.history.refresh', tickers=len(group), start=last_date):
+                fetched = self.provider.fetch_history(group, period, interval, start=last_date)
+            for ticker in group:
+                hist = histories[ticker]
+                tail = fetched.get(ticker)
+                if tail is not None and not tail.empty:
+                    hist = pd.concat([hist, tail[hist.columns.intersection(tail.columns)]])
+                    # The last cached bar may have been incomplete, keep the fresh copy
+                    hist = hist[~hist.index.duplicated(keep='last')].sort_index()
+                entry = self.cache.entry(ticker, interval)
+                self.cache.store(ticker, hist, entry['period'], interval)
+                histories[ticker] = hist
+
+        if missing or stale:
+            self.cache.save_index()
+
+        tracing.count('history_cache_hits', len(tickers) - len(missing))
+        tracing.count('history_cache_misses', len(missing))
+        tracing.count('history_cache_refreshes', sum(len(group) for group in stale.values()))
+
+        return {ticker: slice_period(histories[ticker], period) for ticker in tickers if ticker in histories}
@@ -1,6 +1,6 @@
 import yfinance as yf
 import pandas as pd
-import pandas_ta as ta
+import ta_kernels
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_pdf import PdfPages
 
@@ -26,10 +26,10 @@ class InvestmentAnalyzer:
         sma_200 = self.calculate_sma(hist['Close'], 200)
 
         # Calculate the 14-day RSI
-        rsi = ta.rsi(hist['Close'], length=14)
+        rsi = ta_kernels.rsi_series(hist['Close'], length=14)
 
         # Calculate the MACD
-        macd = ta.macd(hist['Close'])
+        macd = ta_kernels.macd_frame(hist['Close'])
 
         # Get the most recent price
         current_price = hist['Close'].iloc[-1]
@@ -0,0 +1,399 @@
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+import numpy as np
+from decimation import bar_vertices
+from streaming_indicators import StreamingIndicatorSet
+
+# Intraday bar sizes with the history each poll asks for (Yahoo keeps 1m bars for a
+# week and 5m bars for 60 days) and the pandas frequency used to bucket ticks
+INTRADAY_PERIODS = {"1m": "1d", "5m": "5d"}
+BAR_RULES = {"1m": "1min", "5m": "5min"}
+
+# Columns kept per bar for the chart
+SERIES_COLUMNS = ['Close', 'BBL_20_2.0', 'BBU_20_2.0', 'RSI_14', 'MACD_12_26_9', 'MACDh_12_26_9', 'MACDs_12_26_9',
+                  'STOCHk_14_3_3', 'STOCHd_14_3_3']
+
+
+class ProviderFeed:
+    # Polls a DataProvider for the tickers' intraday bars, one batch request per poll. The
+    # first poll asks for the recent history, later ones only for the bars from the last
+    # one held onwards (it may still have been forming). Requests go through a
+    # FetchScheduler, so dropped connections and rate limits are retried with backoff.
+    def __init__(self, provider, tickers, interval="1m", scheduler=None):
+        from fetch_scheduler import FetchScheduler
+
+        self.provider = provider
+        self.tickers = list(tickers)
+        self.interval = interval
+        self.scheduler = scheduler if scheduler is not None else FetchScheduler(max_workers=1)
+        self.last_bar = {}
+        self.finished = False
+
+    def fetch(self, request):
+        tickers, start = request
+        return self.provider.fetch_history(tickers, INTRADAY_PERIODS[self.interval], self.interval, start=start)
+
+    def poll(self):
+        results = {}
+        held = [ticker for ticker in self.tickers if ticker in self.last_bar]
+        new = [ticker for ticker in self.tickers if ticker not in self.last_bar]
+        if held:
+            start = min(self.last_bar[ticker] for ticker in held)
+            results.update(self.scheduler.call(self.fetch, (held, start)))
+        if new:
+            results.update(self.scheduler.call(self.fetch, (new, None)))
+        for ticker, bars in results.items():
+            if not bars.empty:
+                self.last_bar[ticker] = bars.index[-1]
+        return results
+
+
+def tick_bars(ticks, interval):
+    # The bar each tick belongs to as it stands right after that tick, indexed by the bar's
+    # start time, so replaying the rows in order grows the bars like a live feed. Files
+    # that already hold OHLC bars are replayed one finished bar per row.
+    import pandas as pd
+
+    if {'Open', 'High', 'Low', 'Close'}.issubset(ticks.columns):
+        return ticks
+    price = ticks['Price'].astype(float)
+    bar = ticks.index.floor(BAR_RULES[interval])
+    groups = price.groupby(bar)
+    if 'Volume' in ticks:
+        volume = ticks['Volume'].astype(float).groupby(bar).cumsum().to_numpy()
+    else:
+        volume = np.zeros(len(price))
+    return pd.DataFrame({'Open': groups.transform('first').to_numpy(), 'High': groups.cummax().to_numpy(),
+                         'Low': groups.cummin().to_numpy(), 'Close': price.to_numpy(),
+                         'Volume': volume}, index=bar)
+
+
+class ReplayFeed:
+    # Replays <TICKER>.csv tick files (a timestamp column plus Price and optionally Volume,
+    # or ready-made OHLC bars) from `directory` as if they were arriving live, `ticks`
+    # rows per ticker per poll. For working offline and for reproducing a session.
+    def __init__(self, directory, tickers, interval="1m", ticks=10):
+        import pandas as pd
+
+        self.ticks = ticks
+        self.snapshots = {}
+        for ticker in tickers:
+            path = os.path.join(directory, f"{ticker}.csv")
+            if os.path.exists(path):
+                self.snapshots[ticker] = tick_bars(pd.read_csv(path, index_col=0, parse_dates=True), interval)
+        self.cursors = dict.fromkeys(self.snapshots, 0)
+
+    @property
+    def finished(self):
+        return all(self.cursors[ticker] >= len(bars) for ticker, bars in self.snapshots.items())
+
+    def poll(self):
+        results = {}
+        for ticker, bars in self.snapshots.items():
+            start = self.cursors[ticker]
+            end = min(start + self.ticks, len(bars))
+            self.cursors[ticker] = end
+            if end > start:
+                # Only the latest state of each bar touched by these ticks
+                chunk = bars.iloc[start:end]
+                results[ticker] = chunk[~chunk.index.duplicated(keep='last')]
+        return results
+
+
+class LiveSeries:
+    # The last `capacity` bars of one ticker with their indicator values. Indicators are
+    # updated one bar at a time; the newest bar may still be forming, so the indicator
+    # state from before it is kept and a revised version of that bar replaces it.
+    def __init__(self, ticker, capacity=240):
+        self.ticker = ticker
+        self.indicators = StreamingIndicatorSet(sma_windows=())
+        self.before_last = None
+        self.times = deque(maxlen=capacity)
+        self.columns = {name: deque(maxlen=capacity) for name in SERIES_COLUMNS}
+        self.version = 0
+        self.lock = threading.Lock()
+
+    def apply(self, bars):
+        # Feeds new or revised bars; returns True if anything changed
+        with self.lock:
+            if self.times:
+                bars = bars[bars.index >= self.times[-1]]
+            if bars.empty:
+                return False
+            rows = list(zip(bars.index, bars['High'].to_numpy(float), bars['Low'].to_numpy(float),
+                            bars['Close'].to_numpy(float)))
+            for number, (when, high, low, close) in enumerate(rows):
+                if self.times and when == self.times[-1]:
+                    # The forming bar changed: undo it and apply the new version
+                    self.indicators.restore(self.before_last)
+                    self.times.pop()
+                    for column in self.columns.values():
+                        column.pop()
+                elif number == len(rows) - 1:
+                    self.before_last = self.indicators.snapshot()
+                values = self.indicators.update(when, high, low, close)
+                values['Close'] = close
+                self.times.append(when)
+                for name, column in self.columns.items():
+                    column.append(values[name])
+            self.version += 1
+            return True
+
+    def arrays(self):
+        # Copies of the columns as arrays, the last bar time and the version they belong to
+        with self.lock:
+            data = {name: np.fromiter(column, float, len(column)) for name, column in self.columns.items()}
+            return data, (self.times[-1] if self.times else None), self.version
+
+
+class LiveChart:
+    # Price (with Bollinger Bands), RSI, MACD and stochastic panels for one LiveSeries.
+    # Everything that changes per bar is an animated artist: a full draw only happens when
+    # the figure is resized or an axis has to rescale, and caches the static background.
+    # A normal update restores that background, draws the changed artists and blits.
+    # Without a Tk `master` the chart draws offscreen on an Agg canvas.
+    def __init__(self, series, master=None, figsize=(4.8, 3.6), dpi=80):
+        from matplotlib.collections import PolyCollection
+        from matplotlib.figure import Figure
+
+        self.series = series
+        self.capacity = series.times.maxlen
+        self.figure = Figure(figsize=figsize, dpi=dpi)
+        price, rsi, macd, stoch = self.axes = self.figure.subplots(
+            4, 1, sharex=True, gridspec_kw={'height_ratios': [3, 1, 1, 1], 'hspace': 0.08})
+        self.figure.subplots_adjust(left=0.12, right=0.98, top=0.92, bottom=0.04)
+
+        def line(ax, color, width=1.0):
+            return ax.plot([], [], color=color, linewidth=width, animated=True)[0]
+
+        self.lines = {
+            'Close': line(price, 'black'),
+            'BBL_20_2.0': line(price, 'lightblue', 0.8),
+            'BBU_20_2.0': line(price, 'lightblue', 0.8),
+            'RSI_14': line(rsi, 'purple'),
+            'MACD_12_26_9': line(macd, 'blue'),
+            'MACDs_12_26_9': line(macd, 'red'),
+            'STOCHk_14_3_3': line(stoch, 'blue'),
+            'STOCHd_14_3_3': line(stoch, 'orange'),
+        }
+        self.histogram = macd.add_collection(PolyCollection([], facecolor='grey', edgecolor='none',
+                                                            animated=True))
+        self.title = price.text(0.0, 1.02, series.ticker, transform=price.transAxes, fontsize=10,
+                                animated=True)
+        self.artists = list(self.lines.values()) + [self.histogram, self.title]
+
+        for ax, (low, high) in ((rsi, (30, 70)), (stoch, (20, 80))):
+            ax.set_ylim(0, 100)
+            ax.axhline(low, color='green', linestyle='--', linewidth=0.6)
+            ax.axhline(high, color='red', linestyle='--', linewidth=0.6)
+        macd.axhline(0, color='grey', linewidth=0.6)
+        for ax, label in zip(self.axes, ("Price", "RSI", "MACD", "Stoch")):
+            ax.set_ylabel(label, fontsize=8)
+            ax.tick_params(labelsize=7, labelbottom=False)
+        # Bars are drawn at fixed slots, newest on the right, so the x axis never changes
+        price.set_xlim(-1, self.capacity)
+        # Panels whose y range follows the data
+        self.scaled = [(price, ['Close', 'BBL_20_2.0', 'BBU_20_2.0']),
+                       (macd, ['MACD_12_26_9', 'MACDs_12_26_9', 'MACDh_12_26_9'])]
+
+        if master is not None:
+            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+            self.canvas = FigureCanvasTkAgg(self.figure, master=master)
+        else:
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            self.canvas = FigureCanvasAgg(self.figure)
+        self.background = None
+        self.drawn_version = -1
+        self.full_draws = 0
+        self.seconds = 0.0
+        self.canvas.mpl_connect('draw_event', self.on_draw)
+
+    def widget(self):
+        return self.canvas.get_tk_widget()
+
+    def on_draw(self, event):
+        # After any full draw: keep the static background and put the artists back on top
+        self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self.full_draws += 1
+        self.draw_artists()
+
+    def draw_artists(self):
+        for artist in self.artists:
+            artist.axes.draw_artist(artist)
+
+    def rescale(self, data):
+        # Widens or narrows a panel's y range only when the data left it or fills less
+        # than a quarter of it, so most updates keep the cached background
+        changed = False
+        for ax, names in self.scaled:
+            values = np.concatenate([data[name] for name in names])
+            values = values[np.isfinite(values)]
+            if not len(values):
+                continue
+            low, high = values.min(), values.max()
+            bottom, top = ax.get_ylim()
+            if low < bottom or high > top or (top - bottom) > 4 * max(high - low, 1e-12):
+                margin = (high - low) * 0.25 or abs(high) * 0.01 or 1.0
+                ax.set_ylim(low - margin, high + margin)
+                changed = True
+        return changed
+
+    def refresh(self):
+        # Shows the series' latest bars; returns False if there was nothing new
+        data, last_time, version = self.series.arrays()
+        if version == self.drawn_version:
+            return False
+        started = time.perf_counter()
+        x = np.arange(self.capacity - len(data['Close']), self.capacity)
+        for name, line in self.lines.items():
+            line.set_data(x, data[name])
+        self.histogram.set_verts(bar_vertices(x, data['MACDh_12_26_9'], 0.8))
+        if len(x):
+            self.title.set_text(f"{self.series.ticker}  {data['Close'][-1]:.2f}  {last_time:%H:%M}")
+
+        if self.rescale(data) or self.background is None:
+            self.canvas.draw()
+        else:
+            self.canvas.restore_region(self.background)
+            self.draw_artists()
+            self.canvas.blit(self.figure.bbox)
+        self.drawn_version = version
+        self.seconds = time.perf_counter() - started
+        return True
+
+
+class LiveDashboard:
+    # A grid of live charts in a Tk window. A background thread polls the feed every
+    # `poll_seconds` and feeds the series; the Tk loop redraws `fps` times a second, at most
+    # `budget` seconds per frame. Charts waiting longest go first and any that don't fit
+    # keep only their newest bars for the next frame, so dozens of charts never stall the UI.
+    def __init__(self, root, feed, tickers, poll_seconds=60.0, fps=10, budget=0.025, capacity=240, columns=3):
+        import tkinter as tk
+        from tkinter import ttk
+
+        self.root = root
+        self.feed = feed
+        self.poll_seconds = poll_seconds
+        self.frame_ms = max(1, int(1000 / fps))
+        self.budget = budget
+        self.messages = queue.Queue()
+        self.stop_event = threading.Event()
+
+        self.series = {ticker: LiveSeries(ticker, capacity) for ticker in tickers}
+        grid = ttk.Frame(root)
+        grid.pack(fill='both', expand=True)
+        self.charts = []
+        for index, series in enumerate(self.series.values()):
+            chart = LiveChart(series, master=grid)
+            chart.widget().grid(row=index // columns, column=index % columns, sticky='nsew')
+            grid.grid_columnconfigure(index % columns, weight=1)
+            grid.grid_rowconfigure(index // columns, weight=1)
+            self.charts.append(chart)
+        self.waiting_since = {chart: 0.0 for chart in self.charts}
+        # The status bar shows the last redraw next to the feed's state, so a feed error
+        # stays visible while the charts keep redrawing
+        self.drawing = None
+        self.feed_state = None
+        self.status = tk.StringVar(value="Waiting for data...")
+        ttk.Label(root, textvariable=self.status).pack(side='bottom', anchor='w')
+
+        self.thread = threading.Thread(target=self.poll_loop, daemon=True, name="live-feed")
+        self.thread.start()
+        self.root.after(self.frame_ms, self.on_frame)
+        self.root.bind("<Destroy>", lambda e: self.stop() if e.widget is self.root else None, add='+')
+
+    def poll_loop(self):
+        failing = False
+        while not self.stop_event.is_set():
+            try:
+                for ticker, bars in self.feed.poll().items():
+                    if ticker in self.series:
+                        self.series[ticker].apply(bars)
+            except Exception as e:
+                failing = True
+                self.messages.put(('error', str(e)))
+            else:
+                if failing:
+                    failing = False
+                    self.messages.put(('recovered',))
+            if self.feed.finished:
+                self.messages.put(('finished',))
+                return
+            self.stop_event.wait(self.poll_seconds)
+
+    def on_frame(self):
+        if self.stop_event.is_set():
+            return
+        changed = False
+        while True:
+            try:
+                message = self.messages.get_nowait()
+            except queue.Empty:
+                break
+            if message[0] == 'error':
+                self.feed_state = "Feed error: " + message[1]
+            elif message[0] == 'recovered':
+                self.feed_state = None
+            else:
+                self.feed_state = "Replay finished"
+            changed = True
+
+        started = time.perf_counter()
+        pending = [chart for chart in self.charts if chart.series.version != chart.drawn_version]
+        pending.sort(key=self.waiting_since.get)
+        drawn = 0
+        for chart in pending:
+            if time.perf_counter() - started >= self.budget:
+                break
+            chart.refresh()
+            self.waiting_since[chart] = started
+            drawn += 1
+        if pending:
+            elapsed = (time.perf_counter() - started) * 1000
+            self.drawing = f"Redrew {drawn} chart(s) in {elapsed:.1f} ms, {len(pending) - drawn} deferred"
+            changed = True
+        if changed:
+            self.status.set(" | ".join(part for part in (self.drawing, self.feed_state) if part))
+        self.root.after(self.frame_ms, self.on_frame)
+
+    def stop(self):
+        self.stop_event.set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Live intraday charts with RSI, MACD and stochastic panels.")
+    parser.add_argument('tickers', nargs='+')
+    parser.add_argument('--interval', default='1m', choices=sorted(INTRADAY_PERIODS))
+    parser.add_argument('--poll', type=float, default=60.0, help="seconds between polls")
+    parser.add_argument('--replay', metavar='DIR', help="replay <TICKER>.csv tick files instead of polling Yahoo")
+    parser.add_argument('--ticks', type=int, default=10, help="tick rows replayed per poll")
+    parser.add_argument('--window', type=int, default=240, help="bars shown per chart")
+    parser.add_argument('--fps', type=int, default=10)
+    parser.add_argument('--budget-ms', type=float, default=25.0, help="drawing time allowed per frame")
+    parser.add_argument('--columns', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    import tkinter as tk
+
+    tickers = [ticker.upper() for ticker in args.tickers]
+    if args.replay:
+        feed = ReplayFeed(args.replay, tickers, args.interval, args.ticks)
+    else:
+        from data_provider import YahooDataProvider
+        feed = ProviderFeed(YahooDataProvider(), tickers, args.interval)
+
+    root = tk.Tk()
+    root.title("Live " + ", ".join(tickers))
+    LiveDashboard(root, feed, tickers, poll_seconds=args.poll, fps=args.fps, budget=args.budget_ms / 1000,
+                  capacity=args.window, columns=args.columns)
+    root.mainloop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
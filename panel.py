@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+import ta_kernels
+from signals import detect_signals
+
+FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+class IndicatorPanel:
+    # Aligned (time x ticker) arrays for a batch of tickers. Each ticker's bars are
+    # right-aligned so row -1 is every ticker's latest bar; shorter histories are padded
+    # with NaN at the top and `mask` marks the rows that hold real bars. `times` keeps
+    # each ticker's own timestamps (int64 ns), so markets with different holidays stay
+    # gap free and every indicator matches what the per-ticker calculation gives.
+    def __init__(self, tickers, times, data, timezones=None):
+        self.tickers = list(tickers)
+        self.columns = {ticker: index for index, ticker in enumerate(self.tickers)}
+        self.times = times
+        self.data = data
+        self.timezones = timezones if timezones is not None else [None] * len(self.tickers)
+        self.mask = ~np.isnan(data['Close'])
+        self.indicators = {}
+
+    @classmethod
+    def from_histories(cls, histories, tickers=None):
+        tickers = [ticker for ticker in (tickers if tickers is not None else histories)
+                   if ticker in histories and not histories[ticker].empty]
+        length = max((len(histories[ticker]) for ticker in tickers), default=0)
+        times = np.full((length, len(tickers)), np.iinfo(np.int64).min, dtype=np.int64)
+        data = {field: np.full((length, len(tickers)), np.nan) for field in FIELDS}
+        timezones = []
+
+        for col, ticker in enumerate(tickers):
+            hist = histories[ticker]
+            start = length - len(hist)
+            index = hist.index
+            timezones.append(index.tz)
+            if index.tz is not None:
+                index = index.tz_convert('UTC').tz_localize(None)
+            times[start:, col] = index.as_unit('ns').asi8
+            for field in FIELDS:
+                if field in hist.columns:
+                    data[field][start:, col] = hist[field].to_numpy(dtype=float)
+
+        return cls(tickers, times, data, timezones)
+
+    def __contains__(self, ticker):
+        return ticker in self.columns
+
+    def compute_indicators(self, sma_windows=(50, 200)):
+        # Every indicator for every ticker in one vectorized call per indicator
+        close = self.data['Close']
+        high = self.data['High']
+        low = self.data['Low']
+        out = self.indicators
+        if not self.tickers:
+            return out
+
+        out['RSI_14'] = ta_kernels.rsi(close, 14)
+        out['MACD_12_26_9'], out['MACDh_12_26_9'], out['MACDs_12_26_9'] = ta_kernels.macd(close, 12, 26, 9)
+        out['STOCHk_14_3_3'], out['STOCHd_14_3_3'] = ta_kernels.stoch(high, low, close, 14, 3, 3)
+        for window in sma_windows:
+            out[f'SMA_{window}'] = ta_kernels.sma(close, window)
+        out['BBL_20_2.0'], out['BBM_20_2.0'], out['BBU_20_2.0'] = ta_kernels.bbands(close, 20, 2.0)
+        return out
+
+    def index(self, ticker):
+        col = self.columns[ticker]
+        rows = self.mask[:, col]
+        index = pd.DatetimeIndex(self.times[rows, col].astype('datetime64[ns]'))
+        timezone = self.timezones[col]
+        if timezone is not None:
+            index = index.tz_localize('UTC').tz_convert(timezone)
+        return rows, col, index
+
+    def history(self, ticker):
+        rows, col, index = self.index(ticker)
+        return pd.DataFrame({field: self.data[field][rows, col] for field in FIELDS}, index=index)
+
+    def indicator_frame(self, ticker, names):
+        rows, col, index = self.index(ticker)
+        return pd.DataFrame({name: self.indicators[name][rows, col] for name in names}, index=index)
+
+    def event_times(self):
+        # Timestamps as a (time x ticker) datetime64 array for the signal event table
+        return self.times.astype('datetime64[ns]')
+
+    def detect_signals(self, sma_windows=(50, 200)):
+        out = self.indicators
+        events = detect_signals(self.event_times(), self.tickers, close=self.data['Close'], rsi=out['RSI_14'],
+                                macd=out['MACD_12_26_9'], macd_signal=out['MACDs_12_26_9'],
+                                stoch_k=out['STOCHk_14_3_3'],
+                                sma={window: out[f'SMA_{window}'] for window in sma_windows})
+        # Put the event timestamps back into each ticker's own timezone, converting the
+        # events of all tickers that share a timezone at once
+        if events.empty or all(timezone is None for timezone in self.timezones):
+            return events
+        zones = {}
+        for col, timezone in enumerate(self.timezones):
+            zones.setdefault(timezone, []).append(col)
+        utc = pd.DatetimeIndex(events['Date'])
+        if len(zones) == 1:
+            events['Date'] = utc.tz_localize('UTC').tz_convert(next(iter(zones)))
+            return events
+        # Mixed timezones can't share a datetime64 column, so they end up as Timestamps
+        columns = events['Ticker'].map(self.columns).to_numpy()
+        dates = np.empty(len(events), dtype=object)
+        for timezone, cols in zones.items():
+            rows = np.isin(columns, cols)
+            local = utc[rows] if timezone is None else utc[rows].tz_localize('UTC').tz_convert(timezone)
+            dates[rows] = local.astype(object)
+        events['Date'] = pd.Series(dates, index=events.index, dtype=object)
+        return events
+
+
+class PanelView:
+    # Read-only ticker -> pandas object mapping over a panel, so code written against the
+    # old per-ticker dicts (analyzer.hist[ticker], analyzer.rsi[ticker], ...) keeps working
+    def __init__(self, panel, getter):
+        self.panel = panel
+        self.getter = getter
+
+    def __getitem__(self, ticker):
+        if ticker not in self.panel:
+            raise KeyError(ticker)
+        return self.getter(ticker)
+
+    def __contains__(self, ticker):
+        return ticker in self.panel
+
+    def __iter__(self):
+        return iter(self.panel.tickers)
+
+    def __len__(self):
+        return len(self.panel.tickers)
+
+    def keys(self):
+        return list(self.panel.tickers)
@@ -0,0 +1,194 @@
+import queue
+import threading
+import tracing
+
+# End of stream marker on the page queue
+DONE = object()
+
+
+class AnalysisPipeline:
+    # Runs the analysis as overlapping stages instead of one phase after another:
+    #   fetch    `fetch_workers` threads download price histories and fundamentals, one
+    #            chunk of `chunk_size` tickers at a time
+    #   compute  one thread turns each fetched chunk into indicators, signals, scores and
+    #            page jobs, in the original chunk order
+    #   render   whoever iterates page_jobs(), normally a renderer drawing each page as
+    #            soon as it is ready
+    # Fetchers may only run `window` chunks ahead of the compute stage and the page queue
+    # holds at most `max_pages` jobs, so memory stays bounded however many tickers there
+    # are; a slow stage makes the ones before it wait.
+    def __init__(self, tickers, time_period, timeframes, provider, fundamentals_cache=None,
+                 refresh_fundamentals=False, interval="1d", chunk_size=10, fetch_workers=2, window=None,
+                 max_pages=None, scheduler=None, cancelled=None, on_skipped=None, on_warnings=None):
+        from fetch_scheduler import FetchScheduler
+
+        self.tickers = list(tickers)
+        self.time_period = time_period
+        self.timeframes = timeframes
+        self.provider = provider
+        self.fundamentals_cache = fundamentals_cache
+        self.refresh_fundamentals = refresh_fundamentals
+        self.interval = interval
+        self.chunks = [self.tickers[start:start + chunk_size] for start in range(0, len(self.tickers), chunk_size)]
+        self.fetch_workers = max(1, min(fetch_workers, len(self.chunks)))
+        self.window = window if window is not None else self.fetch_workers + 1
+        self.pages = queue.Queue(maxsize=max_pages if max_pages is not None else 2 * chunk_size)
+        # One scheduler for every history and fundamentals fetch so the rate limit holds
+        # across chunks
+        self.scheduler = scheduler if scheduler is not None else FetchScheduler()
+        self.cancelled = cancelled
+        self.on_skipped = on_skipped
+        self.on_warnings = on_warnings
+        self.skipped = {}        # tickers without a page: ticker -> reason
+        self.warnings = {}       # tickers drawn with something missing: ticker -> reason
+        # Pages the render stage will get: every ticker until its chunk has been computed,
+        # then the page jobs actually built for it
+        self.expected_pages = len(self.tickers)
+        self.error = None
+
+        self.condition = threading.Condition()
+        self.next_chunk = 0      # next chunk a fetcher will take
+        self.next_compute = 0    # next chunk the compute stage needs
+        self.fetched = {}        # chunk index -> fetched data, waiting for the compute stage
+        self.stop_event = threading.Event()
+
+    def stopped(self):
+        return self.stop_event.is_set() or (self.cancelled is not None and self.cancelled())
+
+    def stop(self):
+        self.stop_event.set()
+        with self.condition:
+            self.condition.notify_all()
+
+    def fail(self, error):
+        if self.error is None:
+            self.error = error
+        self.stop()
+
+    def fetch_stage(self):
+        from Fundamental_analysis import FundamentalAnalyzer
+
+        try:
+            while True:
+                with self.condition:
+                    # Don't run more than `window` chunks ahead of the compute stage
+                    while (not self.stopped() and self.next_chunk < len(self.chunks)
+                           and self.next_chunk >= self.next_compute + self.window):
+                        self.condition.wait(0.1)
+                    if self.stopped() or self.next_chunk >= len(self.chunks):
+                        return
+                    index = self.next_chunk
+                    self.next_chunk += 1
+
+                chunk = self.chunks[index]
+                with tracing.span('stage.fetch', tickers=len(chunk)):
+                    # Transient errors are retried; a chunk whose prices still can't be had
+                    # is skipped by the compute stage instead of failing the whole run
+                    try:
+                        self.scheduler.call(self.timeframes.load, chunk)
+                    except Exception as e:
+                        tracing.count('fetch_failures', kind='history')
+                        fetched = (None, {}, e)
+                    else:
+                        analyzer = FundamentalAnalyzer(chunk, cache=self.fundamentals_cache,
+                                                       refresh=self.refresh_fundamentals, provider=self.provider,
+                                                       scheduler=self.scheduler)
+                        fetched = (analyzer.analyze_data(), analyzer.failures, None)
+                with self.condition:
+                    self.fetched[index] = fetched
+                    self.condition.notify_all()
+        except Exception as e:
+            self.fail(e)
+
+    def compute_stage(self):
+        from report_renderer import build_page_jobs
+
+        try:
+            for index, chunk in enumerate(self.chunks):
+                with self.condition:
+                    while index not in self.fetched and not self.stopped():
+                        self.condition.wait(0.1)
+                    if self.stopped():
+                        return
+                    fundamentals, failures, history_error = self.fetched.pop(index)
+                    self.next_compute = index + 1
+                    self.condition.notify_all()
+
+                if history_error is not None:
+                    self.expected_pages -= len(chunk)
+                    self.report({ticker: f"price history failed: {history_error}" for ticker in chunk}, {})
+                    continue
+
+                with tracing.span('stage.compute', tickers=len(chunk)):
+                    # The histories are in memory by now; the chunk's panel is memoized by the
+                    # timeframe service for later runs with the same period
+                    analyzer = self.timeframes.analyzer(chunk, self.time_period, self.interval)
+                    histories = analyzer.histories
+                    signals = analyzer.detect_signals()
+                    tickers = [ticker for ticker in chunk if ticker in histories]
+                    jobs = build_page_jobs(tickers, fundamentals, analyzer, signals, self.time_period,
+                                           interval=self.interval)
+                self.expected_pages -= len(chunk) - len(jobs)
+
+                # Only tickers without prices lose their page; failed fundamentals are left
+                # out of a page that is still drawn
+                skipped = {ticker: "no price history" for ticker in chunk if ticker not in histories}
+                warnings = {ticker: f"fundamentals failed: {failures[ticker]}" for ticker in chunk
+                            if ticker in failures and ticker in histories}
+                self.report(skipped, warnings)
+
+                for job in jobs:
+                    if not self.put(job):
+                        return
+        except Exception as e:
+            self.fail(e)
+        finally:
+            self.put(DONE)
+
+    def report(self, skipped, warnings):
+        if skipped:
+            self.skipped.update(skipped)
+            tracing.count('tickers_skipped', len(skipped))
+            if self.on_skipped is not None:
+                self.on_skipped(skipped)
+        if warnings:
+            self.warnings.update(warnings)
+            tracing.count('tickers_warned', len(warnings))
+            if self.on_warnings is not None:
+                self.on_warnings(warnings)
+
+    def put(self, item):
+        # Blocks while the page queue is full (backpressure); False once stopped
+        while not self.stopped():
+            try:
+                self.pages.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def page_jobs(self):
+        # Starts the fetch and compute stages and yields page jobs in ticker order as they
+        # become ready. Leaving the loop early stops the stages.
+        threads = [threading.Thread(target=self.fetch_stage, daemon=True, name=f"fetch-{number}")
+                   for number in range(self.fetch_workers)]
+        threads.append(threading.Thread(target=self.compute_stage, daemon=True, name="compute"))
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                try:
+                    item = self.pages.get(timeout=0.1)
+                except queue.Empty:
+                    if self.stopped() and not threads[-1].is_alive():
+                        break
+                    continue
+                if item is DONE:
+                    break
+                yield item
+        finally:
+            self.stop()
+            for thread in threads:
+                thread.join()
+        if self.error is not None:
+            raise self.error
@@ -0,0 +1,209 @@
+import concurrent.futures
+import hashlib
+import html
+import json
+import os
+import pandas as pd
+import tracing
+import report_renderer
+from report_renderer import PageTemplates, init_worker
+
+# Bump when the page drawing code changes so every cached page is redrawn once
+RENDER_VERSION = 1
+
+PAGES = ['chart', 'fundamentals']
+
+
+def page_key(job, params):
+    # Content hash of everything a ticker's pages are drawn from: the price history, the
+    # signal events, the fundamentals and the render parameters. The indicators are
+    # derived from the history, so they don't need hashing themselves.
+    digest = hashlib.sha256()
+    digest.update(json.dumps([RENDER_VERSION, job['ticker'], job['time_period'], params], default=str).encode())
+    digest.update(pd.util.hash_pandas_object(job['hist'], index=True).to_numpy().tobytes())
+    digest.update(pd.util.hash_pandas_object(job['events'], index=False).to_numpy().tobytes())
+    fundamentals = job['fundamentals']
+    digest.update(repr(None if fundamentals is None else fundamentals.to_dict()).encode())
+    verdicts = job.get('verdicts')
+    digest.update(repr(None if verdicts is None else verdicts.to_dict()).encode())
+    return digest.hexdigest()
+
+
+def manifest_name(job):
+    return f"{job['ticker']}/{job['time_period']}/{job.get('interval', '1d')}"
+
+
+def save_pages(templates, job, paths, dpi):
+    # Draws one ticker's pages and saves each to every path in `paths`. Files are written
+    # under a temporary name and renamed, so a page on disk is always complete.
+    for page, template, kwargs in [('chart', templates.chart, {}),
+                                   ('fundamentals', templates.table, {'bbox_inches': 'tight'})]:
+        with tracing.span('render.draw', ticker=job['ticker']):
+            template.update(job)
+        for path in paths[page]:
+            with tracing.span('render.savefig', ticker=job['ticker']):
+                template.fig.savefig(path + '.tmp', format=os.path.splitext(path)[1][1:], dpi=dpi, **kwargs)
+            os.replace(path + '.tmp', path)
+
+
+def render_ticker_pages(job, paths, dpi):
+    # Worker entry point, using the templates created by report_renderer.init_worker
+    save_pages(report_renderer.worker_templates, job, paths, dpi)
+    return paths, tracing.tracer.drain()
+
+
+class DashboardRenderer:
+    # Writes each ticker's pages as image files plus an HTML index instead of one PDF.
+    # Pages are stored under the content hash of their inputs (see page_key), so a ticker
+    # whose data hasn't changed since the last run is not drawn again. Same render()
+    # interface as ReportRenderer; output_path is the index.html to write.
+    def __init__(self, directory="cache/pages", formats=("png",), dpi=100, workers=1):
+        self.directory = directory
+        self.formats = tuple(formats)
+        self.dpi = dpi
+        self.workers = workers
+        self.manifest_path = os.path.join(directory, "manifest.json")
+        self.manifest = self.load_manifest()
+        self.last_rendered = []
+        self.skipped = 0
+
+    def load_manifest(self):
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, 'r') as file:
+                return json.load(file)
+        return {}
+
+    def save_manifest(self):
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump(self.manifest, file, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def page_paths(self, key):
+        return {page: [os.path.join(self.directory, f"{key}.{page}.{fmt}") for fmt in self.formats]
+                for page in PAGES}
+
+    def cached(self, key):
+        return all(os.path.exists(path) for paths in self.page_paths(key).values() for path in paths)
+
+    def remove_pages(self, key):
+        for page in PAGES:
+            for fmt in ("png", "svg"):
+                path = os.path.join(self.directory, f"{key}.{page}.{fmt}")
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def render(self, jobs, output_path, on_page=None, cancelled=None):
+        # `jobs` may be any iterable; pages are checked against the cache and drawn as the
+        # jobs arrive
+        os.makedirs(self.directory, exist_ok=True)
+        params = {'formats': self.formats, 'dpi': self.dpi}
+        done = {}
+        self.skipped = 0
+
+        def finished(index, job, key):
+            done[index] = (job['ticker'], key)
+            # One entry per ticker, period and bar size, so alternating between periods
+            # reuses both sets of pages and an index written for the other period keeps
+            # its images. Only pages no entry refers to any more are removed.
+            name = manifest_name(job)
+            previous = self.manifest.get(name, {}).get('key')
+            self.manifest[name] = {'key': key, 'ticker': job['ticker'], 'time_period': job['time_period'],
+                                   'interval': job.get('interval', '1d')}
+            if previous is not None and previous != key and \
+                    all(entry['key'] != previous for entry in self.manifest.values()):
+                self.remove_pages(previous)
+            if on_page is not None:
+                on_page(job)
+
+        def todo():
+            # Unchanged tickers are finished straight away, the others are yielded for drawing
+            for index, job in enumerate(jobs):
+                if cancelled is not None and cancelled():
+                    return
+                key = page_key(job, params)
+                if self.cached(key):
+                    self.skipped += 1
+                    finished(index, job, key)
+                else:
+                    yield index, job, key
+
+        if self.workers > 1:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                                        initargs=(tracing.tracer.enabled,)) as executor:
+                pending = {}
+
+                def collect():
+                    finished_futures, _ = concurrent.futures.wait(
+                        pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in finished_futures:
+                        _, trace = future.result()
+                        tracing.tracer.merge(trace)
+                        finished(*pending.pop(future))
+
+                for index, job, key in todo():
+                    while len(pending) >= 2 * self.workers:
+                        collect()
+                    future = executor.submit(render_ticker_pages, job, self.page_paths(key), self.dpi)
+                    pending[future] = (index, job, key)
+                while pending and not (cancelled is not None and cancelled()):
+                    collect()
+                for future in pending:
+                    future.cancel()
+        else:
+            templates = None
+            try:
+                for index, job, key in todo():
+                    if templates is None:
+                        templates = PageTemplates()
+                    save_pages(templates, job, self.page_paths(key), self.dpi)
+                    finished(index, job, key)
+            finally:
+                if templates is not None:
+                    templates.close()
+
+        tracing.count('render_cache_hits', self.skipped)
+        tracing.count('render_cache_misses', len(done) - self.skipped)
+        self.save_manifest()
+        pages = [done[index] for index in sorted(done)]
+        self.last_rendered = [key for _, key in pages]
+        self.write_index(pages, output_path)
+        return len(done)
+
+    def write_index(self, pages, output_path):
+        # pages: (ticker, key) pairs in report order
+        base = os.path.dirname(os.path.abspath(output_path))
+        fmt = self.formats[0]
+        sections = []
+        for ticker, key in pages:
+            ticker = html.escape(ticker)
+            images = ''.join(
+                f'<img src="{html.escape(os.path.relpath(path, base))}" alt="{ticker} {page}">'
+                for page, paths in self.page_paths(key).items()
+                for path in paths if path.endswith('.' + fmt))
+            sections.append(f'<section id="{ticker}"><h2>{ticker}</h2>{images}</section>')
+        links = ' '.join(f'<a href="#{html.escape(ticker)}">{html.escape(ticker)}</a>' for ticker, _ in pages)
+        with open(output_path, 'w') as file:
+            file.write('<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>Analysis results</title>'
+                       '<style>img{display:block;max-width:100%}</style></head>\n<body>\n'
+                       f'<nav>{links}</nav>\n' + '\n'.join(sections) + '\n</body></html>\n')
+
+    def assemble_pdf(self, output_path, keys=None):
+        # Builds a PDF from cached PNG pages (by default those of the last render) without
+        # drawing any chart again
+        from matplotlib.figure import Figure
+        from matplotlib.image import imread
+        from matplotlib.backends.backend_pdf import PdfPages
+
+        if "png" not in self.formats:
+            raise ValueError("assembling a PDF needs the pages cached as png")
+        keys = self.last_rendered if keys is None else keys
+        with PdfPages(output_path) as pdf:
+            for key in keys:
+                for page in PAGES:
+                    image = imread(os.path.join(self.directory, f"{key}.{page}.png"))
+                    height, width = image.shape[:2]
+                    fig = Figure(figsize=(width / self.dpi, height / self.dpi), dpi=self.dpi)
+                    fig.figimage(image)
+                    pdf.savefig(fig, dpi=self.dpi)
+        return output_path
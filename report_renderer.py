@@ -0,0 +1,355 @@
+import concurrent.futures
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+import matplotlib.dates as mdates
+from matplotlib.collections import PolyCollection
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_pdf import PdfPages
+import tracing
+from decimation import axes_points, bar_vertices, decimate, histogram_buckets
+from Fundamental_analysis import FUNDAMENTAL_FIELDS
+from scoring import score_fundamentals
+
+
+# Trading days in one bar of each interval, and the unit shown in the moving average legend
+INTERVAL_DAYS = {"1d": 1, "1wk": 5, "1mo": 21}
+INTERVAL_UNITS = {"1d": "Day", "1wk": "Week", "1mo": "Month"}
+
+
+def moving_average_windows(time_period, interval="1d"):
+    if time_period == "1y":
+        windows = [200, 50]
+    elif time_period == "6mo":
+        windows = [120, 30]
+    elif time_period == "3mo":
+        windows = [60, 15]
+    else:
+        windows = [200, 50]  # Default to 200 and 50 if time period is not recognized
+    # Weekly and monthly bars get the same spans in days, counted in bars
+    return [max(2, round(window / INTERVAL_DAYS[interval])) for window in windows]
+
+
+def build_page_jobs(tickers, fundamental_results, investment_analyzer, signals, time_period, scores=None,
+                    interval="1d"):
+    # Everything one ticker's pages need, as plain picklable data for the worker processes.
+    # The fundamentals are scored for all tickers at once unless a score table is given.
+    if scores is None:
+        scores = score_fundamentals(fundamental_results)
+    jobs = []
+    for ticker in tickers:
+        jobs.append({
+            'ticker': ticker,
+            'time_period': time_period,
+            'interval': interval,
+            'hist': investment_analyzer.hist[ticker],
+            'rsi': investment_analyzer.rsi[ticker],
+            'macd': investment_analyzer.macd[ticker],
+            'stoch': investment_analyzer.stoch[ticker],
+            'events': signals[signals['Ticker'] == ticker],
+            'fundamentals': fundamental_results.loc[ticker] if ticker in fundamental_results.index else None,
+            'verdicts': scores.loc[ticker] if ticker in scores.index else None,
+        })
+    return jobs
+
+
+class ChartPageTemplate:
+    # The 4-panel chart page. Axes, reference lines and legends are built once;
+    # update() only swaps the data of the existing artists for the next ticker.
+    # Long histories are decimated to the resolution of the page ('minmax' or 'lttb',
+    # None draws every point) so render time and file size don't grow with the period.
+    def __init__(self, decimation='minmax'):
+        self.fig = Figure(figsize=(10, 15))
+        self.axs = self.fig.subplots(4, 1)  # Create 4 subplots
+        axs = self.axs
+        for ax in axs:
+            ax.xaxis_date()
+        self.decimation = decimation
+        self.points = axes_points(axs[0])
+
+        # Close price, moving averages and Bollinger Bands
+        self.price_line, = axs[0].plot([], [])
+        self.ma_lines = [axs[0].plot([], [], label='Day MA')[0] for _ in range(2)]
+        self.band_lines = [axs[0].plot([], [], color='lightgray')[0] for _ in range(2)]
+        self.last_close_text = axs[0].text(0.85, 1.02, '', transform=axs[0].transAxes, ha='center', fontsize=10)
+
+        # RSI with horizontal lines at 70 and 30
+        self.rsi_line, = axs[1].plot([], [], color='blue')
+        axs[1].axhline(70, color='red', linestyle='dashed', alpha=0.6, label='Overbought (70)')
+        axs[1].axhline(30, color='green', linestyle='dashed', alpha=0.6, label='Oversold (30)')
+        axs[1].set_ylabel("RSI")
+        self.rsi_text = axs[1].text(1, 1.02, '', transform=axs[1].transAxes, ha='right', fontsize=10, va='bottom')
+
+        # MACD, signal line, histogram and crossover markers
+        self.macd_line, = axs[2].plot([], [], label='MACD Line', color='blue')
+        self.signal_line, = axs[2].plot([], [], label='Signal Line', color='red')
+        # The histogram is a single collection of rectangles instead of one artist per bar
+        self.histogram = axs[2].add_collection(PolyCollection([], label='MACD Histogram', facecolor='grey',
+                                                              edgecolor='none', alpha=0.7))
+        self.buy_markers = axs[2].scatter([], [], marker='^', color='green', s=30, label='Buy', zorder=3)
+        self.sell_markers = axs[2].scatter([], [], marker='v', color='red', s=30, label='Sell', zorder=3)
+        axs[2].set_ylabel("MACD Value")
+        self.signal_text = axs[2].text(1, 1.065, '', fontsize=10, ha='right', va='top', transform=axs[2].transAxes)
+
+        # Stochastic oscillator with horizontal lines at 80 and 20
+        self.k_line, = axs[3].plot([], [], label='K Line', color='blue')
+        self.d_line, = axs[3].plot([], [], label='D Line', color='red')
+        axs[3].axhline(80, color='gray', linestyle='dashed', alpha=0.6, label='Overbought (80)')
+        axs[3].axhline(20, color='gray', linestyle='dashed', alpha=0.6, label='Oversold (20)')
+        axs[3].set_ylabel("%K and %D")
+
+        self.legends = [ax.legend() for ax in axs]
+
+    def set_line(self, line, x, y):
+        if self.decimation:
+            x, y = decimate(x, y, self.points, self.decimation)
+        line.set_data(x, y)
+
+    def update(self, job):
+        ticker = job['ticker']
+        hist = job['hist']
+        time_period = job['time_period']
+        axs = self.axs
+        dates = mdates.date2num(hist.index)
+
+        if '.jo' in ticker.lower():
+            close_prices = hist['Close'] / 100
+            currency_label = "Price (ZAR)"
+        else:
+            close_prices = hist['Close']
+            currency_label = 'Price (USD)'
+
+        self.set_line(self.price_line, dates, close_prices.to_numpy())
+        axs[0].set_title(f"{ticker} Close Price")
+        axs[0].set_ylabel(currency_label)
+
+        ma_labels = self.legends[0].get_texts()
+        interval = job.get('interval', "1d")
+        for line, label, window_size in zip(self.ma_lines, ma_labels, moving_average_windows(time_period, interval)):
+            self.set_line(line, dates, close_prices.rolling(window=window_size).mean().to_numpy())
+            label.set_text(f'{window_size} {INTERVAL_UNITS[interval]} MA')
+
+        last_close_price = round(close_prices.iloc[-1], 2)
+        self.last_close_text.set_text(f'Last Close: {last_close_price}{currency_label[6:]}')
+
+        # Bollinger Bands are only drawn for the shorter periods
+        show_bands = time_period in ['3mo', '6mo', '1y']
+        if show_bands:
+            rolling_mean = close_prices.rolling(window=20).mean()
+            rolling_std = close_prices.rolling(window=20).std()
+            self.set_line(self.band_lines[0], dates, (rolling_mean + rolling_std * 2).to_numpy())
+            self.set_line(self.band_lines[1], dates, (rolling_mean - rolling_std * 2).to_numpy())
+        for line in self.band_lines:
+            line.set_visible(show_bands)
+
+        rsi = job['rsi']
+        self.set_line(self.rsi_line, mdates.date2num(rsi.index), rsi.to_numpy())
+        axs[1].set_title(f"{ticker} RSI")
+        last_rsi = rsi.iloc[-1]
+        if last_rsi < 30:
+            indicator = 'Potential Buy'
+        elif last_rsi > 70:
+            indicator = 'Potential Sell'
+        else:
+            indicator = 'Neutral'
+        self.rsi_text.set_text(f'Indicator: {indicator}')
+
+        macd = job['macd']
+        macd_dates = mdates.date2num(macd.index)
+        self.set_line(self.macd_line, macd_dates, macd['MACD_12_26_9'].to_numpy())
+        self.set_line(self.signal_line, macd_dates, macd['MACDs_12_26_9'].to_numpy())
+        histogram = macd['MACDh_12_26_9'].to_numpy()
+        if self.decimation:
+            bar_dates, bar_heights, width = histogram_buckets(macd_dates, histogram, self.points // 2)
+        else:
+            bar_dates, bar_heights, width = histogram_buckets(macd_dates, histogram, len(histogram))
+        self.histogram.set_verts(bar_vertices(bar_dates, bar_heights, width))
+
+        events = job['events']
+        macd_events = events[events['Indicator'] == 'MACD']
+        for markers, signal in ((self.buy_markers, 'Buy'), (self.sell_markers, 'Sell')):
+            selected = macd_events[macd_events['Signal'] == signal]
+            markers.set_offsets(np.column_stack([mdates.date2num(selected['Date']), selected['Value'].to_numpy()]))
+
+        if not macd_events.empty:
+            last_crossover = macd_events.iloc[-1]
+            self.signal_text.set_text(
+                f'Last Signal: {last_crossover["Signal"]} ({last_crossover["Date"].strftime("%Y-%m-%d")})')
+            self.signal_text.set_color('green' if last_crossover['Signal'] == 'Buy' else 'red')
+        else:
+            self.signal_text.set_text('')
+        axs[2].set_title(f"{ticker} MACD")
+
+        stoch = job['stoch']
+        stoch_dates = mdates.date2num(stoch.index)
+        self.set_line(self.k_line, stoch_dates, stoch['STOCHk_14_3_3'].to_numpy())
+        self.set_line(self.d_line, stoch_dates, stoch['STOCHd_14_3_3'].to_numpy())
+        axs[3].set_title(f"{ticker} Stochastic Oscillator")
+
+        for ax in axs:
+            ax.relim(visible_only=True)
+        # relim() skips collections, so the histogram bars are added to the limits by hand
+        if len(bar_dates):
+            axs[2].update_datalim(np.column_stack([bar_dates, np.nan_to_num(bar_heights)]))
+        for ax in axs:
+            ax.autoscale_view()
+
+    def close(self):
+        self.fig.clear()
+
+
+class FundamentalsPageTemplate:
+    # The fundamentals table page; the table cells are created once and re-labelled per ticker
+    def __init__(self, fields):
+        self.fields = list(fields)
+        self.fig = Figure(figsize=(12.65, 1))
+        ax = self.fig.subplots()
+        ax.axis('tight')
+        ax.axis('off')
+        cells = [[field, '', ''] for field in self.fields]
+        self.table = ax.table(cellText=cells, colLabels=["Metric", "Value", "Indicator"], cellLoc='center',
+                              loc='center')
+
+    def update(self, job):
+        fundamentals = job['fundamentals']
+        verdicts = job['verdicts']
+        for row, col in enumerate(self.fields, start=1):
+            value = fundamentals.get(col) if fundamentals is not None else None
+            if fundamentals is None:
+                text = ''
+            elif value is None or pd.isna(value):
+                text = 'N/A'
+            else:
+                text = str(value)
+            self.table[row, 1].get_text().set_text(text)
+            self.table[row, 2].get_text().set_text(verdicts.get(col, '') if verdicts is not None else '')
+
+    def close(self):
+        self.fig.clear()
+
+
+class PageTemplates:
+    # One chart template and one table template, reused for every ticker a process renders
+    def __init__(self):
+        self.chart = ChartPageTemplate()
+        self.table = FundamentalsPageTemplate(FUNDAMENTAL_FIELDS)
+
+    def render(self, pdf, job):
+        with tracing.span('render.page', ticker=job['ticker']):
+            with tracing.span('render.draw'):
+                self.chart.update(job)
+            with tracing.span('render.savefig'):
+                pdf.savefig(self.chart.fig)
+            with tracing.span('render.draw'):
+                self.table.update(job)
+            with tracing.span('render.savefig'):
+                pdf.savefig(self.table.fig, bbox_inches='tight')
+
+    def close(self):
+        self.chart.close()
+        self.table.close()
+
+
+# Templates owned by a worker process, created by init_worker
+worker_templates = None
+
+
+def init_worker(trace=False):
+    global worker_templates
+    worker_templates = PageTemplates()
+    # A forked worker starts with a copy of the parent's records, drop them so they
+    # aren't sent back twice
+    tracing.tracer.reset()
+    if trace:
+        tracing.tracer.enable()
+
+
+def render_ticker_pdf(job, path):
+    # Worker entry point: renders one ticker's pages into their own PDF file and hands
+    # back the spans it recorded, if tracing is on
+    with PdfPages(path) as pdf:
+        worker_templates.render(pdf, job)
+    return path, tracing.tracer.drain()
+
+
+def merge_pdfs(paths, output_path):
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    for path in paths:
+        writer.append(path)
+    with open(output_path, 'wb') as file:
+        writer.write(file)
+    writer.close()
+
+
+class ReportRenderer:
+    # Renders the per-ticker report pages. With more than one worker the pages are
+    # drawn in a process pool on the Agg canvas, one PDF per ticker, and then merged
+    # into the output file in the original ticker order.
+    def __init__(self, workers=None):
+        self.workers = workers if workers is not None else os.cpu_count() or 1
+
+    def render(self, jobs, output_path, on_page=None, cancelled=None):
+        # on_page(job) is called as each ticker finishes. If cancelled() turns true the
+        # remaining tickers are skipped and the pages rendered so far are still written;
+        # the number of rendered tickers is returned. `jobs` may be any iterable, such as
+        # AnalysisPipeline.page_jobs(); pages are drawn as the jobs arrive, with at most
+        # two per worker in flight.
+        try:
+            import pypdf  # noqa: F401 - merging per-ticker PDFs needs pypdf
+            parallel = self.workers > 1 and (not hasattr(jobs, '__len__') or len(jobs) > 1)
+        except ImportError:
+            parallel = False
+
+        if not parallel:
+            rendered = 0
+            templates = PageTemplates()
+            try:
+                with PdfPages(output_path) as pdf:
+                    for job in jobs:
+                        if cancelled is not None and cancelled():
+                            break
+                        templates.render(pdf, job)
+                        rendered += 1
+                        if on_page is not None:
+                            on_page(job)
+            finally:
+                templates.close()
+            return rendered
+
+        tmp_dir = tempfile.mkdtemp(prefix="report_pages_")
+        try:
+            done = {}
+            pending = {}
+            with concurrent.futures.ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                                        initargs=(tracing.tracer.enabled,)) as executor:
+
+                def collect():
+                    finished, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in finished:
+                        index, job = pending.pop(future)
+                        path, trace = future.result()
+                        tracing.tracer.merge(trace)
+                        done[index] = path
+                        if on_page is not None:
+                            on_page(job)
+
+                for index, job in enumerate(jobs):
+                    while len(pending) >= 2 * self.workers:
+                        collect()
+                    if cancelled is not None and cancelled():
+                        break
+                    path = os.path.join(tmp_dir, f"{index:05d}.pdf")
+                    pending[executor.submit(render_ticker_pdf, job, path)] = (index, job)
+                while pending and not (cancelled is not None and cancelled()):
+                    collect()
+                for future in pending:
+                    future.cancel()
+            # Merge whatever finished, still in the original ticker order
+            merge_pdfs([done[index] for index in sorted(done)], output_path)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        return len(done)
@@ -0,0 +1,108 @@
+import json
+import operator
+import numpy as np
+import pandas as pd
+
+COMPARISONS = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+# Points each verdict adds to a ticker's score
+VERDICT_POINTS = {'Positive': 1.0, 'Negative': -1.0, 'Neutral': 0.0}
+
+
+class Rule:
+    # Threshold rule for one fundamentals column. `positive` and `negative` are
+    # (comparison, threshold) pairs such as ('<', 15); a value matching neither gets
+    # `otherwise`. Missing or non-numeric values get `missing` and are left out of the score.
+    def __init__(self, column, positive=None, negative=None, otherwise="Neutral", missing="N/A", weight=1.0):
+        self.column = column
+        self.positive = tuple(positive) if positive else None
+        self.negative = tuple(negative) if negative else None
+        self.otherwise = otherwise
+        self.missing = missing
+        self.weight = weight
+
+    def test(self, values, condition):
+        if condition is None:
+            return np.zeros(len(values), dtype=bool)
+        comparison, threshold = condition
+        with np.errstate(invalid='ignore'):
+            return COMPARISONS[comparison](values, threshold)
+
+    def evaluate(self, frame):
+        # Verdicts for every row of `frame` at once, plus the mask of rows that had a value
+        if self.column in frame:
+            values = pd.to_numeric(frame[self.column], errors='coerce').to_numpy(dtype=float)
+        else:
+            values = np.full(len(frame), np.nan)
+        present = ~np.isnan(values)
+        verdicts = np.select([~present, self.test(values, self.positive), self.test(values, self.negative)],
+                             [self.missing, "Positive", "Negative"], self.otherwise)
+        return verdicts, present
+
+    def to_dict(self):
+        return {'column': self.column, 'positive': self.positive, 'negative': self.negative,
+                'otherwise': self.otherwise, 'missing': self.missing, 'weight': self.weight}
+
+
+# The verdicts the report has always shown. Market Cap is informational only.
+DEFAULT_RULES = [
+    Rule('Market Cap', otherwise="Info", weight=0),
+    # Lower P/E might indicate undervalued
+    Rule('Trailing PE', positive=('<', 15), negative=('>', 30)),
+    Rule('EPS', positive=('>', 0), otherwise="Negative"),
+    Rule('Dividend Yield', positive=('>', 0.03)),
+    # Lower P/B might indicate undervalued
+    Rule('Price to Book', positive=('<', 1), otherwise="Negative"),
+    Rule('Debt to Equity', positive=('<', 0.5), otherwise="Negative"),
+    # Higher ROE indicates efficient use of equity to generate profits
+    Rule('Return on Equity', positive=('>', 0.15), otherwise="Negative"),
+]
+
+
+def load_rules(path):
+    # Rules from a JSON list of Rule keyword dicts, e.g.
+    # [{"column": "Trailing PE", "positive": ["<", 12], "negative": [">", 25]}]
+    with open(path, 'r') as file:
+        return [Rule(**config) for config in json.load(file)]
+
+
+def save_rules(rules, path):
+    with open(path, 'w') as file:
+        json.dump([rule.to_dict() for rule in rules], file, indent=2)
+
+
+class FundamentalScorer:
+    # Applies the rules to a whole fundamentals DataFrame (one row per ticker) in one pass.
+    # The result has one verdict column per rule plus:
+    #   Score     weighted mean of the verdict points (+1/0/-1) over the rules with data
+    #   Coverage  share of the weighted rules that had data; Score is NaN when it's 0
+    def __init__(self, rules=None):
+        self.rules = rules if rules is not None else DEFAULT_RULES
+
+    def score(self, fundamentals):
+        table = pd.DataFrame(index=fundamentals.index)
+        points = np.zeros(len(fundamentals))
+        weights = np.zeros(len(fundamentals))
+        total_weight = 0.0
+        for rule in self.rules:
+            verdicts, present = rule.evaluate(fundamentals)
+            table[rule.column] = verdicts
+            if rule.weight:
+                total_weight += rule.weight
+                rule_points = sum(np.where(verdicts == verdict, value, 0.0)
+                                  for verdict, value in VERDICT_POINTS.items())
+                points += np.where(present, rule_points * rule.weight, 0.0)
+                weights += np.where(present, rule.weight, 0.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            table['Score'] = np.where(weights > 0, points / weights, np.nan)
+        table['Coverage'] = weights / total_weight if total_weight else 0.0
+        return table
+
+
+def score_fundamentals(fundamentals, rules=None):
+    return FundamentalScorer(rules).score(fundamentals)
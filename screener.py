@@ -0,0 +1,223 @@
+import argparse
+import os
+import sys
+import numpy as np
+from batch_report import read_tickers
+
+
+class AboveSMA:
+    # Latest close above its `window` day simple moving average
+    def __init__(self, window):
+        self.window = window
+        self.name = f"Above SMA {window}"
+        self.sma_windows = (window,)
+
+    def evaluate(self, panel):
+        close = panel.data['Close'][-1]
+        sma = panel.indicators[f'SMA_{self.window}'][-1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            margin = close / sma - 1
+        return close > sma, margin
+
+
+class RSIBand:
+    # Latest RSI inside [low, high]; the margin is the distance to the nearest edge
+    def __init__(self, low=30, high=70):
+        self.low = low
+        self.high = high
+        self.name = f"RSI {low}-{high}"
+        self.sma_windows = ()
+
+    def evaluate(self, panel):
+        rsi = panel.indicators['RSI_14'][-1]
+        return (rsi >= self.low) & (rsi <= self.high), np.minimum(rsi - self.low, self.high - rsi)
+
+
+class MACDState:
+    # MACD line above (bullish) or below (bearish) its signal line on the latest bar
+    def __init__(self, bullish=True):
+        self.bullish = bullish
+        self.name = "MACD bullish" if bullish else "MACD bearish"
+        self.sma_windows = ()
+
+    def evaluate(self, panel):
+        spread = panel.indicators['MACD_12_26_9'][-1] - panel.indicators['MACDs_12_26_9'][-1]
+        if not self.bullish:
+            spread = -spread
+        with np.errstate(divide='ignore', invalid='ignore'):
+            margin = spread / panel.data['Close'][-1]
+        return spread > 0, margin
+
+
+# The screen indicators.py sketched: price above both the 50 and 200 day SMA
+DEFAULT_CONDITIONS = [AboveSMA(50), AboveSMA(200)]
+
+
+def percentile_rank(values):
+    # Cross-sectional rank in [0, 1]; NaNs rank lowest
+    order = np.argsort(np.where(np.isnan(values), -np.inf, values), kind='stable')
+    ranks = np.empty(len(values))
+    ranks[order] = np.arange(len(values))
+    return ranks / max(len(values) - 1, 1)
+
+
+class Screener:
+    # Scans a universe of tickers chunk by chunk: each chunk of `chunk_size` tickers is
+    # downloaded, turned into an IndicatorPanel and reduced to its latest bar in one
+    # vectorized cross-sectional pass, so memory follows the chunk rather than the
+    # exchange. The survivors are ranked by their average percentile margin across the
+    # conditions over the whole universe.
+    def __init__(self, provider, conditions=None, time_period="1y", chunk_size=500):
+        self.provider = provider
+        self.conditions = conditions if conditions is not None else DEFAULT_CONDITIONS
+        self.time_period = time_period
+        self.chunk_size = chunk_size
+        # Histories of the tickers that passed, for charting them afterwards
+        self.histories = {}
+
+    def sma_windows(self):
+        windows = {50, 200}
+        for condition in self.conditions:
+            windows.update(condition.sma_windows)
+        return tuple(sorted(windows))
+
+    def evaluate_chunk(self, tickers):
+        # Latest-bar table of one chunk; the panel is dropped once it has been read
+        import pandas as pd
+        from Stocks import InvestmentAnalyzer
+
+        analyzer = InvestmentAnalyzer(tickers, self.time_period, provider=self.provider)
+        analyzer.histories = self.provider.fetch_history(tickers, self.time_period)
+        analyzer.build_panel(self.sma_windows())
+        panel = analyzer.panel
+        if not panel.tickers:
+            return None
+
+        table = pd.DataFrame({
+            'Ticker': panel.tickers,
+            'Close': panel.data['Close'][-1],
+            'RSI': panel.indicators['RSI_14'][-1],
+        })
+        passed = np.ones(len(panel.tickers), dtype=bool)
+        for condition in self.conditions:
+            mask, margin = condition.evaluate(panel)
+            table[condition.name] = margin
+            passed &= mask
+        table['Passed'] = passed
+        for ticker in table.loc[passed, 'Ticker']:
+            self.histories[ticker] = analyzer.histories[ticker]
+        return table
+
+    def run(self, universe):
+        import pandas as pd
+
+        universe = list(dict.fromkeys(universe))
+        self.histories = {}
+        tables = [self.evaluate_chunk(universe[start:start + self.chunk_size])
+                  for start in range(0, len(universe), self.chunk_size)]
+        tables = [table for table in tables if table is not None]
+        columns = ['Ticker', 'Close', 'RSI'] + [condition.name for condition in self.conditions] + ['Passed']
+        table = pd.concat(tables, ignore_index=True) if tables else pd.DataFrame(columns=columns)
+
+        # Ranks are cross-sectional, so they wait until every chunk is in
+        score = np.zeros(len(table))
+        for condition in self.conditions:
+            score += percentile_rank(table[condition.name].to_numpy(dtype=float))
+        table['Score'] = score / max(len(self.conditions), 1)
+        table['Passed'] = table['Passed'].astype(bool)
+        table = table[columns[:-1] + ['Score', 'Passed']]
+        return table.sort_values(['Passed', 'Score'], ascending=False, ignore_index=True)
+
+    def analyzer(self, tickers):
+        # InvestmentAnalyzer with the indicators of some of the tickers that passed
+        from Stocks import InvestmentAnalyzer
+
+        analyzer = InvestmentAnalyzer(list(tickers), self.time_period, provider=self.provider)
+        analyzer.histories = {ticker: self.histories[ticker] for ticker in tickers if ticker in self.histories}
+        analyzer.build_panel(self.sma_windows())
+        return analyzer
+
+    def apply_fundamentals(self, table, scores, min_score=None):
+        # Adds the fundamentals score (see scoring.py) to the table. With min_score, tickers
+        # scoring below it, or without any fundamentals, no longer pass.
+        table = table.copy()
+        table['Fundamental Score'] = table['Ticker'].map(scores['Score']).astype(float)
+        if min_score is not None:
+            table['Passed'] &= table['Fundamental Score'].ge(min_score)
+        return table.sort_values(['Passed', 'Score'], ascending=False, ignore_index=True)
+
+    def survivors(self, table, top=None):
+        tickers = table.loc[table['Passed'], 'Ticker'].tolist()
+        return tickers[:top] if top is not None else tickers
+
+
+def build_conditions(args):
+    conditions = [AboveSMA(window) for window in args.above_sma]
+    if args.rsi_band:
+        conditions.append(RSIBand(*args.rsi_band))
+    if args.macd:
+        conditions.append(MACDState(bullish=args.macd == 'bullish'))
+    return conditions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Screen a universe of tickers and chart the survivors.")
+    parser.add_argument('universe', help="file with the tickers to scan")
+    parser.add_argument('--period', default='1y')
+    parser.add_argument('--above-sma', type=int, nargs='*', default=[50, 200], metavar='WINDOW')
+    parser.add_argument('--rsi-band', type=float, nargs=2, metavar=('LOW', 'HIGH'))
+    parser.add_argument('--macd', choices=['bullish', 'bearish'])
+    parser.add_argument('--min-fundamental-score', type=float, metavar='SCORE',
+                        help="also require this fundamentals score (-1 to 1) from the technical survivors")
+    parser.add_argument('--rules', help="JSON file with the fundamentals scoring rules")
+    parser.add_argument('--top', type=int, default=50, help="chart at most this many survivors")
+    parser.add_argument('--no-charts', action='store_true')
+    parser.add_argument('--data-dir', help="read prices from <TICKER>.csv files instead of Yahoo Finance")
+    parser.add_argument('--cache-dir', default='cache')
+    parser.add_argument('--output-dir', default='.')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args(argv)
+
+    from data_provider import FileDataProvider, YahooDataProvider
+    from history_cache import CachedDataProvider, HistoryCache
+
+    if args.data_dir:
+        provider = FileDataProvider(args.data_dir)
+    else:
+        provider = CachedDataProvider(YahooDataProvider(), HistoryCache(os.path.join(args.cache_dir, "history")))
+
+    from Fundamental_analysis import FundamentalAnalyzer
+    from scoring import load_rules, score_fundamentals
+
+    screener = Screener(provider, build_conditions(args), args.period)
+    table = screener.run(read_tickers(args.universe))
+    survivors = screener.survivors(table)
+
+    # Only the technical survivors get fundamentals, scored once for the table and the pages.
+    # Without a fundamentals filter only the charted top survivors need them.
+    fundamentals = scores = None
+    if survivors and args.min_fundamental_score is None:
+        survivors = survivors[:args.top]
+    if survivors and (args.min_fundamental_score is not None or not args.no_charts):
+        fundamentals = FundamentalAnalyzer(survivors, provider=provider).analyze_data()
+        scores = score_fundamentals(fundamentals, load_rules(args.rules) if args.rules else None)
+        table = screener.apply_fundamentals(table, scores, args.min_fundamental_score)
+        survivors = screener.survivors(table)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    table.to_csv(os.path.join(args.output_dir, 'screener_results.csv'), index=False)
+    survivors = survivors[:args.top]
+    print(f"{int(table['Passed'].sum())} of {len(table)} tickers passed the screen")
+
+    if survivors and not args.no_charts:
+        from report_renderer import ReportRenderer, build_page_jobs
+
+        analyzer = screener.analyzer(survivors)
+        signals = analyzer.detect_signals()
+        jobs = build_page_jobs(survivors, fundamentals, analyzer, signals, args.period, scores)
+        ReportRenderer(args.workers).render(jobs, os.path.join(args.output_dir, 'screener_results.pdf'))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
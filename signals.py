@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+
+EVENT_COLUMNS = ['Ticker', 'Date', 'Indicator', 'Signal', 'Value']
+
+
+def as_2d(values):
+    values = np.asarray(values, dtype=float)
+    return values[:, None] if values.ndim == 1 else values
+
+
+def previous(values):
+    # Shifts a (time x ticker) array down one bar, padding the first row with NaN
+    shifted = np.empty_like(values)
+    shifted[0] = np.nan
+    shifted[1:] = values[:-1]
+    return shifted
+
+
+def cross_above(a, b):
+    # True where `a` moves from at or below `b` to above it; NaNs never cross
+    a, b = as_2d(a), as_2d(b)
+    return (a > b) & (previous(a) <= previous(b))
+
+
+def cross_below(a, b):
+    a, b = as_2d(a), as_2d(b)
+    return (a < b) & (previous(a) >= previous(b))
+
+
+def mask_events(mask, dates, tickers, indicator, signal, values):
+    rows, cols = np.nonzero(mask)
+    # `dates` is either shared by all tickers or a (time x ticker) array of their own timestamps
+    dates = np.asarray(dates)
+    return pd.DataFrame({
+        'Ticker': np.asarray(tickers, dtype=object)[cols],
+        'Date': dates[rows, cols] if dates.ndim == 2 else dates[rows],
+        'Indicator': indicator,
+        'Signal': signal,
+        'Value': as_2d(values)[rows, cols],
+    })
+
+
+def detect_signals(dates, tickers, close=None, rsi=None, macd=None, macd_signal=None, stoch_k=None, sma=None,
+                   rsi_bands=(30, 70), stoch_bands=(20, 80)):
+    # Finds every signal event for one ticker (1-D arrays) or a whole panel of tickers
+    # ((time x ticker) arrays) and returns them as one event table.
+    # `sma` maps a window size to its moving average array.
+    events = []
+
+    if macd is not None and macd_signal is not None:
+        events.append(mask_events(cross_above(macd, macd_signal), dates, tickers, 'MACD', 'Buy', macd))
+        events.append(mask_events(cross_below(macd, macd_signal), dates, tickers, 'MACD', 'Sell', macd))
+
+    if rsi is not None:
+        low, high = rsi_bands
+        events.append(mask_events(cross_below(rsi, np.full_like(as_2d(rsi), low)), dates, tickers, 'RSI', 'Buy', rsi))
+        events.append(mask_events(cross_above(rsi, np.full_like(as_2d(rsi), high)), dates, tickers, 'RSI', 'Sell', rsi))
+
+    if stoch_k is not None:
+        low, high = stoch_bands
+        k = as_2d(stoch_k)
+        events.append(mask_events(cross_below(k, np.full_like(k, low)), dates, tickers, 'Stochastic', 'Buy', k))
+        events.append(mask_events(cross_above(k, np.full_like(k, high)), dates, tickers, 'Stochastic', 'Sell', k))
+
+    if close is not None and sma:
+        for window, average in sma.items():
+            events.append(mask_events(cross_above(close, average), dates, tickers, f'SMA {window}', 'Buy', close))
+            events.append(mask_events(cross_below(close, average), dates, tickers, f'SMA {window}', 'Sell', close))
+
+    events = [frame for frame in events if not frame.empty]
+    if not events:
+        return pd.DataFrame(columns=EVENT_COLUMNS)
+    return pd.concat(events, ignore_index=True).sort_values(['Ticker', 'Date'], kind='stable', ignore_index=True)
+
+
+def ticker_signals(ticker, hist, rsi, macd, stoch, sma_windows=(50, 200)):
+    # Convenience wrapper for the per-ticker pandas objects produced by InvestmentAnalyzer
+    close = hist['Close'].to_numpy(dtype=float)
+    sma = {window: hist['Close'].rolling(window=window).mean().to_numpy() for window in sma_windows}
+    return detect_signals(hist.index, [ticker], close=close,
+                          rsi=rsi.reindex(hist.index).to_numpy(dtype=float),
+                          macd=macd['MACD_12_26_9'].reindex(hist.index).to_numpy(dtype=float),
+                          macd_signal=macd['MACDs_12_26_9'].reindex(hist.index).to_numpy(dtype=float),
+                          stoch_k=stoch['STOCHk_14_3_3'].reindex(hist.index).to_numpy(dtype=float),
+                          sma=sma)
+
+
+def last_signal(events, ticker, indicator):
+    # Most recent event row for one ticker and indicator, or None
+    selected = events[(events['Ticker'] == ticker) & (events['Indicator'] == indicator)]
+    if selected.empty:
+        return None
+    return selected.iloc[-1]
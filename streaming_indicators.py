@@ -0,0 +1,262 @@
+import copy
+import math
+from collections import deque
+
+NAN = float('nan')
+
+
+class StreamingIndicator:
+    # Base for the incremental indicators below. Each one takes a single new bar per
+    # update() call in O(1) (amortised for the rolling min/max) and its state can be
+    # saved with snapshot() and put back with restore(), e.g. next to a cached history.
+    def snapshot(self):
+        return copy.deepcopy(self.__dict__)
+
+    def restore(self, state):
+        self.__dict__.update(copy.deepcopy(state))
+        return self
+
+
+class StreamingSMA(StreamingIndicator):
+    # Rolling mean over `length` values; NaNs before the first value are skipped and
+    # later NaNs make the mean NaN until they leave the window, like rolling().mean()
+    def __init__(self, length):
+        self.length = length
+        self.window = deque()
+        self.total = 0.0
+        self.valid = 0
+        self.value = NAN
+
+    def update(self, x):
+        if not self.window and math.isnan(x):
+            return NAN
+        self.window.append(x)
+        if not math.isnan(x):
+            self.total += x
+            self.valid += 1
+        if len(self.window) > self.length:
+            old = self.window.popleft()
+            if not math.isnan(old):
+                self.total -= old
+                self.valid -= 1
+        self.value = self.total / self.length if self.valid == self.length else NAN
+        return self.value
+
+
+class StreamingRollingStats(StreamingIndicator):
+    # Rolling mean and sample standard deviation over `length` values, updated with
+    # Welford's method so the variance doesn't lose precision on long streams. NaNs
+    # are handled like StreamingSMA: skipped before the first value, and later ones
+    # make both NaN until they leave the window.
+    def __init__(self, length):
+        self.length = length
+        self.window = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.valid = 0
+
+    def update(self, x):
+        if not self.window and math.isnan(x):
+            return NAN, NAN
+        self.window.append(x)
+        old = self.window.popleft() if len(self.window) > self.length else NAN
+        if math.isnan(old):
+            if not math.isnan(x):
+                self.add(x)
+        elif math.isnan(x):
+            self.remove(old)
+        else:
+            previous_mean = self.mean
+            self.mean += (x - old) / self.valid
+            self.m2 += (x - old) * (x - self.mean + old - previous_mean)
+        return self.current()
+
+    def add(self, x):
+        self.valid += 1
+        delta = x - self.mean
+        self.mean += delta / self.valid
+        self.m2 += delta * (x - self.mean)
+
+    def remove(self, x):
+        self.valid -= 1
+        if not self.valid:
+            self.mean = self.m2 = 0.0
+            return
+        delta = x - self.mean
+        self.mean -= delta / self.valid
+        self.m2 -= delta * (x - self.mean)
+
+    def current(self):
+        if self.valid < self.length:
+            return NAN, NAN
+        return self.mean, math.sqrt(max(self.m2, 0.0) / (self.length - 1))
+
+
+class StreamingBollinger(StreamingIndicator):
+    def __init__(self, length=20, std=2.0):
+        self.std = std
+        self.stats = StreamingRollingStats(length)
+
+    def update(self, close):
+        mean, std = self.stats.update(close)
+        return mean - self.std * std, mean, mean + self.std * std
+
+
+class StreamingEMA(StreamingIndicator):
+    # EMA seeded with the SMA of the first `length` values, as pandas_ta's ema() does
+    def __init__(self, length):
+        self.length = length
+        self.alpha = 2.0 / (length + 1)
+        self.seed = []
+        self.value = NAN
+
+    def update(self, x):
+        if math.isnan(self.value):
+            if math.isnan(x):
+                return NAN
+            self.seed.append(x)
+            if len(self.seed) == self.length:
+                self.value = sum(self.seed) / self.length
+                self.seed = []
+            return self.value
+        if not math.isnan(x):
+            self.value = self.alpha * x + (1 - self.alpha) * self.value
+        return self.value
+
+
+class StreamingRMA(StreamingIndicator):
+    # Wilder's moving average as computed by pandas_ta: ewm(alpha=1/length,
+    # min_periods=length).mean() with pandas' default adjust=True weighting
+    def __init__(self, length):
+        self.length = length
+        self.decay = 1.0 - 1.0 / length
+        self.numerator = 0.0
+        self.denominator = 0.0
+        self.count = 0
+
+    def update(self, x):
+        self.numerator *= self.decay
+        self.denominator *= self.decay
+        if not math.isnan(x):
+            self.numerator += x
+            self.denominator += 1.0
+            self.count += 1
+        if self.count < self.length or self.denominator == 0:
+            return NAN
+        return self.numerator / self.denominator
+
+
+class StreamingRSI(StreamingIndicator):
+    def __init__(self, length=14):
+        self.gains = StreamingRMA(length)
+        self.losses = StreamingRMA(length)
+        self.previous = None
+        self.value = NAN
+
+    def update(self, close):
+        if self.previous is None:
+            self.previous = close
+            return NAN
+        change = close - self.previous
+        self.previous = close
+        gain = self.gains.update(max(change, 0.0))
+        loss = self.losses.update(max(-change, 0.0))
+        total = gain + loss
+        self.value = 100.0 * gain / total if total else NAN
+        return self.value
+
+
+class StreamingMACD(StreamingIndicator):
+    # Returns (macd, histogram, signal), the same three columns as ta.macd()
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = StreamingEMA(fast)
+        self.slow = StreamingEMA(slow)
+        self.signal = StreamingEMA(signal)
+
+    def update(self, close):
+        macd = self.fast.update(close) - self.slow.update(close)
+        signal = self.signal.update(macd)
+        return macd, macd - signal, signal
+
+
+class StreamingRollingExtreme(StreamingIndicator):
+    # Rolling max (or min) over `length` values using a monotonic deque of (index, value)
+    def __init__(self, length, maximum=True):
+        self.length = length
+        self.maximum = maximum
+        self.candidates = deque()
+        self.index = 0
+
+    def update(self, x):
+        if self.maximum:
+            while self.candidates and self.candidates[-1][1] <= x:
+                self.candidates.pop()
+        else:
+            while self.candidates and self.candidates[-1][1] >= x:
+                self.candidates.pop()
+        self.candidates.append((self.index, x))
+        if self.candidates[0][0] <= self.index - self.length:
+            self.candidates.popleft()
+        self.index += 1
+        return self.candidates[0][1] if self.index >= self.length else NAN
+
+
+class StreamingStochastic(StreamingIndicator):
+    # Returns (%K, %D) as ta.stoch(k, d, smooth_k) does
+    def __init__(self, k=14, d=3, smooth_k=3):
+        self.highest = StreamingRollingExtreme(k, maximum=True)
+        self.lowest = StreamingRollingExtreme(k, maximum=False)
+        self.smooth_k = StreamingSMA(smooth_k)
+        self.smooth_d = StreamingSMA(d)
+
+    def update(self, high, low, close):
+        highest = self.highest.update(high)
+        lowest = self.lowest.update(low)
+        if math.isnan(highest) or highest == lowest:
+            raw = NAN
+        else:
+            raw = 100.0 * (close - lowest) / (highest - lowest)
+        k = self.smooth_k.update(raw)
+        return k, self.smooth_d.update(k)
+
+
+class StreamingIndicatorSet(StreamingIndicator):
+    # The report's indicators for one ticker: RSI 14, MACD 12/26/9, stochastic 14/3/3,
+    # two SMAs and 20/2 Bollinger Bands, all fed from the same bars
+    def __init__(self, sma_windows=(50, 200)):
+        self.rsi = StreamingRSI(14)
+        self.macd = StreamingMACD(12, 26, 9)
+        self.stoch = StreamingStochastic(14, 3, 3)
+        self.sma = {window: StreamingSMA(window) for window in sma_windows}
+        self.bollinger = StreamingBollinger(20, 2.0)
+        self.last_time = None
+
+    def update(self, time, high, low, close):
+        self.last_time = time
+        macd, histogram, signal = self.macd.update(close)
+        k, d = self.stoch.update(high, low, close)
+        lower, middle, upper = self.bollinger.update(close)
+        values = {
+            'RSI_14': self.rsi.update(close),
+            'MACD_12_26_9': macd,
+            'MACDh_12_26_9': histogram,
+            'MACDs_12_26_9': signal,
+            'STOCHk_14_3_3': k,
+            'STOCHd_14_3_3': d,
+            'BBL_20_2.0': lower,
+            'BBM_20_2.0': middle,
+            'BBU_20_2.0': upper,
+        }
+        for window, sma in self.sma.items():
+            values[f'SMA_{window}'] = sma.update(close)
+        return values
+
+    def extend(self, hist):
+        # Feeds the bars of `hist` that come after the last bar already seen and returns
+        # their indicator values, so appending today's bar only costs one update
+        if self.last_time is not None:
+            hist = hist[hist.index > self.last_time]
+        rows = [self.update(time, high, low, close)
+                for time, high, low, close in zip(hist.index, hist['High'].to_numpy(float),
+                                                  hist['Low'].to_numpy(float), hist['Close'].to_numpy(float))]
+        return rows
@@ -0,0 +1,354 @@
+import argparse
+import itertools
+import json
+import sys
+import warnings
+import numpy as np
+import ta_kernels
+from backtest import BARS_PER_YEAR, Backtester, universe_and_provider
+from signals import cross_above, cross_below
+
+# Parameters each indicator family is swept over by default; every combination of a
+# family's lists is tried. MACD combinations need fast < slow and the MA family takes
+# every (short, long) pair of its windows, which include the report's 200/50, 120/30
+# and 60/15.
+DEFAULT_GRID = {
+    'rsi': {'length': [7, 9, 14, 21, 28], 'bands': [[20, 80], [25, 75], [30, 70], [35, 65]]},
+    'macd': {'fast': [8, 10, 12, 15], 'slow': [21, 26, 30, 35], 'signal': [5, 7, 9, 12]},
+    'stoch': {'k': [9, 14, 21], 'd': [3, 5], 'smooth_k': [1, 3, 5], 'bands': [[20, 80]]},
+    'bbands': {'length': [10, 20, 30], 'std': [1.5, 2.0, 2.5]},
+    'ma': {'windows': [15, 30, 50, 60, 120, 200]},
+}
+
+SWEEP_METRICS = ['Total Return', 'Sharpe', 'Max Drawdown', 'Exposure', 'Trades']
+
+PARAMETER_COLUMNS = ['Family', 'Name', 'length', 'low', 'high', 'fast', 'slow', 'signal', 'k', 'd', 'smooth_k',
+                     'std', 'short', 'long']
+
+
+def load_grid(path):
+    # A grid in the DEFAULT_GRID layout; families left out aren't swept
+    with open(path, 'r') as file:
+        return json.load(file)
+
+
+def combinations(grid):
+    # One parameter dict per combination, in grid order
+    combos = []
+    for family, options in grid.items():
+        if family == 'rsi':
+            for length, (low, high) in itertools.product(options['length'], options['bands']):
+                combos.append({'Family': family, 'Name': f"RSI {length} {low}/{high}",
+                               'length': length, 'low': low, 'high': high})
+        elif family == 'macd':
+            for fast, slow, signal in itertools.product(options['fast'], options['slow'], options['signal']):
+                if fast < slow:
+                    combos.append({'Family': family, 'Name': f"MACD {fast}/{slow}/{signal}",
+                                   'fast': fast, 'slow': slow, 'signal': signal})
+        elif family == 'stoch':
+            for k, d, smooth_k, (low, high) in itertools.product(options['k'], options['d'], options['smooth_k'],
+                                                                  options['bands']):
+                combos.append({'Family': family, 'Name': f"Stochastic {k}/{d}/{smooth_k} {low}/{high}",
+                               'k': k, 'd': d, 'smooth_k': smooth_k, 'low': low, 'high': high})
+        elif family == 'bbands':
+            for length, std in itertools.product(options['length'], options['std']):
+                combos.append({'Family': family, 'Name': f"Bollinger {length}/{std}", 'length': length, 'std': std})
+        elif family == 'ma':
+            for short, long in itertools.combinations(sorted(set(options['windows'])), 2):
+                combos.append({'Family': family, 'Name': f"Above SMA {short}/{long}", 'short': short, 'long': long})
+        else:
+            raise ValueError(f"Unknown indicator family: {family}")
+    return combos
+
+
+class Intermediates:
+    # The building blocks the indicator settings share, each computed at most once per
+    # panel: one EMA per span (every MACD combination is a difference of two of them),
+    # one pair of Wilder averages per RSI length, one rolling high and low per stochastic
+    # window and one rolling mean and standard deviation per Bollinger or MA window.
+    def __init__(self, panel):
+        self.close = panel.data['Close']
+        self.high = panel.data['High']
+        self.low = panel.data['Low']
+        self.memo = {}
+
+    def get(self, key, compute):
+        if key not in self.memo:
+            self.memo[key] = compute()
+        return self.memo[key]
+
+    def ema(self, span):
+        return self.get(('ema', span), lambda: ta_kernels.ema(self.close, span))
+
+    def sma(self, window):
+        return self.get(('sma', window), lambda: ta_kernels.sma(self.close, window))
+
+    def std(self, window):
+        return self.get(('std', window), lambda: ta_kernels.rolling_std(self.close, window))
+
+    def highest(self, window):
+        return self.get(('highest', window), lambda: ta_kernels.rolling_max(self.high, window))
+
+    def lowest(self, window):
+        return self.get(('lowest', window), lambda: ta_kernels.rolling_min(self.low, window))
+
+    def changes(self):
+        # Gains and losses side by side, so each RSI length needs one Wilder average pass
+        def compute():
+            change = ta_kernels.diff(self.close)
+            missing = np.isnan(change)
+            return np.hstack([np.where(missing, np.nan, np.clip(change, 0, None)),
+                              np.where(missing, np.nan, np.clip(-change, 0, None))])
+        return self.get(('changes',), compute)
+
+    def rsi(self, length):
+        def compute():
+            gains, losses = np.hsplit(ta_kernels.rma(self.changes(), length), 2)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return 100 * gains / (gains + losses)
+        return self.get(('rsi', length), compute)
+
+    def macd_line(self, fast, slow):
+        return self.get(('macd', fast, slow), lambda: self.ema(fast) - self.ema(slow))
+
+    def macd_signals(self, pairs, signal):
+        # Signal lines of several (fast, slow) pairs from one EMA pass over the lines laid
+        # side by side. Not memoized: each is used by one combination only.
+        lines = np.hstack([self.macd_line(fast, slow) for fast, slow in pairs])
+        return np.hsplit(ta_kernels.ema(lines, signal), len(pairs))
+
+    def stoch_k(self, k, smooth_k):
+        def compute():
+            highest, lowest = self.highest(k), self.lowest(k)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                raw = 100 * (self.close - lowest) / (highest - lowest)
+            return ta_kernels.sma(raw, smooth_k)
+        return self.get(('stoch_k', k, smooth_k), compute)
+
+    def stoch_d(self, k, smooth_k, d):
+        return self.get(('stoch_d', k, smooth_k, d), lambda: ta_kernels.sma(self.stoch_k(k, smooth_k), d))
+
+    def last_event(self, key, events):
+        # last_rows() of an entry or exit rule, so the combinations sharing a rule scan its
+        # crossings once
+        return self.get(('last', key), lambda: last_rows(events()))
+
+    def above(self, window):
+        # Close above its `window` day SMA, shared by every MA pair using the window
+        def compute():
+            with np.errstate(invalid='ignore'):
+                return self.close > self.sma(window)
+        return self.get(('above', window), compute)
+
+
+def last_rows(events):
+    # Row of the latest event on or before each bar, -1 before the first one
+    rows = np.arange(len(events), dtype=np.int32)[:, None]
+    return np.maximum.accumulate(np.where(events, rows, np.int32(-1)), axis=0)
+
+
+def held_between(last_entry, last_exit):
+    # hold_between() from the latest entry and exit rows: long once there has been an entry
+    # and no exit after it (an entry and an exit on the same bar count as an entry)
+    return (last_entry >= 0) & (last_entry >= last_exit)
+
+
+def family_positions(cache, combos):
+    # Yields (combination number, boolean position array) for every combination. Entry and
+    # exit rules are scanned once and shared by the combinations using them; MACD
+    # combinations sharing a signal span get their signal lines from one batched EMA.
+    macd_groups = {}
+    for number, combo in enumerate(combos):
+        family = combo['Family']
+        close = cache.close
+        if family == 'rsi':
+            length, low, high = combo['length'], combo['low'], combo['high']
+            rsi = cache.rsi(length)
+            entries = cache.last_event(('rsi below', length, low),
+                                       lambda: cross_below(rsi, np.full_like(rsi, low)))
+            exits = cache.last_event(('rsi above', length, high),
+                                     lambda: cross_above(rsi, np.full_like(rsi, high)))
+            yield number, held_between(entries, exits)
+        elif family == 'macd':
+            macd_groups.setdefault(combo['signal'], []).append(number)
+        elif family == 'stoch':
+            # Buy %K crossing above %D while oversold, sell it crossing below %D while overbought
+            k, smooth_k, d, low, high = combo['k'], combo['smooth_k'], combo['d'], combo['low'], combo['high']
+            stoch_k = cache.stoch_k(k, smooth_k)
+            stoch_d = cache.stoch_d(k, smooth_k, d)
+
+            def entries():
+                with np.errstate(invalid='ignore'):
+                    return cross_above(stoch_k, stoch_d) & (stoch_d < low)
+
+            def exits():
+                with np.errstate(invalid='ignore'):
+                    return cross_below(stoch_k, stoch_d) & (stoch_d > high)
+
+            yield number, held_between(cache.last_event(('stoch entry', k, smooth_k, d, low), entries),
+                                       cache.last_event(('stoch exit', k, smooth_k, d, high), exits))
+        elif family == 'bbands':
+            # Mean reversion: buy a close below the lower band, sell once it's back above the middle
+            length, std = combo['length'], combo['std']
+            middle = cache.sma(length)
+            entries = cache.last_event(('bbands lower', length, std),
+                                       lambda: cross_below(close, middle - std * cache.std(length)))
+            exits = cache.last_event(('bbands middle', length), lambda: cross_above(close, middle))
+            yield number, held_between(entries, exits)
+        elif family == 'ma':
+            yield number, cache.above(combo['short']) & cache.above(combo['long'])
+
+    for signal, numbers in macd_groups.items():
+        # Every MACD crossing belongs to one combination only, so nothing is kept
+        pairs = [(combos[number]['fast'], combos[number]['slow']) for number in numbers]
+        for number, (fast, slow), signal_line in zip(numbers, pairs, cache.macd_signals(pairs, signal)):
+            macd = cache.macd_line(fast, slow)
+            yield number, held_between(last_rows(cross_above(macd, signal_line)),
+                                       last_rows(cross_below(macd, signal_line)))
+
+
+def sweep_metrics(returns, log_returns, valid, mask, positions, cost=0.0, lag=1):
+    # The backtest's return, Sharpe, drawdown, exposure and trade count for one boolean
+    # position array, with the per-trade statistics left out to keep each combination cheap
+    positions = mask & positions
+    held = np.zeros_like(positions)
+    held[lag:] = positions[:len(positions) - lag] if lag else positions
+    strategy = np.where(held, returns, 0.0)
+    if cost:
+        strategy -= cost * np.diff(held, axis=0, prepend=False)
+        log_growth = np.log1p(strategy)
+    else:
+        log_growth = np.where(held, log_returns, 0.0)
+
+    bars = np.maximum(valid.sum(axis=0), 1)
+    log_equity = np.cumsum(log_growth, axis=0)
+    mean = strategy.sum(axis=0) / bars
+    variance = (np.where(valid, strategy - mean, 0.0) ** 2).sum(axis=0) / np.maximum(bars - 1, 1)
+    volatility = np.sqrt(variance * BARS_PER_YEAR)
+    entries = held.sum(axis=0) - (held[1:] & held[:-1]).sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.stack([
+            np.expm1(log_equity[-1]),
+            np.where(volatility > 0, mean * BARS_PER_YEAR / volatility, np.nan),
+            np.expm1(np.minimum((log_equity - np.maximum.accumulate(log_equity, axis=0)).min(axis=0), 0.0)),
+            held.sum(axis=0) / bars,
+            entries,
+        ], axis=-1)
+
+
+class SweepResult:
+    # Metrics of every combination for every ticker as one (combination x ticker x metric)
+    # array, with the combinations' parameters as a table
+    def __init__(self, params, tickers, values):
+        self.params = params
+        self.tickers = list(tickers)
+        self.values = values
+
+    def metric(self, name):
+        # (combination x ticker) array of one metric
+        return self.values[:, :, SWEEP_METRICS.index(name)]
+
+    def summary(self, sort_by='Sharpe'):
+        # Median of each metric per combination across the tickers, best first
+        table = self.params.copy()
+        with warnings.catch_warnings():
+            # All-NaN rows (no ticker had data) just give NaN
+            warnings.simplefilter('ignore', RuntimeWarning)
+            for name in SWEEP_METRICS:
+                table[name] = np.nanmedian(self.metric(name), axis=1) if self.tickers else np.nan
+        table['Tickers'] = (~np.isnan(self.metric('Total Return'))).sum(axis=1)
+        return table.sort_values(sort_by, ascending=False, kind='stable')
+
+    def to_frame(self):
+        # Long table with one row per (combination, ticker)
+        combos, tickers = np.meshgrid(np.arange(len(self.params)), np.arange(len(self.tickers)), indexing='ij')
+        frame = self.params.iloc[combos.ravel()].reset_index(drop=True)
+        frame.insert(2, 'Ticker', np.asarray(self.tickers, dtype=object)[tickers.ravel()])
+        for index, name in enumerate(SWEEP_METRICS):
+            frame[name] = self.values[:, :, index].ravel()
+        return frame
+
+    def save(self, path):
+        np.savez_compressed(path, values=self.values, tickers=np.asarray(self.tickers), metrics=SWEEP_METRICS,
+                            params=self.params.to_json(orient='records'))
+
+
+def sweep_panel(panel, combos, cost=0.0, lag=1):
+    # (combination x ticker x metric) array for one panel
+    close = panel.data['Close']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = close[1:] / close[:-1] - 1
+    returns = np.vstack([np.full((1, close.shape[1]), np.nan), returns])
+    valid = ~np.isnan(returns)
+    returns = np.where(valid, returns, 0.0)
+    log_returns = np.log1p(returns)
+
+    values = np.full((len(combos), len(panel.tickers), len(SWEEP_METRICS)), np.nan)
+    cache = Intermediates(panel)
+    for number, positions in family_positions(cache, combos):
+        values[number] = sweep_metrics(returns, log_returns, valid, panel.mask, positions, cost, lag)
+    return values
+
+
+class ParameterSweep:
+    # Evaluates every combination of a parameter grid over a universe, chunk by chunk like
+    # the Backtester. Indicator intermediates are shared within a chunk, so the sweep costs
+    # a fraction of running the combinations one by one.
+    def __init__(self, provider, grid=None, time_period="5y", cost=0.0, lag=1, chunk_size=100):
+        import pandas as pd
+
+        self.provider = provider
+        self.combos = combinations(grid if grid is not None else DEFAULT_GRID)
+        self.params = pd.DataFrame(self.combos, columns=PARAMETER_COLUMNS)
+        self.time_period = time_period
+        self.cost = cost
+        self.lag = lag
+        self.chunk_size = chunk_size
+
+    def run(self, universe):
+        universe = list(dict.fromkeys(universe))
+        backtester = Backtester(self.provider, time_period=self.time_period, chunk_size=self.chunk_size)
+        tickers = []
+        blocks = []
+        for panel in backtester.panels(universe):
+            tickers.extend(panel.tickers)
+            blocks.append(sweep_panel(panel, self.combos, self.cost, self.lag))
+        if blocks:
+            values = np.concatenate(blocks, axis=1)
+        else:
+            values = np.empty((len(self.combos), 0, len(SWEEP_METRICS)))
+        return SweepResult(self.params, tickers, values)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep the indicator parameters over a universe.")
+    parser.add_argument('universe', nargs='?', help="file with the tickers to test")
+    parser.add_argument('--grid', help="JSON parameter grid (defaults to the built-in one)")
+    parser.add_argument('--period', default='5y')
+    parser.add_argument('--cost', type=float, default=0.0, help="cost per unit of position change, 0.001 = 10bp")
+    parser.add_argument('--data-dir', help="read prices from <TICKER>.csv files")
+    parser.add_argument('--store', help="read prices from a history_store.py directory")
+    parser.add_argument('--cache-dir', default='cache', help="price cache used when downloading")
+    parser.add_argument('--synthetic', type=int, metavar='COUNT', help="sweep over COUNT synthetic tickers")
+    parser.add_argument('--chunk-size', type=int, default=100)
+    parser.add_argument('--sort-by', default='Sharpe', choices=SWEEP_METRICS)
+    parser.add_argument('--top', type=int, default=20, help="combinations to print")
+    parser.add_argument('--output', default='sweep_results.csv', help="per-combination medians")
+    parser.add_argument('--tensor', help="also save the full (combination x ticker x metric) array as .npz")
+    args = parser.parse_args(argv)
+
+    universe, provider = universe_and_provider(args, parser)
+    grid = load_grid(args.grid) if args.grid else None
+    sweep = ParameterSweep(provider, grid, time_period=args.period, cost=args.cost, chunk_size=args.chunk_size)
+    result = sweep.run(universe)
+    summary = result.summary(args.sort_by)
+    summary.to_csv(args.output, index=False)
+    if args.tensor:
+        result.save(args.tensor)
+    columns = ['Name'] + SWEEP_METRICS + ['Tickers']
+    print(summary[columns].head(args.top).to_string(index=False, float_format=lambda value: f"{value:.3f}"))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,82 @@
+import zlib
+import numpy as np
+import pandas as pd
+from data_provider import DataProvider, slice_period
+
+# Approximate number of daily bars in each period offered by the GUI
+PERIOD_BARS = {
+    "3mo": 63,
+    "6mo": 126,
+    "ytd": 252,
+    "1y": 252,
+    "2y": 504,
+    "5y": 1260,
+    "10y": 2520,
+    "max": 7560,
+}
+
+END_DATE = "2024-12-31"
+
+
+def ticker_seed(ticker, seed=0):
+    return zlib.crc32(ticker.encode()) ^ seed
+
+
+def synthetic_history(ticker, bars, seed=0, end=END_DATE):
+    # Deterministic geometric random walk with plausible OHLCV for one ticker
+    rng = np.random.default_rng(ticker_seed(ticker, seed))
+    start_price = rng.uniform(5, 500)
+    drift = rng.normal(0.0003, 0.0004)
+    volatility = rng.uniform(0.01, 0.04)
+    close = start_price * np.exp(np.cumsum(rng.normal(drift, volatility, bars)))
+    open_ = close * np.exp(rng.normal(0, volatility / 3, bars))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, volatility / 2, bars)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, volatility / 2, bars)))
+    volume = rng.integers(10_000, 10_000_000, bars).astype(float)
+    index = pd.bdate_range(end=end, periods=bars, name='Date')
+    return pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume,
+                         'Dividends': 0.0, 'Stock Splits': 0.0}, index=index)
+
+
+def synthetic_info(ticker, seed=0, missing_rate=0.05):
+    # Deterministic stand-in for yfinance's .info, with some fields missing like real data
+    rng = np.random.default_rng(ticker_seed(ticker, seed) + 1)
+    info = {
+        'marketCap': int(rng.uniform(1e8, 2e12)),
+        'trailingPE': float(rng.uniform(-20, 80)),
+        'trailingEps': float(rng.normal(2, 3)),
+        'dividendYield': float(rng.uniform(0, 0.08)),
+        'priceToBook': float(rng.uniform(0.3, 15)),
+        'debtToEquity': float(rng.uniform(0, 3)),
+        'returnOnEquity': float(rng.normal(0.12, 0.15)),
+    }
+    for key in list(info):
+        if rng.random() < missing_rate:
+            info[key] = None
+    return info
+
+
+class SyntheticDataProvider(DataProvider):
+    # Offline provider generating the same data for the same ticker and seed every time
+    def __init__(self, seed=0, period_bars=None):
+        self.seed = seed
+        self.period_bars = dict(PERIOD_BARS, **(period_bars or {}))
+
+    def fetch_history(self, tickers, period, interval="1d", start=None):
+        results = {}
+        for ticker in tickers:
+            hist = synthetic_history(ticker, self.period_bars.get(period, PERIOD_BARS['max']), self.seed)
+            if start is not None:
+                hist = hist[hist.index >= start]
+            elif period in ("ytd",):
+                hist = slice_period(hist, period)
+            if not hist.empty:
+                results[ticker] = hist
+        return results
+
+    def fetch_info(self, ticker):
+        return synthetic_info(ticker, self.seed)
+
+
+def synthetic_tickers(count):
+    return [f"SYN{index:05d}" for index in range(count)]
@@ -0,0 +1,167 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# NumPy versions of the pandas_ta indicators used by the app. Every kernel accepts a
+# 1-D series or a (time x ticker) array and works column by column; NaNs before a
+# column's first value are treated as "no data yet", so right-aligned panels of
+# ragged histories give the same numbers as computing each ticker on its own.
+
+
+def as_2d(values):
+    values = np.asarray(values, dtype=float)
+    return (values[:, None], True) if values.ndim == 1 else (values, False)
+
+
+def restore_shape(values, squeeze):
+    return values[:, 0] if squeeze else values
+
+
+def rolling_windows(values, length):
+    # (time x ticker x length) view of each trailing window, padded with NaN at the top
+    padded = np.concatenate([np.full((length - 1, values.shape[1]), np.nan), values])
+    return sliding_window_view(padded, length, axis=0)
+
+
+def sma(values, length):
+    # rolling(length).mean(): NaN unless all `length` values in the window are present
+    values, squeeze = as_2d(values)
+    valid = ~np.isnan(values)
+    sums = np.cumsum(np.where(valid, values, 0.0), axis=0)
+    counts = np.cumsum(valid, axis=0)
+    out = np.full_like(values, np.nan)
+    if len(values) >= length:
+        window_sums = sums[length - 1:].copy()
+        window_sums[1:] -= sums[:-length]
+        window_counts = counts[length - 1:].copy()
+        window_counts[1:] -= counts[:-length]
+        out[length - 1:] = np.where(window_counts == length, window_sums / length, np.nan)
+    return restore_shape(out, squeeze)
+
+
+def rolling_std(values, length):
+    # rolling(length).std() with the sample (ddof=1) estimator. Two-pass: the squared
+    # deviations from each window's mean are summed one lag at a time, which is as exact
+    # as std() over the windows but never holds more than a (time x ticker) temporary
+    values, squeeze = as_2d(values)
+    mean = sma(values, length)
+    total = np.zeros_like(values)
+    rows = len(values)
+    for lag in range(min(length, rows)):
+        total[lag:] += (values[:rows - lag] - mean[lag:]) ** 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = np.sqrt(total / (length - 1))
+    return restore_shape(np.where(np.isnan(mean), np.nan, out), squeeze)
+
+
+def rolling_max(values, length):
+    values, squeeze = as_2d(values)
+    return restore_shape(rolling_windows(values, length).max(axis=-1), squeeze)
+
+
+def rolling_min(values, length):
+    values, squeeze = as_2d(values)
+    return restore_shape(rolling_windows(values, length).min(axis=-1), squeeze)
+
+
+def ema(values, length):
+    # pandas_ta ema(): seeded with the SMA of the first `length` values, then the
+    # adjust=False recursion. Missing values keep the previous average.
+    values, squeeze = as_2d(values)
+    alpha = 2.0 / (length + 1)
+    seeds = sma(values, length)
+    seed_rows = np.argmax(~np.isnan(seeds), axis=0)
+    has_seed = ~np.isnan(seeds).all(axis=0)
+
+    out = np.full_like(values, np.nan)
+    current = np.full(values.shape[1], np.nan)
+    for row in range(len(values)):
+        seeding = has_seed & (seed_rows == row)
+        current = np.where(seeding, seeds[row], current)
+        updating = has_seed & (seed_rows < row) & ~np.isnan(values[row])
+        current = np.where(updating, alpha * values[row] + (1 - alpha) * current, current)
+        out[row] = current
+    return restore_shape(out, squeeze)
+
+
+def rma(values, length):
+    # Wilder's moving average as pandas_ta computes it: ewm(alpha=1/length,
+    # min_periods=length).mean() with pandas' default adjust=True weights
+    values, squeeze = as_2d(values)
+    decay = 1.0 - 1.0 / length
+    valid = ~np.isnan(values)
+    counts = np.cumsum(valid, axis=0)
+
+    out = np.full_like(values, np.nan)
+    numerator = np.zeros(values.shape[1])
+    denominator = np.zeros(values.shape[1])
+    for row in range(len(values)):
+        numerator = numerator * decay + np.where(valid[row], values[row], 0.0)
+        denominator = denominator * decay + valid[row]
+        out[row] = np.where(counts[row] >= length, numerator / np.where(denominator, denominator, 1.0), np.nan)
+    return restore_shape(out, squeeze)
+
+
+def diff(values):
+    values, squeeze = as_2d(values)
+    out = np.full_like(values, np.nan)
+    out[1:] = values[1:] - values[:-1]
+    return restore_shape(out, squeeze)
+
+
+def rsi(close, length=14):
+    change = diff(close)
+    missing = np.isnan(change)
+    gains = rma(np.where(missing, np.nan, np.clip(change, 0, None)), length)
+    losses = rma(np.where(missing, np.nan, np.clip(-change, 0, None)), length)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 * gains / (gains + losses)
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    # Returns (macd, histogram, signal) like the MACD_/MACDh_/MACDs_ columns of ta.macd()
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = ema(line, signal)
+    return line, line - signal_line, signal_line
+
+
+def stoch(high, low, close, k=14, d=3, smooth_k=3):
+    # Returns (%K, %D) like the STOCHk_/STOCHd_ columns of ta.stoch()
+    highest = rolling_max(high, k)
+    lowest = rolling_min(low, k)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        raw = 100 * (np.asarray(close, dtype=float) - lowest) / (highest - lowest)
+    stoch_k = sma(raw, smooth_k)
+    return stoch_k, sma(stoch_k, d)
+
+
+def bbands(close, length=20, std=2.0):
+    # Returns (lower, middle, upper) Bollinger Bands
+    middle = sma(close, length)
+    deviation = rolling_std(close, length)
+    return middle - std * deviation, middle, middle + std * deviation
+
+
+# pandas wrappers returning the same names and shapes as the pandas_ta functions
+
+def rsi_series(close, length=14):
+    import pandas as pd
+
+    return pd.Series(rsi(close.to_numpy(dtype=float), length), index=close.index, name=f'RSI_{length}')
+
+
+def macd_frame(close, fast=12, slow=26, signal=9):
+    import pandas as pd
+
+    line, histogram, signal_line = macd(close.to_numpy(dtype=float), fast, slow, signal)
+    suffix = f'{fast}_{slow}_{signal}'
+    return pd.DataFrame({f'MACD_{suffix}': line, f'MACDh_{suffix}': histogram, f'MACDs_{suffix}': signal_line},
+                        index=close.index)
+
+
+def stoch_frame(high, low, close, k=14, d=3, smooth_k=3):
+    import pandas as pd
+
+    stoch_k, stoch_d = stoch(high.to_numpy(dtype=float), low.to_numpy(dtype=float), close.to_numpy(dtype=float),
+                             k, d, smooth_k)
+    suffix = f'{k}_{d}_{smooth_k}'
+    return pd.DataFrame({f'STOCHk_{suffix}': stoch_k, f'STOCHd_{suffix}': stoch_d}, index=close.index)
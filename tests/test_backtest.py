@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+import pytest
+from backtest import evaluate
+from panel import IndicatorPanel
+
+
+def make_panel(closes):
+    index = pd.bdate_range('2024-01-01', periods=len(closes), name='Date')
+    hist = pd.DataFrame({'Open': closes, 'High': closes, 'Low': closes, 'Close': closes, 'Volume': 1.0},
+                        index=index)
+    return IndicatorPanel.from_histories({'AAA': hist})
+
+
+@pytest.mark.parametrize('lag, entry, exit', [(1, 1, 3), (2, 2, 4)])
+def test_trades_happen_at_the_signal_bars_close(lag, entry, exit):
+    # Long signal on bar 1, flat again on bar 3. With lag=1 the trade is bought at bar 1's
+    # close and sold at bar 3's; lag=2 moves both one bar later.
+    closes = [100.0, 110.0, 121.0, 133.1, 100.0, 90.0]
+    positions = np.array([[0.0], [1.0], [1.0], [0.0], [0.0], [0.0]])
+    metrics = evaluate(make_panel(closes), positions, lag=lag)
+
+    assert metrics['Trades'][0] == 1
+    assert metrics['Total Return'][0] == pytest.approx(closes[exit] / closes[entry] - 1)
+    assert metrics['Exposure'][0] == pytest.approx(2 / 5)
@@ -0,0 +1,121 @@
+import threading
+import pytest
+import fetch_scheduler
+from fetch_scheduler import FetchScheduler, TokenBucket, is_transient
+
+
+class FakeClock:
+    # Stands in for the time module: sleep() only moves the clock forward
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+        self.lock = threading.Lock()
+
+    def monotonic(self):
+        with self.lock:
+            return self.now
+
+    def sleep(self, seconds):
+        with self.lock:
+            self.sleeps.append(seconds)
+            self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(fetch_scheduler, 'time', clock)
+    return clock
+
+
+class HTTPError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.response = type('Response', (), {'status_code': status})()
+
+
+class Flaky:
+    # Raises the given errors in turn, then returns the item
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self, item):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return item
+
+
+def test_token_bucket_allows_burst_then_rate(clock):
+    bucket = TokenBucket(rate=2.0, capacity=3)
+    for _ in range(3):
+        bucket.acquire()
+    assert clock.now == 0.0
+    for _ in range(4):
+        bucket.acquire()
+    assert clock.now == pytest.approx(2.0)
+
+
+def test_scheduler_rate_limits_calls(clock):
+    scheduler = FetchScheduler(max_workers=1, rate=4.0, burst=1)
+    results, failures = scheduler.run(lambda item: item, range(9))
+    assert results == {item: item for item in range(9)}
+    assert not failures
+    assert clock.now == pytest.approx(2.0)
+
+
+@pytest.mark.parametrize('error', [ConnectionError("reset"), TimeoutError("slow"), HTTPError(429), HTTPError(503)])
+def test_transient_errors_are_retried(clock, error):
+    scheduler = FetchScheduler(rate=None, retries=3, backoff=0.5, seed=1)
+    func = Flaky(error, error)
+    assert scheduler.call(func, 'AAA') == 'AAA'
+    assert func.calls == 3
+    # Exponential backoff with jitter between half and all of each delay
+    assert len(clock.sleeps) == 2
+    assert 0.25 <= clock.sleeps[0] <= 0.5
+    assert 0.5 <= clock.sleeps[1] <= 1.0
+
+
+@pytest.mark.parametrize('error', [KeyError("No fundamentals for AAA"), ValueError("bad data"), HTTPError(404)])
+def test_permanent_errors_fail_at_once(clock, error):
+    scheduler = FetchScheduler(rate=None, retries=3)
+    func = Flaky(error)
+    with pytest.raises(type(error)):
+        scheduler.call(func, 'AAA')
+    assert func.calls == 1
+    assert clock.sleeps == []
+
+
+def test_backoff_is_capped(clock):
+    scheduler = FetchScheduler(rate=None, retries=6, backoff=1.0, max_backoff=4.0, seed=0)
+    func = Flaky(*[ConnectionError()] * 6)
+    scheduler.call(func, 'AAA')
+    assert max(clock.sleeps) <= 4.0
+
+
+def test_failures_are_collected_per_item(clock):
+    scheduler = FetchScheduler(max_workers=2, rate=None, retries=2)
+    errors = {'BAD': KeyError('BAD'), 'DOWN': ConnectionError('DOWN')}
+    calls = {}
+    lock = threading.Lock()
+
+    def fetch(item):
+        with lock:
+            calls[item] = calls.get(item, 0) + 1
+        if item in errors:
+            raise errors[item]
+        return item.lower()
+
+    results, failures = scheduler.run(fetch, ['AAA', 'BAD', 'DOWN', 'BBB'])
+    assert results == {'AAA': 'aaa', 'BBB': 'bbb'}
+    assert set(failures) == {'BAD', 'DOWN'}
+    assert calls == {'AAA': 1, 'BBB': 1, 'BAD': 1, 'DOWN': 3}
+
+
+def test_is_transient_by_name():
+    RateLimitError = type('YFRateLimitError', (Exception,), {})
+    ReadTimeout = type('ReadTimeout', (OSError,), {})
+    assert is_transient(RateLimitError())
+    assert is_transient(ReadTimeout())
+    assert not is_transient(FileNotFoundError())
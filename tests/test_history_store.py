@@ -0,0 +1,94 @@
+import os
+import numpy as np
+import pytest
+from data_provider import slice_period
+from history_store import FIELDS, HistoryStore
+from synthetic_data import synthetic_history
+
+
+def histories():
+    # Daily bars in New York time, in London time and without a timezone
+    new_york = synthetic_history('AAA', 600)
+    new_york.index = new_york.index.tz_localize('America/New_York')
+    london = synthetic_history('BBB', 400)
+    london.index = london.index.tz_localize('Europe/London')
+    return {'AAA': new_york, 'BBB': london, 'CCC': synthetic_history('CCC', 300)}
+
+
+def assert_same_history(actual, expected):
+    assert actual.index.equals(expected.index)
+    assert str(actual.index.tz) == str(expected.index.tz)
+    for field in FIELDS:
+        np.testing.assert_allclose(actual[field], expected[field], rtol=1e-7)
+
+
+@pytest.mark.parametrize('period', [None, '3mo', 'ytd', '1y'])
+def test_round_trip_with_periods_and_timezones(tmp_path, period):
+    expected = histories()
+    HistoryStore(str(tmp_path)).write(expected)
+
+    store = HistoryStore(str(tmp_path))
+    assert sorted(store.tickers()) == sorted(expected)
+    for ticker, hist in expected.items():
+        assert_same_history(store.history(ticker, period), slice_period(hist, period or 'max'))
+
+    panel = store.panel(['CCC', 'AAA', 'ZZZ'], period)
+    assert panel.tickers == ['CCC', 'AAA']
+    for col, ticker in enumerate(panel.tickers):
+        sliced = slice_period(expected[ticker], period or 'max')
+        np.testing.assert_allclose(panel.data['Close'][-len(sliced):, col], sliced['Close'], rtol=1e-7)
+
+
+def test_replacing_a_block(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    store.write(histories())
+    newer = synthetic_history('AAA', 250, seed=7)
+    store.write({'AAA': newer})
+
+    assert_same_history(store.history('AAA'), newer)
+    assert_same_history(store.history('BBB'), histories()['BBB'])
+    assert store.index['garbage'] == 600
+    assert store.index['rows'] == 600 + 400 + 300 + 250
+
+
+def test_compact_drops_replaced_blocks_and_keeps_the_previous_generation(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    store.write(histories())
+    store.write({'AAA': synthetic_history('AAA', 250, seed=7)})
+    old_index = store.load_index()
+
+    store.compact()
+    assert store.index['generation'] == 1
+    assert store.index['rows'] == 250 + 400 + 300
+    assert store.index['garbage'] == 0
+    assert_same_history(store.history('AAA'), synthetic_history('AAA', 250, seed=7))
+    assert_same_history(store.history('BBB'), histories()['BBB'])
+
+    # A reader that loaded the old index just before the compact and maps its files now
+    reader = HistoryStore(str(tmp_path))
+    reader.index = old_index
+    reader.times = reader.map('times', 0, np.int64)
+    reader.bars = reader.map('bars', 0, np.float32)
+    assert_same_history(reader.history('BBB'), histories()['BBB'])
+
+    # The next compact removes generation 0 and keeps generation 1
+    store.compact()
+    assert not os.path.exists(store.path_for('bars', 0))
+    assert os.path.exists(store.path_for('bars', 1))
+    assert os.path.exists(store.path_for('bars', 2))
+
+
+def test_unfinished_write_is_truncated(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    store.write({'AAA': histories()['AAA']})
+    # A write that died before publishing its index leaves bytes past the published rows
+    for kind in ('times', 'bars'):
+        with open(store.path_for(kind, 0), 'ab') as file:
+            file.write(b'\xff' * 1000)
+
+    store.write({'CCC': histories()['CCC']})
+    rows = 600 + 300
+    assert os.path.getsize(store.path_for('times', 0)) == rows * 8
+    assert os.path.getsize(store.path_for('bars', 0)) == rows * len(FIELDS) * 4
+    assert_same_history(HistoryStore(str(tmp_path)).history('CCC'), histories()['CCC'])
+    assert_same_history(store.history('AAA'), histories()['AAA'])
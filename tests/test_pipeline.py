@@ -0,0 +1,157 @@
+import os
+import queue
+import threading
+import pytest
+import batch_report
+from batch_report import EXIT_FAILED, EXIT_OK, EXIT_PARTIAL, run_report, wait_for_job
+from data_provider import FakeDataProvider, FileDataProvider
+from fetch_scheduler import FetchScheduler
+from pipeline import AnalysisPipeline
+from synthetic_data import SyntheticDataProvider, synthetic_history, synthetic_info, synthetic_tickers
+from timeframes import TimeframeService
+
+
+class StubProvider(SyntheticDataProvider):
+    # Synthetic data with some tickers lacking prices and some lacking fundamentals. Batches
+    # with a `broken` ticker fail, and the first `flaky` batches drop the connection.
+    def __init__(self, no_history=(), no_info=(), broken=(), flaky=0):
+        super().__init__(period_bars={'max': 300})
+        self.no_history = set(no_history)
+        self.no_info = set(no_info)
+        self.broken = set(broken)
+        self.flaky = flaky
+        self.lock = threading.Lock()
+
+    def fetch_history(self, tickers, period, interval="1d", start=None):
+        if self.broken.intersection(tickers):
+            raise RuntimeError("provider is down")
+        with self.lock:
+            self.flaky -= 1
+            if self.flaky >= 0:
+                raise ConnectionError("connection reset")
+        return super().fetch_history([ticker for ticker in tickers if ticker not in self.no_history], period,
+                                     interval, start=start)
+
+    def fetch_info(self, ticker):
+        if ticker in self.no_info:
+            raise KeyError(f"No fundamentals for {ticker}")
+        return super().fetch_info(ticker)
+
+
+def make_pipeline(tickers, provider, **kwargs):
+    # Random latency makes chunks finish fetching out of order
+    provider = FakeDataProvider(provider, latency=(0.0, 0.01), error_rate=0.0, seed=1)
+    kwargs.setdefault('chunk_size', 2)
+    kwargs.setdefault('fetch_workers', 3)
+    kwargs.setdefault('scheduler', FetchScheduler(rate=None, backoff=0.0))
+    return AnalysisPipeline(tickers, '6mo', TimeframeService(provider), provider, **kwargs)
+
+
+def test_pages_come_out_in_ticker_order():
+    tickers = synthetic_tickers(9)
+    pipeline = make_pipeline(tickers, StubProvider())
+    jobs = list(pipeline.page_jobs())
+    assert [job['ticker'] for job in jobs] == tickers
+    assert pipeline.skipped == {}
+    assert pipeline.warnings == {}
+    assert pipeline.expected_pages == len(tickers)
+    assert all(job['fundamentals'] is not None for job in jobs)
+
+
+def test_tickers_without_prices_are_skipped_and_failed_fundamentals_warned():
+    tickers = synthetic_tickers(6)
+    skipped, warnings = {}, {}
+    pipeline = make_pipeline(tickers, StubProvider(no_history=[tickers[1]], no_info=[tickers[1], tickers[4]]),
+                             on_skipped=skipped.update, on_warnings=warnings.update)
+    jobs = {job['ticker']: job for job in pipeline.page_jobs()}
+
+    assert list(jobs) == [ticker for ticker in tickers if ticker != tickers[1]]
+    assert skipped == pipeline.skipped == {tickers[1]: "no price history"}
+    # A ticker with prices but no fundamentals still gets its page
+    assert list(warnings) == list(pipeline.warnings) == [tickers[4]]
+    assert jobs[tickers[4]]['fundamentals'] is None
+    assert pipeline.expected_pages == len(jobs)
+
+
+def test_cancel_stops_the_stages():
+    tickers = synthetic_tickers(40)
+    cancel = threading.Event()
+    pipeline = make_pipeline(tickers, StubProvider(), cancelled=cancel.is_set, max_pages=2)
+    seen = []
+    for job in pipeline.page_jobs():
+        seen.append(job['ticker'])
+        if len(seen) == 3:
+            cancel.set()
+    assert seen == tickers[:len(seen)]
+    assert len(seen) < len(tickers)
+    assert pipeline.error is None
+
+
+def test_transient_history_errors_are_retried_and_failed_chunks_skipped():
+    tickers = synthetic_tickers(6)
+    skipped = {}
+    pipeline = make_pipeline(tickers, StubProvider(broken=[tickers[2]], flaky=2), on_skipped=skipped.update)
+    jobs = [job['ticker'] for job in pipeline.page_jobs()]
+
+    # The dropped connections were retried; only the chunk that keeps failing is lost
+    assert jobs == tickers[:2] + tickers[4:]
+    assert skipped == pipeline.skipped == {ticker: "price history failed: provider is down"
+                                           for ticker in tickers[2:4]}
+    assert pipeline.expected_pages == len(jobs)
+    assert pipeline.error is None
+
+
+def test_compute_errors_are_raised_from_page_jobs(monkeypatch):
+    pipeline = make_pipeline(synthetic_tickers(4), StubProvider())
+
+    def broken_analyzer(*args, **kwargs):
+        raise RuntimeError("indicators failed")
+
+    monkeypatch.setattr(pipeline.timeframes, 'analyzer', broken_analyzer)
+    with pytest.raises(RuntimeError, match="indicators failed"):
+        list(pipeline.page_jobs())
+
+
+class ScriptedJob:
+    # Replays AnalysisJob messages for wait_for_job
+    def __init__(self, *messages):
+        self.messages = queue.Queue()
+        for message in messages:
+            self.messages.put(message)
+
+    def cancel(self):
+        pass
+
+
+@pytest.mark.parametrize('messages, expected', [
+    ([('progress', 'A', 1, 2, ''), ('progress', 'B', 2, 2, ''), ('done', 'out.pdf')], EXIT_OK),
+    ([('warnings', {'A': "fundamentals failed"}), ('progress', 'A', 1, 1, ''), ('done', 'out.pdf')], EXIT_OK),
+    ([('skipped', {'B': "no price history"}), ('progress', 'A', 1, 1, ''), ('done', 'out.pdf')], EXIT_PARTIAL),
+    ([('skipped', {'A': "no price history"}), ('done', 'out.pdf')], EXIT_FAILED),
+    ([('progress', 'A', 1, 2, ''), ('cancelled', 'out.pdf')], EXIT_FAILED),
+    ([('error', "boom")], EXIT_FAILED),
+])
+def test_exit_codes(messages, expected):
+    assert wait_for_job(ScriptedJob(*messages), ['A', 'B'], lambda line: None) == expected
+
+
+def test_offline_run_without_fundamentals(tmp_path):
+    # Prices for two tickers, fundamentals for one, nothing for the third: both pages are
+    # drawn, the missing fundamentals are a warning and the missing ticker makes it partial
+    data = FileDataProvider(str(tmp_path / 'data'))
+    for ticker in ('AAA', 'BBB'):
+        data.save_history(ticker, synthetic_history(ticker, 300))
+    data.save_info('AAA', synthetic_info('AAA'))
+    lines = []
+    status = run_report(['AAA', 'BBB', 'ZZZ'], '6mo', str(tmp_path / 'out'), workers=1,
+                        data_dir=str(tmp_path / 'data'), cache_dir=str(tmp_path / 'cache'), log=lines.append)
+
+    assert status == EXIT_PARTIAL
+    assert os.path.getsize(tmp_path / 'out' / 'analysis_results.pdf') > 0
+    assert "Skipped ZZZ: no price history" in lines
+    assert any(line.startswith("Warning BBB: fundamentals failed") for line in lines)
+    assert [line.split(']')[0] for line in lines if line.startswith('[')] == ['[1/2', '[2/2']
+
+
+def test_batch_main_usage_error(capsys):
+    assert batch_report.main([]) == batch_report.EXIT_USAGE
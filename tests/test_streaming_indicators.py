@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+import pytest
+import ta_kernels
+from streaming_indicators import (StreamingEMA, StreamingIndicatorSet, StreamingRMA, StreamingRollingExtreme,
+                                  StreamingRollingStats, StreamingSMA)
+from synthetic_data import synthetic_history
+
+
+@pytest.fixture
+def hist():
+    return synthetic_history('TEST', 600)
+
+
+@pytest.fixture
+def gappy():
+    # Leading NaNs, then isolated and consecutive gaps, like a history with missing bars
+    values = np.random.default_rng(3).normal(100, 5, 400)
+    values[:5] = np.nan
+    values[[40, 41, 42, 150, 300]] = np.nan
+    return values
+
+
+def stream(indicator, values):
+    return np.array([indicator.update(value) for value in values])
+
+
+def batch(hist):
+    close, high, low = (hist[column].to_numpy(float) for column in ('Close', 'High', 'Low'))
+    line, histogram, signal = ta_kernels.macd(close)
+    stoch_k, stoch_d = ta_kernels.stoch(high, low, close)
+    lower, middle, upper = ta_kernels.bbands(close)
+    return {'RSI_14': ta_kernels.rsi(close), 'MACD_12_26_9': line, 'MACDh_12_26_9': histogram,
+            'MACDs_12_26_9': signal, 'STOCHk_14_3_3': stoch_k, 'STOCHd_14_3_3': stoch_d,
+            'BBL_20_2.0': lower, 'BBM_20_2.0': middle, 'BBU_20_2.0': upper,
+            'SMA_50': ta_kernels.sma(close, 50), 'SMA_200': ta_kernels.sma(close, 200)}
+
+
+def test_indicator_set_matches_batch(hist):
+    rows = StreamingIndicatorSet().extend(hist)
+    expected = batch(hist)
+    for name, values in expected.items():
+        np.testing.assert_allclose([row[name] for row in rows], values, rtol=1e-9, atol=1e-9, err_msg=name)
+
+
+def test_extend_after_restore_matches_batch(hist):
+    # State saved part way through and restored elsewhere continues exactly where it stopped
+    indicators = StreamingIndicatorSet()
+    head = indicators.extend(hist.iloc[:350])
+    state = indicators.snapshot()
+    resumed = StreamingIndicatorSet().restore(state)
+    rows = head + resumed.extend(hist)
+    assert len(rows) == len(hist)
+    expected = batch(hist)
+    for name in ('RSI_14', 'MACDs_12_26_9', 'STOCHd_14_3_3', 'BBU_20_2.0', 'SMA_200'):
+        np.testing.assert_allclose([row[name] for row in rows], expected[name], rtol=1e-9, atol=1e-9, err_msg=name)
+
+
+def test_snapshot_is_independent(hist):
+    indicators = StreamingIndicatorSet(sma_windows=(5,))
+    indicators.extend(hist.iloc[:100])
+    state = indicators.snapshot()
+    after = indicators.extend(hist.iloc[:101])
+    indicators.restore(state)
+    again = indicators.extend(hist.iloc[:101])
+    assert after == again
+
+
+@pytest.mark.parametrize('length', [1, 5, 20])
+def test_sma_matches_rolling_mean_with_gaps(gappy, length):
+    expected = pd.Series(gappy).rolling(length).mean().to_numpy()
+    np.testing.assert_allclose(stream(StreamingSMA(length), gappy), expected, rtol=1e-12)
+
+
+@pytest.mark.parametrize('length', [2, 5, 20])
+def test_rolling_stats_match_rolling_mean_and_std_with_gaps(gappy, length):
+    values = stream(StreamingRollingStats(length), gappy)
+    series = pd.Series(gappy)
+    np.testing.assert_allclose(values[:, 0], series.rolling(length).mean(), rtol=1e-9)
+    # Values are around 100, so the deviations carry some cancellation error in absolute terms
+    np.testing.assert_allclose(values[:, 1], series.rolling(length).std(), rtol=1e-7, atol=1e-6)
+
+
+def test_rolling_stats_agree_with_sma(gappy):
+    # NaNs are handled the same way by both, so the means coincide everywhere
+    np.testing.assert_allclose(stream(StreamingRollingStats(20), gappy)[:, 0], stream(StreamingSMA(20), gappy),
+                               rtol=1e-9)
+
+
+def test_rolling_stats_stay_precise_on_long_streams():
+    values = 1e6 + np.random.default_rng(0).normal(0, 1, 50_000)
+    result = stream(StreamingRollingStats(20), values)
+    np.testing.assert_allclose(result[-1, 1], np.std(values[-20:], ddof=1), rtol=1e-6)
+
+
+@pytest.mark.parametrize('length', [3, 12])
+def test_ema_and_rma_match_kernels_with_gaps(gappy, length):
+    np.testing.assert_allclose(stream(StreamingEMA(length), gappy), ta_kernels.ema(gappy, length), rtol=1e-12)
+    np.testing.assert_allclose(stream(StreamingRMA(length), gappy), ta_kernels.rma(gappy, length), rtol=1e-12)
+
+
+@pytest.mark.parametrize('maximum', [True, False])
+def test_rolling_extreme_matches_rolling(hist, maximum):
+    close = hist['Close'].to_numpy(float)
+    rolling = pd.Series(close).rolling(14)
+    expected = (rolling.max() if maximum else rolling.min()).to_numpy()
+    np.testing.assert_allclose(stream(StreamingRollingExtreme(14, maximum), close), expected)
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+from backtest import MACDStrategy, RSIStrategy, SMAStrategy, backtest_panel
+from panel import IndicatorPanel
+from sweep import SWEEP_METRICS, combinations, sweep_panel
+from synthetic_data import synthetic_history, synthetic_tickers
+
+GRID = {
+    'rsi': {'length': [9, 14], 'bands': [[25, 75], [30, 70]]},
+    'macd': {'fast': [12], 'slow': [26], 'signal': [9]},
+    'ma': {'windows': [50, 120, 200]},
+}
+
+# Sweep combinations with a fixed-parameter backtest strategy to compare against
+MATCHING = {
+    "RSI 14 30/70": RSIStrategy(30, 70),
+    "RSI 14 25/75": RSIStrategy(25, 75),
+    "MACD 12/26/9": MACDStrategy(),
+    "Above SMA 50/200": SMAStrategy(50, 200),
+    "Above SMA 120/200": SMAStrategy(120, 200),
+}
+
+
+@pytest.fixture
+def panel():
+    # Histories of different lengths, so some tickers start with padding
+    tickers = synthetic_tickers(6)
+    return IndicatorPanel.from_histories({ticker: synthetic_history(ticker, 500 + 60 * number)
+                                          for number, ticker in enumerate(tickers)}, tickers)
+
+
+@pytest.mark.parametrize('cost', [0.0, 0.001])
+def test_sweep_matches_independent_backtests(panel, cost):
+    combos = combinations(GRID)
+    values = sweep_panel(panel, combos, cost=cost)
+    names = [combo['Name'] for combo in combos]
+    table = backtest_panel(panel, list(MATCHING.values()), cost=cost)
+
+    for name, strategy in MATCHING.items():
+        expected = table[table['Strategy'] == strategy.name]
+        assert expected['Ticker'].tolist() == panel.tickers
+        for index, metric in enumerate(SWEEP_METRICS):
+            np.testing.assert_allclose(values[names.index(name), :, index], expected[metric].to_numpy(dtype=float),
+                                       rtol=1e-9, atol=1e-12, err_msg=f"{name} {metric}")
@@ -0,0 +1,141 @@
+import numpy as np
+import pytest
+import ta_kernels
+from synthetic_data import synthetic_history
+
+# Reference formulas written the way pandas_ta computes each indicator, on one pandas
+# Series at a time
+
+
+def ref_sma(series, length):
+    return series.rolling(length, min_periods=length).mean()
+
+
+def ref_ema(series, length):
+    # Seeded with the SMA of the first `length` values, then ewm(adjust=False)
+    series = series.loc[series.first_valid_index():].copy()
+    seed = series.iloc[:length].mean()
+    series.iloc[:length - 1] = np.nan
+    series.iloc[length - 1] = seed
+    return series.ewm(span=length, adjust=False).mean()
+
+
+def ref_rma(series, length):
+    return series.ewm(alpha=1.0 / length, min_periods=length).mean()
+
+
+def ref_rsi(close, length=14):
+    negative = close.diff()
+    positive = negative.copy()
+    positive[positive < 0] = 0
+    negative[negative > 0] = 0
+    gains = ref_rma(positive, length)
+    losses = ref_rma(negative, length)
+    return 100 * gains / (gains + losses.abs())
+
+
+def ref_macd(close, fast=12, slow=26, signal=9):
+    line = ref_ema(close, fast) - ref_ema(close, slow)
+    signal_line = ref_ema(line, signal).reindex(close.index)
+    return line, line - signal_line, signal_line
+
+
+def ref_stoch(high, low, close, k=14, d=3, smooth_k=3):
+    lowest = low.rolling(k).min()
+    highest = high.rolling(k).max()
+    raw = 100 * (close - lowest) / (highest - lowest)
+    stoch_k = ref_sma(raw.loc[raw.first_valid_index():], smooth_k).reindex(close.index)
+    stoch_d = ref_sma(stoch_k.loc[stoch_k.first_valid_index():], d).reindex(close.index)
+    return stoch_k, stoch_d
+
+
+def ref_bbands(close, length=20, std=2.0):
+    middle = ref_sma(close, length)
+    deviation = close.rolling(length).std(ddof=1)
+    return middle - std * deviation, middle, middle + std * deviation
+
+
+@pytest.fixture
+def hist():
+    return synthetic_history('KERNEL', 700)
+
+
+def assert_close(actual, expected, **kwargs):
+    np.testing.assert_allclose(np.asarray(actual, dtype=float), np.asarray(expected, dtype=float),
+                               rtol=1e-9, atol=1e-9, **kwargs)
+
+
+@pytest.mark.parametrize('length', [1, 10, 50])
+def test_moving_averages(hist, length):
+    close = hist['Close']
+    assert_close(ta_kernels.sma(close, length), ref_sma(close, length))
+    assert_close(ta_kernels.ema(close, length), ref_ema(close, length))
+    assert_close(ta_kernels.rma(close, length), ref_rma(close, length))
+    assert_close(ta_kernels.rolling_std(close, max(length, 2)), close.rolling(max(length, 2)).std())
+    assert_close(ta_kernels.rolling_max(close, length), close.rolling(length).max())
+    assert_close(ta_kernels.rolling_min(close, length), close.rolling(length).min())
+
+
+def test_rsi(hist):
+    assert_close(ta_kernels.rsi(hist['Close']), ref_rsi(hist['Close']))
+
+
+def test_macd(hist):
+    for actual, expected in zip(ta_kernels.macd(hist['Close']), ref_macd(hist['Close'])):
+        assert_close(actual, expected)
+
+
+def test_stoch(hist):
+    for actual, expected in zip(ta_kernels.stoch(hist['High'], hist['Low'], hist['Close']),
+                                ref_stoch(hist['High'], hist['Low'], hist['Close'])):
+        assert_close(actual, expected)
+
+
+def test_bbands(hist):
+    for actual, expected in zip(ta_kernels.bbands(hist['Close']), ref_bbands(hist['Close'])):
+        assert_close(actual, expected)
+
+
+def test_pandas_wrappers_keep_names_and_index(hist):
+    rsi = ta_kernels.rsi_series(hist['Close'])
+    macd = ta_kernels.macd_frame(hist['Close'])
+    stoch = ta_kernels.stoch_frame(hist['High'], hist['Low'], hist['Close'])
+    assert rsi.name == 'RSI_14'
+    assert list(macd.columns) == ['MACD_12_26_9', 'MACDh_12_26_9', 'MACDs_12_26_9']
+    assert list(stoch.columns) == ['STOCHk_14_3_3', 'STOCHd_14_3_3']
+    for result in (rsi, macd, stoch):
+        assert result.index.equals(hist.index)
+
+
+def test_ragged_panel_columns_match_single_series():
+    # Right-aligned (time x ticker) arrays padded with NaN at the top give every ticker
+    # the same numbers as computing it on its own
+    histories = [synthetic_history(ticker, bars)['Close'] for ticker, bars in [('A', 400), ('B', 120), ('C', 260)]]
+    panel = np.full((400, len(histories)), np.nan)
+    for col, close in enumerate(histories):
+        panel[-len(close):, col] = close.to_numpy()
+    kernels = {
+        'sma': lambda values: ta_kernels.sma(values, 20),
+        'ema': lambda values: ta_kernels.ema(values, 26),
+        'rma': lambda values: ta_kernels.rma(values, 14),
+        'rsi': ta_kernels.rsi,
+        'macd': lambda values: ta_kernels.macd(values)[2],
+        'bbands': lambda values: ta_kernels.bbands(values)[2],
+    }
+    for name, kernel in kernels.items():
+        together = kernel(panel)
+        for col, close in enumerate(histories):
+            assert_close(together[-len(close):, col], kernel(close.to_numpy()), err_msg=name)
+
+
+def test_matches_pandas_ta(hist):
+    ta = pytest.importorskip('pandas_ta')
+    assert_close(ta_kernels.rsi_series(hist['Close']), ta.rsi(hist['Close'], length=14))
+    expected = ta.macd(hist['Close'], fast=12, slow=26, signal=9)
+    actual = ta_kernels.macd_frame(hist['Close'])
+    for column in actual:
+        assert_close(actual[column], expected[column], err_msg=column)
+    expected = ta.stoch(hist['High'], hist['Low'], hist['Close'], k=14, d=3, smooth_k=3)
+    actual = ta_kernels.stoch_frame(hist['High'], hist['Low'], hist['Close'])
+    for column in actual:
+        assert_close(actual[column], expected[column], err_msg=column)
@@ -0,0 +1,152 @@
+import collections
+import threading
+import time
+from data_provider import period_start
+from panel import IndicatorPanel
+
+# Bar sizes offered next to the period, with the pandas resample rule that builds them
+# from daily bars (None keeps the daily bars)
+INTERVALS = {
+    "1d": None,
+    "1wk": "W-FRI",
+    "1mo": "ME",
+}
+
+# How each column is aggregated when daily bars are resampled
+RESAMPLE_AGGREGATIONS = {
+    'Open': 'first',
+    'High': 'max',
+    'Low': 'min',
+    'Close': 'last',
+    'Volume': 'sum',
+    'Dividends': 'sum',
+    'Stock Splits': 'sum',
+}
+
+
+def resample_ohlcv(hist, interval):
+    # Weekly or monthly bars from daily ones; periods without any trading day are dropped
+    rule = INTERVALS[interval]
+    if rule is None:
+        return hist
+    aggregations = {column: how for column, how in RESAMPLE_AGGREGATIONS.items() if column in hist}
+    return hist.resample(rule).agg(aggregations).dropna(subset=['Close'])
+
+
+class TimeframeService:
+    # Fetches each ticker's longest daily history once and derives every period by slicing
+    # it and every interval by resampling it, so switching between "3mo" and "max" or
+    # between daily and weekly bars makes no network calls. Histories are refetched after
+    # `max_age` seconds. The histories are capped at `max_rows` daily bars in total, least
+    # recently used ticker first out; an evicted ticker is simply fetched again. A daily bar
+    # takes 64 bytes (seven float64 columns plus the timestamp) and its weekly and monthly
+    # bars add under a quarter of that, so the default million rows stay below ~80 MB:
+    # about 100 tickers with 40 years of history or 400 with 10 years. Indicator panels are
+    # memoized per (tickers, period, interval, sma_windows), keeping the `max_panels` most
+    # recently used.
+    def __init__(self, provider, base_period="max", max_age=3600, max_panels=16, max_rows=1_000_000):
+        self.provider = provider
+        self.base_period = base_period
+        self.max_age = max_age
+        self.max_panels = max_panels
+        self.max_rows = max_rows
+        self.rows = 0
+        self.daily = collections.OrderedDict()
+        self.fetched_at = {}
+        self.resampled = {}
+        self.panels = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def load(self, tickers):
+        # Fetch the tickers that aren't held yet, or are older than max_age, in one batch.
+        # The download runs outside the lock so several threads can fetch different tickers.
+        now = time.time()
+        with self.lock:
+            stale = [ticker for ticker in tickers
+                     if now - self.fetched_at.get(ticker, -float('inf')) >= self.max_age]
+        if not stale:
+            return
+        fetched = self.provider.fetch_history(stale, self.base_period)
+        with self.lock:
+            self.store(stale, fetched, now)
+
+    def store(self, stale, fetched, now):
+        for ticker in stale:
+            self.fetched_at[ticker] = now
+            old = self.daily.pop(ticker, None)
+            if old is not None:
+                self.rows -= len(old)
+            if ticker in fetched and not fetched[ticker].empty:
+                self.daily[ticker] = fetched[ticker]
+                self.rows += len(fetched[ticker])
+            self.forget_bars(ticker)
+        # The batch just stored is the most recently used, so it is evicted last
+        while self.rows > self.max_rows and len(self.daily) > 1:
+            ticker, hist = self.daily.popitem(last=False)
+            self.rows -= len(hist)
+            self.fetched_at.pop(ticker, None)
+            self.forget_bars(ticker)
+        # Panels built from the old histories are out of date
+        stale = set(stale)
+        for key in [key for key in self.panels if stale.intersection(key[0])]:
+            del self.panels[key]
+
+    def forget_bars(self, ticker):
+        for interval in INTERVALS:
+            self.resampled.pop((ticker, interval), None)
+
+    def bars(self, ticker, interval):
+        key = (ticker, interval)
+        if key not in self.resampled:
+            self.resampled[key] = resample_ohlcv(self.daily[ticker], interval)
+        return self.resampled[key]
+
+    def histories(self, tickers, period, interval="1d"):
+        # {ticker: bars of `interval` covering `period`}; tickers without data are left out
+        self.load(tickers)
+        with self.lock:
+            histories = {}
+            for ticker in tickers:
+                if ticker not in self.daily:
+                    continue
+                self.daily.move_to_end(ticker)
+                bars = self.bars(ticker, interval)
+                start = period_start(self.daily[ticker].index[-1], period)
+                if start is not None:
+                    bars = bars[bars.index >= start]
+                if not bars.empty:
+                    histories[ticker] = bars
+            return histories
+
+    def panel(self, tickers, period, interval="1d", sma_windows=(50, 200)):
+        # IndicatorPanel for the tickers' `period` of `interval` bars, computed once
+        tickers = tuple(tickers)
+        key = (tickers, period, interval, tuple(sma_windows))
+        histories = self.histories(tickers, period, interval)
+        with self.lock:
+            if key in self.panels:
+                self.panels.move_to_end(key)
+                return self.panels[key], histories
+        panel = IndicatorPanel.from_histories(histories, list(tickers))
+        panel.compute_indicators(sma_windows)
+        with self.lock:
+            self.panels[key] = panel
+            while len(self.panels) > self.max_panels:
+                self.panels.popitem(last=False)
+        return panel, histories
+
+    def analyzer(self, tickers, period, interval="1d", sma_windows=(50, 200)):
+        # An InvestmentAnalyzer holding the memoized panel, as if analyze_data() had run
+        from Stocks import InvestmentAnalyzer
+
+        panel, histories = self.panel(tickers, period, interval, sma_windows)
+        analyzer = InvestmentAnalyzer(list(tickers), period, provider=self.provider)
+        analyzer.histories = histories
+        analyzer.set_panel(panel)
+        return analyzer
+
+    def invalidate(self, tickers=None):
+        with self.lock:
+            tickers = list(self.fetched_at) if tickers is None else tickers
+            for ticker in tickers:
+                self.fetched_at.pop(ticker, None)
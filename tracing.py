@@ -0,0 +1,192 @@
+import json
+import os
+import re
+import threading
+import time
+
+
+class NullSpan:
+    # Returned while tracing is disabled so `with span(...)` costs one attribute check
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Span:
+    # One timed region. Spans opened inside it on the same thread become its children.
+    def __init__(self, tracer, name, tags):
+        self.tracer = tracer
+        self.name = name
+        self.tags = tags
+        self.parent = None
+        self.depth = 0
+
+    def __enter__(self):
+        stack = self.tracer.stack()
+        if stack:
+            self.parent = stack[-1].name
+            self.depth = len(stack)
+        stack.append(self)
+        self.wall = time.time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.start
+        self.tracer.stack().pop()
+        record = {
+            'type': 'span',
+            'name': self.name,
+            'parent': self.parent,
+            'depth': self.depth,
+            'start': self.wall,
+            'seconds': seconds,
+            'pid': os.getpid(),
+            'thread': threading.current_thread().name,
+        }
+        if exc_type is not None:
+            record['error'] = exc_type.__name__
+        record.update(self.tags)
+        self.tracer.record(record)
+        return False
+
+
+def metric_name(name):
+    return re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+
+def label_text(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"') for value in labels.values())
+    return '{' + ','.join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + '}'
+
+
+class Tracer:
+    # Collects nested timing spans and counters for one process. Disabled by default;
+    # spans and counters are then no-ops. Records from worker processes are shipped back
+    # with drain() and added to the parent's tracer with merge().
+    def __init__(self, enabled=False, prefix="tiv"):
+        self.enabled = enabled
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.spans = []
+        self.counters = {}
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self.lock:
+            self.spans = []
+            self.counters = {}
+
+    def stack(self):
+        stack = getattr(self.local, 'stack', None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+    def span(self, name, **tags):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, tags)
+
+    def count(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def record(self, record):
+        with self.lock:
+            self.spans.append(record)
+
+    def drain(self):
+        # Takes everything recorded so far, e.g. to send it from a worker to the parent
+        with self.lock:
+            drained = self.spans, self.counters
+            self.spans = []
+            self.counters = {}
+        return drained
+
+    def merge(self, drained):
+        spans, counters = drained
+        with self.lock:
+            self.spans.extend(spans)
+            for key, value in counters.items():
+                self.counters[key] = self.counters.get(key, 0) + value
+
+    def summary(self):
+        # {span name: (count, total seconds, max seconds)}
+        totals = {}
+        with self.lock:
+            for record in self.spans:
+                count, total, longest = totals.get(record['name'], (0, 0.0, 0.0))
+                totals[record['name']] = (count + 1, total + record['seconds'], max(longest, record['seconds']))
+        return totals
+
+    def write_jsonl(self, path):
+        with self.lock:
+            spans = list(self.spans)
+            counters = dict(self.counters)
+        with open(path, 'w') as file:
+            for record in spans:
+                file.write(json.dumps(record, default=str) + '\n')
+            for (name, labels), value in sorted(counters.items()):
+                file.write(json.dumps({'type': 'counter', 'name': name, 'labels': dict(labels), 'value': value}) + '\n')
+
+    def prometheus_text(self):
+        # Span totals per name plus every counter, in the Prometheus text exposition format.
+        # Span tags such as the ticker are left out of the labels to keep cardinality low.
+        lines = []
+        summary = self.summary()
+        if summary:
+            for metric, kind, help_text, position in [
+                ('span_seconds_total', 'counter', 'Total time spent in each span', 1),
+                ('span_calls_total', 'counter', 'Number of times each span was entered', 0),
+                ('span_seconds_max', 'gauge', 'Longest single run of each span', 2),
+            ]:
+                name = f'{self.prefix}_{metric}'
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                for span_name, values in sorted(summary.items()):
+                    lines.append(f'{name}{label_text({"span": span_name})} {values[position]}')
+
+        with self.lock:
+            counters = dict(self.counters)
+        by_name = {}
+        for (name, labels), value in counters.items():
+            by_name.setdefault(name, []).append((dict(labels), value))
+        for name, samples in sorted(by_name.items()):
+            metric = f'{self.prefix}_{metric_name(name)}_total'
+            lines.append(f'# TYPE {metric} counter')
+            for labels, value in sorted(samples, key=lambda sample: sorted(sample[0].items())):
+                lines.append(f'{metric}{label_text(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        with open(path, 'w') as file:
+            file.write(self.prometheus_text())
+
+
+# Process-wide tracer used by the instrumented modules
+tracer = Tracer()
+
+
+def span(name, **tags):
+    return tracer.span(name, **tags)
+
+
+def count(name, value=1, **labels):
+    tracer.count(name, value, **labels)
@@ -0,0 +1,206 @@
+import bisect
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_LIST = "Watchlist"
+
+# Substrings up to this length are indexed directly; longer queries intersect the
+# postings of their substrings of this length and check the candidates
+GRAM_LENGTH = 3
+
+
+def normalize_ticker(ticker):
+    return ticker.strip().upper()
+
+
+class TickerIndex:
+    # In-memory search index over one list's tickers for search-as-you-type:
+    #   prefix     bisect on the sorted tickers, O(log n) plus the matches
+    #   substring  postings of every 1 to GRAM_LENGTH character substring, so a query
+    #              only looks at tickers that contain all of its grams
+    # Matches come back prefix matches first, then the other substring matches, each sorted.
+    def __init__(self, tickers=()):
+        self.keys = sorted(set(tickers))
+        self.postings = {}
+        for ticker in self.keys:
+            self.index(ticker)
+
+    def grams(self, text):
+        return {text[start:start + length] for length in range(1, GRAM_LENGTH + 1)
+                for start in range(len(text) - length + 1)}
+
+    def index(self, ticker):
+        for gram in self.grams(ticker):
+            self.postings.setdefault(gram, set()).add(ticker)
+
+    def add(self, ticker):
+        position = bisect.bisect_left(self.keys, ticker)
+        if position < len(self.keys) and self.keys[position] == ticker:
+            return
+        self.keys.insert(position, ticker)
+        self.index(ticker)
+
+    def remove(self, ticker):
+        position = bisect.bisect_left(self.keys, ticker)
+        if position == len(self.keys) or self.keys[position] != ticker:
+            return
+        del self.keys[position]
+        for gram in self.grams(ticker):
+            postings = self.postings[gram]
+            postings.discard(ticker)
+            if not postings:
+                del self.postings[gram]
+
+    def prefix(self, query):
+        start = bisect.bisect_left(self.keys, query)
+        end = bisect.bisect_left(self.keys, query + '\uffff')
+        return self.keys[start:end]
+
+    def search(self, query, limit=None):
+        query = normalize_ticker(query)
+        if not query:
+            return list(self.keys[:limit])
+        prefixed = self.prefix(query)
+        if limit is not None and len(prefixed) >= limit:
+            return prefixed[:limit]
+        if len(query) <= GRAM_LENGTH:
+            candidates = self.postings.get(query, set())
+        else:
+            grams = [query[start:start + GRAM_LENGTH] for start in range(len(query) - GRAM_LENGTH + 1)]
+            candidates = set.intersection(*(self.postings.get(gram, set()) for gram in grams))
+        prefixed_set = set(prefixed)
+        others = sorted(ticker for ticker in candidates if query in ticker and ticker not in prefixed_set)
+        matches = prefixed + others
+        return matches[:limit] if limit is not None else matches
+
+
+class WatchlistStore:
+    # SQLite store of named watchlists. Adding or removing tickers touches only their rows
+    # in one transaction, so a crash never leaves a half-written list, and a list keeps the
+    # order its tickers were added in. The first open imports the old stocks.json list.
+    def __init__(self, path="watchlists.sqlite", legacy_path="stocks.json"):
+        self.path = path
+        self.lock = threading.RLock()
+        self.indexes = {}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS lists (
+                    id INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL UNIQUE,
+                    created_at REAL NOT NULL
+                )""")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS items (
+                    id INTEGER PRIMARY KEY,
+                    list_id INTEGER NOT NULL REFERENCES lists (id),
+                    ticker TEXT NOT NULL,
+                    added_at REAL NOT NULL,
+                    UNIQUE (list_id, ticker)
+                )""")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value)")
+        if legacy_path is not None:
+            self.migrate(legacy_path)
+
+    def migrate(self, legacy_path, name=DEFAULT_LIST):
+        # One-off import of a stocks.json list; the file itself is left alone
+        with self.lock:
+            if self.conn.execute("SELECT 1 FROM meta WHERE key = 'migrated'").fetchone():
+                return
+        tickers = []
+        if os.path.exists(legacy_path):
+            with open(legacy_path, 'r') as file:
+                try:
+                    tickers = [ticker for ticker in json.load(file) if isinstance(ticker, str)]
+                except json.JSONDecodeError:
+                    tickers = []
+        self.create_list(name)
+        self.add(name, tickers)
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated', ?)", (legacy_path,))
+
+    def list_id(self, name):
+        row = self.conn.execute("SELECT id FROM lists WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            raise KeyError(name)
+        return row[0]
+
+    def lists(self):
+        with self.lock:
+            return [name for name, in self.conn.execute("SELECT name FROM lists ORDER BY id")]
+
+    def create_list(self, name):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR IGNORE INTO lists (name, created_at) VALUES (?, ?)", (name, time.time()))
+
+    def delete_list(self, name):
+        with self.lock, self.conn:
+            list_id = self.list_id(name)
+            self.conn.execute("DELETE FROM items WHERE list_id = ?", (list_id,))
+            self.conn.execute("DELETE FROM lists WHERE id = ?", (list_id,))
+            self.indexes.pop(name, None)
+
+    def tickers(self, name):
+        # The list's tickers in the order they were added
+        with self.lock:
+            return [ticker for ticker, in self.conn.execute(
+                "SELECT ticker FROM items WHERE list_id = ? ORDER BY id", (self.list_id(name),))]
+
+    def count(self, name):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM items WHERE list_id = ?",
+                                     (self.list_id(name),)).fetchone()[0]
+
+    def __contains__(self, key):
+        name, ticker = key
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM items WHERE list_id = ? AND ticker = ?",
+                                     (self.list_id(name), normalize_ticker(ticker))).fetchone() is not None
+
+    def add(self, name, tickers):
+        # Adds the tickers that aren't on the list yet and returns them
+        tickers = list(dict.fromkeys(normalize_ticker(ticker) for ticker in tickers))
+        tickers = [ticker for ticker in tickers if ticker]
+        now = time.time()
+        with self.lock, self.conn:
+            list_id = self.list_id(name)
+            added = []
+            for ticker in tickers:
+                cursor = self.conn.execute("INSERT OR IGNORE INTO items (list_id, ticker, added_at) VALUES (?, ?, ?)",
+                                           (list_id, ticker, now))
+                if cursor.rowcount:
+                    added.append(ticker)
+            if name in self.indexes:
+                for ticker in added:
+                    self.indexes[name].add(ticker)
+        return added
+
+    def remove(self, name, tickers):
+        # Removes the tickers from the list and returns how many were on it
+        tickers = {normalize_ticker(ticker) for ticker in tickers}
+        with self.lock, self.conn:
+            list_id = self.list_id(name)
+            cursor = self.conn.executemany("DELETE FROM items WHERE list_id = ? AND ticker = ?",
+                                           [(list_id, ticker) for ticker in tickers])
+            if name in self.indexes:
+                for ticker in tickers:
+                    self.indexes[name].remove(ticker)
+        return cursor.rowcount
+
+    def search(self, name, query, limit=None):
+        # Tickers of the list matching `query` by prefix or substring, prefix matches first
+        with self.lock:
+            if name not in self.indexes:
+                self.indexes[name] = TickerIndex(self.tickers(name))
+            return self.indexes[name].search(query, limit)
+
+    def close(self):
+        self.conn.close()